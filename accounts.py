@@ -0,0 +1,261 @@
+# multi-account mode: one worker process per account, run by a small supervisor
+#   python accounts.py [accounts.json]
+#   python accounts.py login <name> [accounts.json]    first (interactive) login of one account
+# every account works inside its own folder (session, liked history and run.log live there),
+# see accounts.example.json for the manifest format
+import os
+import sys
+import json
+import time
+import queue
+import multiprocessing as mp
+
+from metrics import log
+
+MANIFEST_FILE = "accounts.json"
+
+# worker exit codes
+EXIT_OK = 0
+EXIT_NO_SESSION = 3
+
+# manifest keys copied onto civitai_auto_like / email_processor for an account
+ACCOUNT_SETTINGS = {
+    "email": "YOUR_EMAIL",
+    "email_password": "EMAIL_PASSWORD",
+    "target_likes": "TARGET_LIKES",
+    "liked_store": "LIKED_STORE",
+    "max_likes_per_minute": "MAX_LIKES_PER_MINUTE",
+    "max_likes_per_hour": "MAX_LIKES_PER_HOUR",
+    "max_likes_per_day": "MAX_LIKES_PER_DAY",
+    "headless": "HEADLESS_MODE",
+    "engine": "ENGINE",
+    "page_workers": "PAGE_WORKERS",
+}
+
+
+def load_manifest(path=MANIFEST_FILE):
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    accounts = []
+    for n, acc in enumerate(manifest.get("accounts", []), 1):
+        acc = dict(acc)
+        acc.setdefault("name", f"account{n}")
+        folder = acc.get("dir") or os.path.join("accounts", acc["name"])
+        acc["dir"] = folder if os.path.isabs(folder) else os.path.join(base, folder)
+        accounts.append(acc)
+    names = [a["name"] for a in accounts]
+    if len(set(names)) != len(names):
+        raise ValueError("account names in the manifest must be unique")
+    return {
+        "concurrency": max(1, int(manifest.get("concurrency", 2))),
+        "max_restarts": int(manifest.get("max_restarts", 2)),
+        "timeout_minutes": float(manifest.get("timeout_minutes", 0)),
+        "accounts": accounts,
+    }
+
+
+def apply_account(account):
+    # point the liker (and the login email code) at this account -> civitai_auto_like module
+    import civitai_auto_like as cal
+    import email_processor
+
+    for key, attr in ACCOUNT_SETTINGS.items():
+        if key in account:
+            setattr(cal, attr, account[key])
+            if hasattr(email_processor, attr):
+                setattr(email_processor, attr, account[key])
+    for attr, value in (account.get("settings") or {}).items():
+        setattr(cal, attr, value)
+    return cal
+
+
+def login_account(account):
+    # interactive login in this console with the account's own email settings; the session is saved
+    # in the account folder, where its worker looks for it
+    name = account["name"]
+    os.makedirs(account["dir"], exist_ok=True)
+    cal = apply_account(account)
+    cal.INTERACTIVE = True
+    cal.AUTO_WAIT_FOR_USER = True
+    os.chdir(account["dir"])
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as p:
+        browser, context, page = cal.ensure_valid_session(p)
+        if context is None:
+            log("error", f"[{name}] login failed")
+            return EXIT_NO_SESSION
+        try:
+            cal.save_session_state(context)
+        finally:
+            try:
+                browser.close()
+            except Exception:
+                pass
+    log("info", f"[{name}] logged in; session saved in {account['dir']}")
+    return EXIT_OK
+
+
+# -------- worker (child process) --------
+def run_account(account, events, target):
+    # runs in a fresh process: point the liker at this account, then do a normal run
+    name = account["name"]
+    os.makedirs(account["dir"], exist_ok=True)
+    run_log = open(os.path.join(account["dir"], "run.log"), "a", encoding="utf-8", buffering=1)
+    sys.stdout = sys.stderr = run_log
+
+    cal = apply_account(account)
+    cal.TARGET_LIKES = target
+    cal.INTERACTIVE = False
+    cal.AUTO_WAIT_FOR_USER = False
+    cal.LIKE_HOOKS.append(lambda img_id, liked_count: events.put(("like", name, liked_count)))
+
+    os.chdir(account["dir"])
+    log("info", f"===== run started {time.strftime('%Y-%m-%d %H:%M:%S')} =====")
+    result = cal.auto_like_images()
+    events.put(("done", name, result))
+    run_log.flush()
+    sys.exit(EXIT_NO_SESSION if result is None else EXIT_OK)
+
+
+# -------- supervisor --------
+class AccountRun:
+
+    def __init__(self, account):
+        self.account = account
+        self.name = account["name"]
+        self.target = int(account.get("target_likes", 50))
+        self.liked = 0  # across restarts
+        self.run_liked = 0  # current process
+        self.restarts = 0
+        self.process = None
+        self.started = 0.0
+        self.not_before = 0.0
+        self.status = "pending"
+
+    def remaining(self):
+        return max(0, self.target - self.liked)
+
+
+def start(run, ctx, events):
+    run.run_liked = 0
+    run.process = ctx.Process(target=run_account, args=(run.account, events, run.remaining()),
+                              name=f"liker-{run.name}", daemon=True)
+    run.process.start()
+    run.started = time.monotonic()
+    run.status = "running"
+    log("info", f"[{run.name}] worker started (pid {run.process.pid}, target {run.remaining()})")
+
+
+def print_progress(runs):
+    total = sum(r.liked for r in runs)
+    parts = " | ".join(f"{r.name}: {r.liked}/{r.target} {r.status}" for r in runs)
+    log("info", f"total {total} likes | {parts}")
+
+
+def handle_exit(run, manifest, now):
+    code = run.process.exitcode
+    run.process = None
+    if code == EXIT_OK or run.remaining() == 0:
+        run.status = "done"
+    elif code == EXIT_NO_SESSION:
+        # restarting won't help, a human has to log in for this account
+        run.status = "no-session"
+        log("warning", f"[{run.name}] session expired; log in with: python accounts.py login {run.name}")
+    elif run.restarts < manifest["max_restarts"]:
+        run.restarts += 1
+        run.status = "pending"
+        run.not_before = now + 5 * run.restarts
+        log("warning", f"[{run.name}] worker exited with code {code}; restart {run.restarts}/{manifest['max_restarts']}")
+    else:
+        run.status = "failed"
+        log("error", f"[{run.name}] worker exited with code {code}; giving up (see {run.account['dir']}/run.log)")
+
+
+def supervise(manifest):
+    runs = [AccountRun(acc) for acc in manifest["accounts"]]
+    if not runs:
+        log("error", "no accounts in manifest")
+        return runs
+    # spawn: every account gets a clean interpreter (no shared playwright / config state)
+    ctx = mp.get_context("spawn")
+    events = ctx.Queue()
+    timeout = manifest["timeout_minutes"] * 60
+    log("info", f"multi-account run: {len(runs)} accounts, concurrency {manifest['concurrency']}")
+
+    while any(r.status in ("pending", "running") for r in runs):
+        now = time.monotonic()
+        running = [r for r in runs if r.status == "running"]
+        for run in runs:
+            if len(running) >= manifest["concurrency"]:
+                break
+            if run.status == "pending" and now >= run.not_before:
+                start(run, ctx, events)
+                running.append(run)
+
+        changed = False
+        try:
+            event = events.get(timeout=1.0)
+            while event:
+                kind, name, value = event
+                run = next(r for r in runs if r.name == name)
+                if kind == "like":
+                    run.liked += value - run.run_liked
+                    run.run_liked = value
+                    changed = True
+                event = events.get_nowait()
+        except queue.Empty:
+            pass
+
+        now = time.monotonic()
+        for run in runs:
+            if run.status != "running":
+                continue
+            if timeout and now - run.started > timeout and run.process.is_alive():
+                # stuck account (slow feed, hung browser) must not hold a slot forever
+                log("warning", f"[{run.name}] no finish after {manifest['timeout_minutes']} min; terminating")
+                run.process.terminate()
+                run.process.join(10)
+            if not run.process.is_alive():
+                run.process.join()
+                handle_exit(run, manifest, now)
+                changed = True
+        if changed:
+            print_progress(runs)
+
+    log("info", "multi-account run finished")
+    print_progress(runs)
+    return runs
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    login = args[:1] == ["login"]
+    if login:
+        if len(args) < 2:
+            print("usage: python accounts.py login <name> [accounts.json]")
+            sys.exit(2)
+        name, args = args[1], args[2:]
+    path = args[0] if args else MANIFEST_FILE
+    try:
+        manifest = load_manifest(path)
+    except Exception as e:
+        log("error", f"failed to read accounts manifest {path}:", e)
+        sys.exit(1)
+    if login:
+        account = next((a for a in manifest["accounts"] if a["name"] == name), None)
+        if account is None:
+            log("error", f"no account named {name!r} in {path}")
+            sys.exit(1)
+        try:
+            sys.exit(login_account(account))
+        except KeyboardInterrupt:
+            print("\nINFO: interrupted by user.")
+            sys.exit(0)
+    try:
+        runs = supervise(manifest)
+    except KeyboardInterrupt:
+        print("\nINFO: interrupted by user.")
+        sys.exit(0)
+    sys.exit(0 if all(r.status == "done" for r in runs) else 1)
@@ -0,0 +1,242 @@
+# api engine (ENGINE = "api"): no pages are rendered at all - the feed is paged through the trpc
+# image.getInfinite api with the saved session cookies and likes go straight to the reaction endpoint.
+# playwright's APIRequestContext keeps its connections alive, so all calls share one pool.
+# FEED_SOURCES (feed_sources.py) are paged side by side, interleaved by weight and deduplicated.
+import os
+import json
+import time
+from urllib.parse import urlsplit
+
+from playwright.sync_api import sync_playwright
+
+import civitai_auto_like as cal
+from feed_cursor import find_items, find_next_cursor
+from feed_sources import MultiSourceFeed, load_sources
+from metrics import log, inc, timer
+
+FEED_ENDPOINT = "/api/trpc/image.getInfinite"
+MAX_API_ERRORS = 5  # consecutive failed calls before the run is given up
+SOURCE_GONE = (400, 404)  # feed input the api does not take (bad tag / model / user): only that source is dropped
+
+
+def api_base_url(images_url):
+    parts = urlsplit(images_url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def item_liked(item):
+    # the feed tells whether this session already reacted; toggling again would remove the like
+    if item.get("liked") is True:
+        return True
+    reactions = item.get("reactions") or []
+    return any(isinstance(r, dict) and r.get("reaction") == "Like" for r in reactions)
+
+
+def reaction_state(payload):
+    # "liked" flag of a reaction.toggle response, None when the response does not say
+    stack = [payload]
+    while stack:
+        item = stack.pop(0)
+        if isinstance(item, dict):
+            if isinstance(item.get("liked"), bool):
+                return item["liked"]
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+    return None
+
+
+class ApiLiker:
+    # request = playwright APIRequestContext (or anything with the same get/post/response api)
+
+    def __init__(self, request, liked_ids, target, batch_size=100, feed_input=None, pacer=None, journal=None,
+                 sources=None):
+        self.request = request
+        self.liked_ids = liked_ids
+        self.target = target
+        self.batch_size = batch_size
+        self.sources = sources or load_sources(cal.FEED_SOURCES, feed_input)
+        self.pacer = pacer or cal.make_pacer()
+        self.journal = journal or cal.open_journal(liked_ids)
+        self.feed = None
+        self.rejected = False
+        self.liked_count = 0
+        self.pages = 0
+        self.calls = 0
+        self.errors = 0
+        self.skipped = 0
+        self.started = time.monotonic()
+
+    def call(self, method, url, **kw):
+        # -> (status, payload); 429s are waited out here, other errors go back to the caller
+        for _ in range(3):
+            self.calls += 1
+            try:
+                response = getattr(self.request, method)(url, **kw)
+            except Exception as e:
+                log("warning", "api call failed:", str(e)[:200])
+                return 0, None
+            if response.status == 429:
+                self.pacer.rate_limited(response.headers.get("retry-after"))
+                with timer("rate_limit_wait"):
+                    time.sleep(self.pacer.backoff_remaining())
+                continue
+            try:
+                payload = response.json()
+            except Exception:
+                payload = None
+            return response.status, payload
+        return 429, None
+
+    def fetch_page(self, cursor=None, feed_input=None):
+        # -> (status, items, next_cursor)
+        params = dict(feed_input or {}, limit=self.batch_size)
+        if cursor is not None:
+            params["cursor"] = cursor
+        with timer("discover"):
+            status, payload = self.call("get", FEED_ENDPOINT, params={"input": json.dumps({"json": params})})
+        if status != 200 or payload is None:
+            return status, [], None
+        self.pages += 1
+        return status, find_items(payload), find_next_cursor(payload)
+
+    def toggle(self, img_id):
+        body = {"json": {"entityId": int(img_id), "entityType": "image", "reaction": "Like"}}
+        return self.call("post", cal.REACTION_API_PATTERN, data=body)
+
+    def wait_budget(self):
+        # False = the like budget does not allow another like within PACING_MAX_WAIT
+        with timer("rate_limit_wait"):
+            delay = self.pacer.reserve()
+            if delay is None:
+                return False
+            if delay > 0:
+                time.sleep(delay)
+        return True
+
+    def like(self, img_id):
+        # -> True = liked now, None = it was liked before this run, False = failed
+        with timer("click_confirm"):
+            status, payload = self.toggle(img_id)
+        if not 200 <= status < 300:
+            log("warning", f"like {img_id} failed (status {status})")
+            return False
+        if reaction_state(payload) is False:
+            # it was liked already and the toggle just removed it: put it back
+            log("info", f"image {img_id} was already liked; restoring the like")
+            # putting a like back is not a new one: only a server backoff holds it up, not the budget
+            time.sleep(self.pacer.backoff_remaining())
+            status, payload = self.toggle(img_id)
+            if not 200 <= status < 300:
+                log("warning", f"could not restore the like on {img_id} (status {status})")
+                return False
+            self.liked_ids.add(img_id)
+            return None
+        return True
+
+    def fetch_source(self, source, cursor):
+        # feed page of one source -> (items, next_cursor); None stops the run (session rejected / api down)
+        while True:
+            status, items, next_cursor = self.fetch_page(cursor, source.api_input())
+            if status in (401, 403):
+                if self.pages == 0:
+                    self.rejected = True
+                else:
+                    log("error", "session rejected by the api; stopping")
+                return None
+            if status in SOURCE_GONE:
+                log("warning", f"{source.name}: feed api refused this source (status {status}); dropping it")
+                return [], None
+            if status != 200:
+                self.errors += 1
+                if self.errors >= MAX_API_ERRORS:
+                    log("error", f"feed api failed {self.errors} times in a row; stopping")
+                    return None
+                if status != 429:
+                    self.pacer.failure()
+                time.sleep(self.pacer.backoff_remaining())
+                continue
+            self.errors = 0
+            return items, next_cursor
+
+    def run(self):
+        # -> number of new likes, or None when the saved session is not accepted
+        # the feed hands out only ids that are not liked yet and not seen in another source;
+        # each source is checkpointed at the batch it was in (journal key = its api input)
+        self.feed = MultiSourceFeed(self.sources, self.liked_ids, self.fetch_source, self.journal)
+        for source, item in self.feed:
+            img_id = str(item["id"])
+            if item_liked(item):
+                if self.journal.in_flight(img_id):
+                    self.journal.end(img_id, True)
+                self.liked_ids.add(img_id)
+                self.skipped += 1
+                continue
+            if not self.wait_budget():
+                break
+            self.journal.begin(img_id)
+            ok = self.like(img_id)
+            self.journal.end(img_id, ok is not False)
+            if ok is None:
+                self.skipped += 1
+                continue
+            if not ok:
+                inc("like_failures_total")
+                self.pacer.failure()
+                self.errors += 1
+                if self.errors >= MAX_API_ERRORS:
+                    log("error", f"{self.errors} likes failed in a row; stopping")
+                    break
+                continue
+            self.errors = 0
+            self.pacer.success()
+            with timer("persist"):
+                self.liked_ids.add(img_id)
+            self.liked_count += 1
+            inc("likes_total")
+            log("info", f"liked {img_id} ({self.liked_count}/{self.target})",
+                event="liked", image_id=img_id, count=self.liked_count, source=source.name)
+            cal.notify_like(img_id, self.liked_count)
+            if self.liked_count >= self.target:
+                break
+        if self.rejected:
+            return None
+        self.feed.checkpoint()
+        if not self.feed.stopped and self.liked_count < self.target and all(s.exhausted for s in self.sources):
+            log("info", "end of feed reached")
+        return self.liked_count
+
+    def summary(self):
+        elapsed = max(1e-9, time.monotonic() - self.started)
+        skipped = self.skipped + (sum(s["liked"] + s["dupes"] for s in self.feed.stats.values()) if self.feed else 0)
+        return (f"api engine: {self.liked_count} likes in {elapsed:.1f}s ({self.liked_count / elapsed * 60:.1f}/min), "
+                f"{self.pages} feed pages, {self.calls} api calls, {skipped} already liked or seen")
+
+
+def run_api_liker(liked_ids, target, batch_size=100, feed_input=None, base_url=None):
+    # -> number of new likes, or None when there is no usable saved session (caller logs in via the browser)
+    if not os.path.exists(cal.SESSION_FILE):
+        log("info", "api engine needs a saved session; none found")
+        return None
+    if cal.session_precheck() is False:
+        return None
+    base_url = base_url or api_base_url(cal.IMAGES_URL)
+    with sync_playwright() as p:
+        request = p.request.new_context(base_url=base_url, storage_state=cal.SESSION_FILE)
+        liker = None
+        try:
+            liker = ApiLiker(request, liked_ids, target, batch_size, feed_input)
+            result = liker.run()
+            if result is None:
+                log("info", "saved session was rejected by the api")
+                return None
+            log("info", f"Done. Liked {result} new images in this run.")
+            log("info", liker.summary())
+            if len(liker.sources) > 1:
+                log("info", liker.feed.summary())
+            log("info", liker.pacer.summary())
+            return result
+        finally:
+            if liker is not None:
+                liker.journal.close()
+            request.dispose()
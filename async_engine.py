@@ -0,0 +1,405 @@
+# asyncio engine (ENGINE = "async"): discovery, clicker and persistence run as concurrent tasks
+# discovery scrolls + scans and feeds a bounded queue, clicker likes what comes out of it,
+# persistence writes liked ids - so scrolling / feed loading overlaps with clicking.
+# PAGE_WORKERS > 1 opens more pages in the same context, each with its own feed slice
+import os
+import time
+import asyncio
+
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+
+import civitai_auto_like as cal
+import tracing
+from card_cache import CardCache
+from feed_cursor import FeedCursorTracker
+from feed_sources import load_sources, source_urls
+from metrics import log, inc, timer
+from tracing import span
+
+# feed slices used for extra pages when WORKER_FEED_URLS is empty
+DEFAULT_WORKER_FEEDS = [
+    "sort=Most+Reactions&period=Day",
+    "sort=Most+Comments&period=Day",
+    "sort=Most+Reactions&period=Week",
+    "sort=Most+Collected&period=Week",
+]
+
+
+# -------- page helpers --------
+async def scan_cards(page):
+    try:
+        cards = await page.evaluate(cal.SCAN_CARDS_JS, cal.BUTTON_SELECTOR_PRIMARY) or []
+    except Exception as e:
+        log("warning", "feed scan failed:", str(e)[:200])
+        return []
+    now = time.monotonic()
+    for card in cards:
+        card["scanned"] = now
+        if card.get("image_id") is not None:
+            card["image_id"] = str(card["image_id"])
+    return cards
+
+async def card_button(page, card):
+    # cards are tagged with their image id by the scan, so queued cards survive later rescans
+    try:
+        return await page.query_selector(f'button[data-cal-id="{card["image_id"]}"]')
+    except Exception:
+        return None
+
+async def open_reactions_panel(page):
+    for selector, timeout in ((cal.REACTIONS_PANEL_SVG, 3000), (cal.REACTIONS_PANEL_BUTTON, 1000)):
+        try:
+            btn = await page.wait_for_selector(selector, timeout=timeout)
+        except Exception:
+            btn = None
+        if btn:
+            try:
+                await btn.scroll_into_view_if_needed()
+                await btn.click()
+                log("info", "reactions panel button clicked")
+                await asyncio.sleep(cal.ACTION_DELAY)
+                return True
+            except Exception as e:
+                log("warning", "error clicking reactions panel button:", e)
+                return False
+    log("info", "reactions panel button not found; proceeding without opening it")
+    return False
+
+async def click_and_confirm(page, btn, card, timeout, retries):
+    # async twin of civitai_auto_like.click_and_confirm_like (same JS, same network matching)
+    img_id = card["image_id"]
+    count = cal.fresh_count(card)
+    if count is None and cal.CONFIRM_MODE != "network":
+        # scanned count went stale while the card waited in the queue / for the budget
+        try:
+            count = int(await btn.evaluate(cal.LIKE_COUNT_JS) or 0)
+        except Exception:
+            count = None
+    for attempt in range(retries + 1):
+        try:
+            await btn.scroll_into_view_if_needed()
+            if cal.CONFIRM_MODE == "network":
+                async with page.expect_response(lambda r: cal.is_reaction_response(r, img_id),
+                                                timeout=timeout * 1000) as info:
+                    await btn.click()
+                response = await info.value
+                if response.ok:
+                    return True
+                log("warning", f"reaction request for img {img_id} failed with HTTP {response.status}")
+                return False
+            await btn.click()
+            if await btn.evaluate(cal.CONFIRM_LIKE_JS, [count, int(timeout * 1000)]):
+                return True
+        except PlaywrightTimeoutError:
+            pass
+        except Exception as e:
+            log("warning", "btn.click() exception:", e)
+        if attempt < retries:
+            log("warning", "confirmation failed, retrying click...")
+            await asyncio.sleep(0.5 + attempt)
+    return False
+
+
+# -------- shared state --------
+class ClaimSet:
+    # run-wide dedupe across pages: an id is claimed by one page until it is released;
+    # outcomes go to the card cache (failed cards come back after their retry backoff)
+
+    def __init__(self, liked_ids, cache):
+        self.liked_ids = liked_ids
+        self.cache = cache
+        self.claimed = set()
+
+    def claim(self, img_id):
+        if img_id in self.claimed or self.cache.should_skip(img_id):
+            return False
+        if img_id in self.liked_ids:
+            self.cache.mark_liked(img_id)
+            return False
+        self.claimed.add(img_id)
+        return True
+
+    def release(self, img_id, outcome=None):
+        # outcome None hands the id back untouched so any page may pick it up again
+        self.claimed.discard(img_id)
+        if outcome == "liked":
+            self.cache.mark_liked(img_id)
+        elif outcome == "failed":
+            return self.cache.mark_failed(img_id)
+        return 0
+
+
+# -------- pipeline --------
+class LikePipeline:
+    # shared bits for every page worker: target counter, claims, like budget, checkpoint, persistence queue
+
+    def __init__(self, liked_ids, target, queue_size=50, pacer=None, journal=None):
+        self.liked_ids = liked_ids
+        self.target = target
+        self.queue_size = max(1, queue_size)
+        self.cache = CardCache(cal.CARD_RETRY_BACKOFF, cal.CARD_RETRY_LIMIT)
+        self.claims = ClaimSet(liked_ids, self.cache)
+        # reserve() takes the token synchronously, so pages sharing the pacer need no lock
+        self.pacer = pacer or cal.make_pacer()
+        self.journal = journal or cal.open_journal(liked_ids)
+        self.persist = asyncio.Queue()
+        self.liked_count = 0
+        self.done = asyncio.Event()
+
+    async def record_like(self, img_id, label):
+        self.liked_count += 1
+        inc("likes_total")
+        await self.persist.put(img_id)
+        log("info", f"{label}[{self.liked_count}/{self.target}] liked image id={img_id}",
+            event="liked", image_id=img_id, count=self.liked_count)
+        cal.notify_like(img_id, self.liked_count)
+        if self.liked_count >= self.target:
+            self.done.set()
+
+    async def save(self):
+        # only task that touches the store, so backends need no locking
+        while True:
+            try:
+                img_id = await asyncio.wait_for(self.persist.get(), timeout=1.0)
+            except asyncio.TimeoutError:
+                self.liked_ids.maybe_flush()
+                continue
+            if img_id is None:
+                self.liked_ids.flush()
+                return
+            self.liked_ids.add(img_id)
+
+    async def run(self, pages, urls=(), trackers=()):
+        saver = asyncio.create_task(self.save())
+        urls, trackers = list(urls), list(trackers)
+        workers = [PageWorker(self, page, n if len(pages) > 1 else None,
+                              urls[n - 1] if n <= len(urls) else None, trackers[n - 1] if n <= len(trackers) else None)
+                   for n, page in enumerate(pages, 1)]
+        for page in pages:
+            self.pacer.watch(page)
+        try:
+            await asyncio.gather(*(w.run() for w in workers))
+        finally:
+            self.done.set()
+            await self.persist.put(None)
+            await saver
+        return self.liked_count
+
+
+class PageWorker:
+    # discovery + clicker pair bound to one page
+
+    def __init__(self, pipeline, page, number=None, url=None, tracker=None):
+        self.pipeline = pipeline
+        self.page = page
+        self.url = url or cal.IMAGES_URL
+        self.tracker = tracker
+        self.scroller = cal.make_scroll_scheduler()
+        self.guard = cal.make_memory_guard()
+        self.label = f"page {number}: " if number else ""
+        self.lane = f"page {number or 1}"
+        self.cards = asyncio.Queue(maxsize=pipeline.queue_size)
+
+    async def discover(self):
+        shared = self.pipeline
+        tracing.LANE.set(f"{self.lane} discovery")
+        idle_cycles = 0
+        while not shared.done.is_set():
+            queued = 0
+            with timer("discover"):
+                cards = await scan_cards(self.page)
+            for card in cards:
+                img_id = card.get("image_id")
+                if not img_id:
+                    continue
+                if card.get("liked"):
+                    if shared.journal.in_flight(img_id):
+                        shared.journal.end(img_id, True)
+                    if shared.claims.claim(img_id):
+                        shared.claims.release(img_id, "liked")
+                        await shared.persist.put(img_id)
+                    continue
+                if not card.get("visible", True) or not shared.claims.claim(img_id):
+                    continue
+                await self.cards.put(card)
+                queued += 1
+                if shared.done.is_set():
+                    return
+
+            await self.guard.after_cycle_async(self.page, queued)
+            idle_cycles = 0 if queued else idle_cycles + 1
+            if idle_cycles > cal.MAX_IDLE_CYCLES:
+                log("warning", f"{self.label}no new cards for many scrolls — stopping discovery")
+                break
+            with timer("scroll"):
+                await self.scroller.advance_async(self.page)
+            if self.scroller.feed_exhausted():
+                log("warning", f"{self.label}reached the end of the feed — stopping discovery")
+                shared.journal.clear(self.url)
+                break
+        # feed dried up: wake the clicker once it has drained the queue
+        await self.cards.put(None)
+
+    async def click(self):
+        shared = self.pipeline
+        tracing.LANE.set(f"{self.lane} clicker")
+        while True:
+            card = await self.cards.get()
+            if card is None or shared.done.is_set():
+                return
+            img_id = card["image_id"]
+            outcome = None
+            try:
+                btn = await card_button(self.page, card)
+                if btn is None:
+                    # node went away (virtualized list) - let a later scan pick it up again
+                    continue
+                with timer("rate_limit_wait"):
+                    delay = shared.pacer.reserve()
+                    if delay is None:
+                        # budget used up for longer than PACING_MAX_WAIT: the whole run stops
+                        shared.done.set()
+                        return
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                if shared.done.is_set():
+                    return
+                shared.journal.begin(img_id)
+                with span("card", image_id=img_id), timer("click_confirm"):
+                    ok = await click_and_confirm(self.page, btn, card, cal.LIKE_CONFIRM_TIMEOUT, cal.CLICK_RETRY)
+                shared.journal.end(img_id, ok)
+                if not ok:
+                    # retried through the card cache; only 429 / 5xx responses back off (pacer.watch)
+                    outcome = "failed"
+                    inc("like_failures_total")
+                    log("info", f"{self.label}click confirmation failed for img {img_id}; skipping",
+                        event="like_failed", image_id=img_id)
+                    continue
+                outcome = "liked"
+                shared.pacer.success()
+                await shared.record_like(img_id, self.label)
+                if shared.done.is_set():
+                    return
+            except Exception as e:
+                log("warning", "error processing button:", str(e)[:200])
+            finally:
+                shared.claims.release(img_id, outcome)
+                if outcome is not None:
+                    await self.checkpoint(img_id)
+
+    async def checkpoint(self, img_id):
+        # position = feed batch of the last card the clicker finished with
+        if self.tracker is None:
+            return
+        known, cursor = await self.tracker.batch_cursor_async(img_id)
+        if known:
+            self.pipeline.journal.position(self.url, cursor, img_id)
+
+    async def run(self):
+        discovery = asyncio.create_task(self.discover())
+        try:
+            await self.click()
+        finally:
+            discovery.cancel()
+            await asyncio.gather(discovery, return_exceptions=True)
+            log("info", f"{self.label}{self.scroller.summary()}")
+            if self.guard.mode != "off":
+                log("info", f"{self.label}{self.guard.summary()}")
+
+
+# -------- entry --------
+async def restore_session(playwright):
+    # async engine only restores a saved session; login stays with the sync flow
+    if not os.path.exists(cal.SESSION_FILE):
+        log("info", "async engine: no saved session")
+        return None, None, None
+    valid = cal.session_precheck()
+    if valid is False:
+        return None, None, None
+    browser = await playwright.chromium.launch(headless=cal.HEADLESS_MODE)
+    context = await browser.new_context(storage_state=cal.SESSION_FILE, viewport={"width": 1366, "height": 768})
+    if cal.RESOURCE_FILTER:
+        # handler returns the route coroutine, the async api awaits it
+        flt = cal.get_resource_filter()
+        await context.route("**/*", flt.handle)
+        context.on("response", flt.on_response)
+    page = await context.new_page()
+    if valid:
+        log("info", "loaded session from", cal.SESSION_FILE)
+        return browser, context, page
+    try:
+        await page.goto(cal.IMAGES_URL, wait_until="domcontentloaded", timeout=15000)
+    except Exception:
+        pass
+    try:
+        signin = await page.query_selector('a:has-text("Sign in")') or await page.query_selector('a:has-text("Log in")')
+    except Exception:
+        signin = None
+    if signin:
+        log("info", "async engine: saved session appears expired or invalid.")
+        await browser.close()
+        return None, None, None
+    log("info", "loaded session from", cal.SESSION_FILE)
+    return browser, context, page
+
+def worker_feed_urls(count, urls=None):
+    # one feed slice per page: WORKER_FEED_URLS, else the FEED_SOURCES pages (heaviest first),
+    # else page 1 keeps IMAGES_URL and the others rotate through other sorts
+    urls = list(urls or [])
+    if not urls and cal.FEED_SOURCES:
+        return source_urls(load_sources(cal.FEED_SOURCES), cal.IMAGES_URL, count)
+    if not urls:
+        urls = [cal.IMAGES_URL] + [cal.IMAGES_URL.split("?", 1)[0] + "?" + q for q in DEFAULT_WORKER_FEEDS]
+    return [urls[i % len(urls)] for i in range(count)]
+
+async def open_worker_pages(context, first_page, urls, journal=None):
+    # -> (pages, trackers); each page loads its feed, at the batch it stopped in last run when checkpointed
+    pages, trackers = [], []
+    for n, url in enumerate(urls):
+        page = first_page if n == 0 else await context.new_page()
+        tracker = FeedCursorTracker(cal.FEED_API_PATTERN, track_batches=cal.CHECKPOINT)
+        tracker.attach(page)
+        cursor = journal.resume_cursor(url) if journal is not None else None
+        if cursor is not None:
+            try:
+                await tracker.resume_from_async(page, cursor)
+                log("info", f"resuming {url} at the checkpoint (cursor {cursor})")
+            except Exception as e:
+                log("warning", "failed to install checkpoint resume:", e)
+        try:
+            await page.goto(url, wait_until="domcontentloaded", timeout=15000)
+        except Exception as e:
+            log("warning", f"failed to open feed {url}:", str(e)[:200])
+        pages.append(page)
+        trackers.append(tracker)
+    return pages, trackers
+
+async def run_async_liker(liked_ids, target, queue_size=50, workers=1, feed_urls=None):
+    # returns number of new likes, or None when there is no usable session (caller falls back to sync login)
+    async with async_playwright() as p:
+        browser, context, page = await restore_session(p)
+        if page is None:
+            return None
+        journal = cal.open_journal(liked_ids)
+        try:
+            urls = worker_feed_urls(max(1, workers), feed_urls)
+            pages, trackers = await open_worker_pages(context, page, urls, journal)
+            await asyncio.gather(*(open_reactions_panel(pg) for pg in pages))
+            log("info", f"target new likes this run: {target} ({len(pages)} page(s))")
+            pipeline = LikePipeline(liked_ids, target, queue_size, journal=journal)
+            liked_count = await pipeline.run(pages, urls, trackers)
+            log("info", f"done — new likes this run: {liked_count}")
+            log("info", pipeline.cache.summary())
+            log("info", pipeline.pacer.summary())
+            cal.print_resource_filter_summary()
+            return liked_count
+        finally:
+            journal.close()
+            try:
+                await context.close()
+            except Exception:
+                pass
+            try:
+                await browser.close()
+            except Exception:
+                pass
@@ -0,0 +1,71 @@
+# run-scoped memory of examined cards, so a failed or id-less card is not re-examined every scroll cycle
+import time
+
+LIKED = "liked"
+FAILED = "failed"
+GAVE_UP = "gave_up"
+NO_ID = "no_id"
+
+
+class CardCache:
+    # key = image id (or element key for cards without an id)
+    # failed cards come back after retry_backoff * 2**(failures-1) seconds, until retry_limit attempts
+
+    def __init__(self, retry_backoff=30.0, retry_limit=3, clock=time.monotonic):
+        self.retry_backoff = float(retry_backoff)
+        self.retry_limit = max(1, int(retry_limit))
+        self.clock = clock
+        self.entries = {}  # key -> [state, failures, retry_at]
+        self.hits = 0
+        self.misses = 0
+
+    def should_skip(self, key):
+        # hit = cache saved us from looking at this card again
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False
+        state, _, retry_at = entry
+        if state == FAILED and self.clock() >= retry_at:
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+
+    def waiting(self, key):
+        # failed, retry not due yet
+        entry = self.entries.get(key)
+        return entry is not None and entry[0] == FAILED
+
+    def mark_liked(self, key):
+        self.entries[key] = [LIKED, 0, 0.0]
+
+    def mark_no_id(self, key):
+        self.entries[key] = [NO_ID, 0, 0.0]
+
+    def mark_failed(self, key):
+        failures = self.entries.get(key, [None, 0, 0.0])[1] + 1
+        if failures >= self.retry_limit:
+            self.entries[key] = [GAVE_UP, failures, 0.0]
+        else:
+            delay = self.retry_backoff * 2 ** (failures - 1)
+            self.entries[key] = [FAILED, failures, self.clock() + delay]
+        return failures
+
+    def stats(self):
+        states = {}
+        for state, _, _ in self.entries.values():
+            states[state] = states.get(state, 0) + 1
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": len(self.entries),
+            **states,
+        }
+
+    def summary(self):
+        st = self.stats()
+        return (f"card cache: {st['hits']} hits / {st['misses']} misses ({st['hit_rate']:.0%}), "
+                f"{st.get(FAILED, 0)} waiting to retry, {st.get(GAVE_UP, 0)} given up, {st.get(NO_ID, 0)} without id")
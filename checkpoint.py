@@ -0,0 +1,177 @@
+# checkpoint journal (CHECKPOINT_FILE): where each feed was left and which likes were in flight,
+# so a restart reloads the feed batch it stopped in instead of scrolling past everything again
+# append-only jsonl, compacted every time it is opened:
+#   {"t": "pos", "feed": key, "cursor": ..., "last_id": ..., "ts": ...}   feed position
+#   {"t": "clear", "feed": key}                                          feed ran out, start at the top
+#   {"t": "begin", "id": ..., "runs": n}                                 like about to be clicked
+#   {"t": "end", "id": ..., "ok": true}                                  click finished (ok = confirmed)
+# a like confirmed just before a crash is put back into the liked store (the store commits in
+# groups), and one that was clicked but never confirmed is only clicked again after the feed shows
+# it as not liked - a second click would take the like back. end entries are fsync'd in groups like
+# the store (sync_every / sync_interval), begin entries are not synced at all: whatever a crash
+# loses there is still caught by the liked state the feed reports. an in-flight id is re-checked
+# for IN_FLIGHT_RUNS runs after the crash and then forgotten
+import os
+import json
+import time
+import tempfile
+
+from metrics import log
+
+IN_FLIGHT_RUNS = 1
+
+
+class CheckpointJournal:
+
+    def __init__(self, path, max_age=12 * 3600, clock=time.time, sync_every=20, sync_interval=5.0):
+        self.path = path
+        self.max_age = max_age
+        self.clock = clock
+        self.sync_every = max(1, int(sync_every))
+        self.sync_interval = float(sync_interval)
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+        self.positions = {}  # feed key -> {"cursor", "last_id", "ts"}
+        self.pending = {}  # clicked, outcome unknown: id -> runs it has been carried over
+        self.confirmed = []  # confirmed in an earlier run, maybe not in the liked store yet
+        self.file = None
+        self.replay()
+
+    # -------- open --------
+    def replay(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except OSError:
+            return
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # torn last line after a crash
+            kind = entry.get("t")
+            if kind == "pos":
+                self.positions[entry["feed"]] = {k: entry.get(k) for k in ("cursor", "last_id", "ts")}
+            elif kind == "clear":
+                self.positions.pop(entry.get("feed"), None)
+            elif kind == "begin":
+                self.pending[str(entry["id"])] = entry.get("runs", 0)
+            elif kind == "end":
+                self.pending.pop(str(entry["id"]), None)
+                if entry.get("ok"):
+                    self.confirmed.append(str(entry["id"]))
+
+    def reconcile(self, liked_ids):
+        # confirmed likes the store did not commit before the last run ended -> store them now
+        restored = [img_id for img_id in self.confirmed if img_id not in liked_ids]
+        for img_id in restored:
+            liked_ids.add(img_id)
+        if restored:
+            liked_ids.flush()
+            log("info", f"checkpoint: restored {len(restored)} confirmed likes missing from the liked history")
+        # in flight in the last run: carried over once more, or dropped once they have been re-checked
+        carried = {img_id: runs + 1 for img_id, runs in self.pending.items() if runs < IN_FLIGHT_RUNS}
+        if len(carried) < len(self.pending):
+            log("info", f"checkpoint: dropped {len(self.pending) - len(carried)} in-flight likes left from earlier runs")
+        self.pending = carried
+        if self.pending:
+            log("info", f"checkpoint: {len(self.pending)} likes were in flight; they are re-checked before any click")
+        self.confirmed = []
+        self.compact()
+
+    def compact(self):
+        # rewrite with what is still relevant: fresh positions and in-flight likes
+        if not self.path:
+            return
+        now = self.clock()
+        entries = [dict(t="pos", feed=feed, **pos) for feed, pos in self.positions.items()
+                   if not self.max_age or now - (pos.get("ts") or 0) <= self.max_age]
+        entries += [{"t": "begin", "id": img_id, "runs": runs} for img_id, runs in sorted(self.pending.items())]
+        folder = os.path.dirname(os.path.abspath(self.path))
+        try:
+            fd, tmp_path = tempfile.mkstemp(prefix="checkpoint_", suffix=".jsonl", dir=folder)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log("warning", "failed to compact checkpoint journal:", e)
+        self.file = open(self.path, "a", encoding="utf-8")
+
+    def write(self, entry):
+        if self.file is None:
+            return
+        try:
+            self.file.write(json.dumps(entry) + "\n")
+            self.file.flush()
+        except OSError as e:
+            log("warning", "checkpoint write failed:", e)
+
+    def maybe_sync(self):
+        # group commit for end entries, same rule as the liked store
+        self.unsynced += 1
+        if self.unsynced >= self.sync_every or time.monotonic() - self.last_sync >= self.sync_interval:
+            self.sync()
+
+    def sync(self):
+        if self.file is None or not self.unsynced:
+            return
+        try:
+            os.fsync(self.file.fileno())
+        except OSError as e:
+            log("warning", "checkpoint sync failed:", e)
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    # -------- feed position --------
+    def resume_cursor(self, feed):
+        # cursor of the batch the last run stopped in; None = start at the top (none, too old, or first page)
+        pos = self.positions.get(feed)
+        if not pos or (self.max_age and self.clock() - (pos.get("ts") or 0) > self.max_age):
+            return None
+        return pos.get("cursor")
+
+    def position(self, feed, cursor, last_id):
+        pos = self.positions.get(feed)
+        if pos and pos.get("cursor") == cursor and pos.get("last_id") == last_id:
+            return
+        pos = {"cursor": cursor, "last_id": last_id, "ts": round(self.clock(), 3)}
+        self.positions[feed] = pos
+        self.write(dict(t="pos", feed=feed, **pos))
+
+    def clear(self, feed):
+        if self.positions.pop(feed, None) is not None:
+            self.write({"t": "clear", "feed": feed})
+
+    # -------- likes --------
+    def begin(self, img_id):
+        self.pending[img_id] = 0
+        self.write({"t": "begin", "id": img_id, "runs": 0})
+
+    def end(self, img_id, ok):
+        self.pending.pop(img_id, None)
+        self.write({"t": "end", "id": img_id, "ok": bool(ok)})
+        self.maybe_sync()
+
+    def in_flight(self, img_id):
+        return img_id in self.pending
+
+    def close(self):
+        self.sync()
+        if self.file is not None:
+            try:
+                self.file.close()
+            except OSError:
+                pass
+            self.file = None
+
+
+def open_checkpoint(path, liked_ids, max_age=12 * 3600, sync_every=20, sync_interval=5.0):
+    # path None = checkpointing off: same interface, nothing is written or resumed
+    journal = CheckpointJournal(path, max_age, sync_every=sync_every, sync_interval=sync_interval)
+    journal.reconcile(liked_ids)
+    return journal
@@ -1,18 +1,30 @@
 import os
+import re
 import sys
 import time
-import random
 import json
-import tempfile
-import shutil
+import threading
 import subprocess
-import webbrowser
-from pathlib import Path
+from urllib.parse import urlsplit
+from collections import deque
 
-from playwright.sync_api import sync_playwright
+from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
 
 import config
-from email_processor import get_civitai_login_link
+# email_processor / login_watcher (imaplib, html parser) and webbrowser are imported by the
+# manual login flow only, a run with a valid saved session never loads them
+from liked_store import open_liked_store
+from card_cache import CardCache
+from scroll_scheduler import ScrollScheduler
+from feed_cursor import FeedCursorTracker
+from memory_guard import MemoryGuard
+from pacing import Pacer
+from checkpoint import open_checkpoint
+from session_check import check_session
+import metrics
+import tracing
+from metrics import log, inc, timer
+from tracing import span
 
 # ---------------- Configs (with defaults) ----------------
 YOUR_EMAIL = getattr(config, "YOUR_EMAIL", "<unknown>")
@@ -22,17 +34,88 @@ ACTION_DELAY = getattr(config, "ACTION_DELAY", 0.5)
 TARGET_LIKES = getattr(config, "TARGET_LIKES", 50)
 CLICK_RETRY = getattr(config, "CLICK_RETRY", 1)
 LIKE_CONFIRM_TIMEOUT = getattr(config, "LIKE_CONFIRM_TIMEOUT", 3.0)
+CARD_RETRY_BACKOFF = getattr(config, "CARD_RETRY_BACKOFF", 30.0)
+CARD_RETRY_LIMIT = getattr(config, "CARD_RETRY_LIMIT", 3)
+CONFIRM_MODE = getattr(config, "CONFIRM_MODE", "dom")
+REACTION_API_PATTERN = getattr(config, "REACTION_API_PATTERN", "/api/trpc/reaction.toggle")
+ENGINE = getattr(config, "ENGINE", "sync")
+ASYNC_QUEUE_SIZE = getattr(config, "ASYNC_QUEUE_SIZE", 50)
+PAGE_WORKERS = getattr(config, "PAGE_WORKERS", 1)
+WORKER_FEED_URLS = getattr(config, "WORKER_FEED_URLS", [])
+# a config.py from before pacing has no budget: keep the old pace of one like per ACTION_DELAY, not "no limit"
+# (the likes are spaced that far apart too, a budget alone would let the first ones out back to back)
+LIKE_SPACING = 0 if hasattr(config, "MAX_LIKES_PER_MINUTE") else (ACTION_DELAY if ACTION_DELAY > 0 else 2.0)
+MAX_LIKES_PER_MINUTE = getattr(config, "MAX_LIKES_PER_MINUTE", int(60 / LIKE_SPACING) if LIKE_SPACING else 30)
+MAX_LIKES_PER_HOUR = getattr(config, "MAX_LIKES_PER_HOUR", 0)
+MAX_LIKES_PER_DAY = getattr(config, "MAX_LIKES_PER_DAY", 0)
+PACING_MAX_WAIT = getattr(config, "PACING_MAX_WAIT", 900)
+CHECKPOINT = getattr(config, "CHECKPOINT", True)
+CHECKPOINT_MAX_AGE = getattr(config, "CHECKPOINT_MAX_AGE", 12)
+API_BATCH_SIZE = getattr(config, "API_BATCH_SIZE", 100)
+DAEMON_IDLE_MINUTES = getattr(config, "DAEMON_IDLE_MINUTES", 60)
+DAEMON_PORT = getattr(config, "DAEMON_PORT", 0)
+API_FEED_INPUT = getattr(config, "API_FEED_INPUT", {"sort": "Newest", "period": "AllTime"})
+FEED_SOURCES = getattr(config, "FEED_SOURCES", [])
 AUTO_WAIT_FOR_USER = getattr(config, "AUTO_WAIT_FOR_USER", True)
+BATCHED_SCAN = getattr(config, "BATCHED_SCAN", True)
+DISCOVERY_MODE = getattr(config, "DISCOVERY_MODE", "scan")
+SCROLL_MIN_TIMEOUT = getattr(config, "SCROLL_MIN_TIMEOUT", 1.0)
+SCROLL_MAX_TIMEOUT = getattr(config, "SCROLL_MAX_TIMEOUT", 10.0)
+MAX_EMPTY_SCROLLS = getattr(config, "MAX_EMPTY_SCROLLS", 20)
+MAX_IDLE_CYCLES = getattr(config, "MAX_IDLE_CYCLES", 25)
+FEED_API_PATTERN = getattr(config, "FEED_API_PATTERN", "image.getInfinite")
+MEMORY_MODE = getattr(config, "MEMORY_MODE", "off")
+MEMORY_CHECK_EVERY = getattr(config, "MEMORY_CHECK_EVERY", 10)
+MEMORY_MAX_HEAP_MB = getattr(config, "MEMORY_MAX_HEAP_MB", 512)
+RECYCLE_AFTER_CARDS = getattr(config, "RECYCLE_AFTER_CARDS", 2000)
+PRUNE_KEEP_SCREENS = getattr(config, "PRUNE_KEEP_SCREENS", 3)
+LOGIN_WATCHER = getattr(config, "LOGIN_WATCHER", True)
+LOGIN_EMAIL_TIMEOUT = getattr(config, "LOGIN_EMAIL_TIMEOUT", 120)
+SESSION_CHECK = getattr(config, "SESSION_CHECK", True)
+SESSION_CHECK_TTL = getattr(config, "SESSION_CHECK_TTL", 300)
+METRICS_EXPORTERS = getattr(config, "METRICS_EXPORTERS", [])
+METRICS_FILE = getattr(config, "METRICS_FILE", "metrics.jsonl")
+METRICS_PORT = getattr(config, "METRICS_PORT", 9464)
+TRACE = getattr(config, "TRACE", False)
+TRACE_FILE = getattr(config, "TRACE_FILE", "liker_trace.json")
+TRACE_PROFILE = getattr(config, "TRACE_PROFILE", False)
+TRACE_PLAYWRIGHT = getattr(config, "TRACE_PLAYWRIGHT", False)
+RESOURCE_FILTER = getattr(config, "RESOURCE_FILTER", False)
+BLOCK_RESOURCE_TYPES = getattr(config, "BLOCK_RESOURCE_TYPES", ["image", "media", "font"])
+BLOCK_EXTRA_DOMAINS = getattr(config, "BLOCK_EXTRA_DOMAINS", [])
+ALLOW_URL_PATTERNS = getattr(config, "ALLOW_URL_PATTERNS", [])
+LIKED_STORE = getattr(config, "LIKED_STORE", "log")
+LIKED_FLUSH_EVERY = getattr(config, "LIKED_FLUSH_EVERY", 20)
+LIKED_FLUSH_INTERVAL = getattr(config, "LIKED_FLUSH_INTERVAL", 5.0)
+LIKED_INDEX_MERGE_EVERY = getattr(config, "LIKED_INDEX_MERGE_EVERY", 50000)
 
 # Updater settings
 UPDATE_BRANCH = getattr(config, "UPDATE_BRANCH", "main")
 AUTO_UPDATE = getattr(config, "AUTO_UPDATE", False)
+UPDATE_CHECK_HOURS = getattr(config, "UPDATE_CHECK_HOURS", 12)
+UPDATE_CHECK_BACKGROUND = getattr(config, "UPDATE_CHECK_BACKGROUND", True)
 
 # Files & URLs
 SESSION_FILE = "civitai_session.json"
+UPDATE_CHECK_FILE = "update_check.json"
+PACING_STATE_FILE = "pacing_state.json"
+CHECKPOINT_FILE = "checkpoint.jsonl"
 LIKED_FILE = "liked_images.json"
+LIKED_STORE_FILES = {
+    "json": LIKED_FILE,
+    "log": "liked_images.log",
+    "sqlite": "liked_images.db",
+    "index": "liked_images.idx",
+}
 LOGIN_FIXED_URL = "https://civitai.com/login?returnUrl=%2Fimages&reason=switch-accounts"
-IMAGES_URL = "https://civitai.com/images?sort=Newest"
+IMAGES_URL = getattr(config, "IMAGES_URL", "https://civitai.com/images?sort=Newest")
+
+# Set to False by the multi-account supervisor (accounts.py): never block on input(),
+# an expired session just ends the run
+INTERACTIVE = True
+
+# Callables (img_id, liked_count) run after every confirmed like, e.g. progress reporting
+LIKE_HOOKS = []
 
 # Selectors
 BUTTON_SELECTOR_PRIMARY = 'button[class*="Reactions_reactionBadge"]'
@@ -63,32 +146,26 @@ def mask_email(email: str) -> str:
     except Exception:
         return "***"
 
-# -------- liked ids helpers --------
-def load_liked_ids():
-    # load previously liked image ids from json
-    if os.path.exists(LIKED_FILE):
+def notify_like(img_id, liked_count):
+    for hook in LIKE_HOOKS:
         try:
-            with open(LIKED_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                return set(map(str, data))
+            hook(img_id, liked_count)
         except Exception as e:
-            print("WARNING: failed to read liked file:", e)
-            return set()
-    return set()
+            log("warning", "like hook failed:", e)
 
-def save_liked_ids_atomic(liked_ids):
-    # atomic write for liked ids file
-    tmp_fd, tmp_path = tempfile.mkstemp(prefix="liked_", suffix=".json", dir=".")
+# -------- liked ids helpers --------
+def load_liked_ids():
+    # open liked ids store (see liked_store.py); old json history is migrated on first start
+    path = LIKED_STORE_FILES.get(LIKED_STORE, LIKED_FILE)
+    options = {"merge_every": LIKED_INDEX_MERGE_EVERY} if LIKED_STORE == "index" else {}
     try:
-        with os.fdopen(tmp_fd, "w", encoding="utf-8") as f:
-            json.dump(list(liked_ids), f, ensure_ascii=False, indent=2)
-        os.replace(tmp_path, LIKED_FILE)
+        return open_liked_store(LIKED_STORE, path, legacy_json=LIKED_FILE,
+                                flush_every=LIKED_FLUSH_EVERY, flush_interval=LIKED_FLUSH_INTERVAL, **options)
     except Exception as e:
-        try:
-            os.remove(tmp_path)
-        except Exception:
-            pass
-        print("WARNING: failed to save liked file:", e)
+        log("warning", "failed to open liked store:", e)
+        log("info", "falling back to", LIKED_FILE)
+        return open_liked_store("json", LIKED_FILE,
+                                flush_every=LIKED_FLUSH_EVERY, flush_interval=LIKED_FLUSH_INTERVAL)
 
 # -------- DOM helpers (image id extraction etc.) --------
 def extract_image_id_from_button(btn):
@@ -125,89 +202,535 @@ def extract_image_id_from_button(btn):
     except Exception:
         return None
 
+LIKE_COUNT_JS = r"""
+node => {
+  try {
+    const t = node.innerText || "";
+    const m = t.match(/(\d+)/);
+    return m ? parseInt(m[1], 10) : 0;
+  } catch(e) { return 0; }
+}
+"""
+# a scanned like count is only a usable baseline for the confirm this long; pacing can hold a card
+# for minutes, and likes from other users in the meantime would look like our click went through
+COUNT_MAX_AGE = 2.0
+
 def get_like_count_from_button(btn):
     # parse numeric like count text from button
-    js = r"""
-    node => {
-      try {
-        const t = node.innerText || "";
-        const m = t.match(/(\d+)/);
-        return m ? parseInt(m[1], 10) : 0;
-      } catch(e) { return 0; }
-    }
-    """
     try:
-        cnt = btn.evaluate(js)
+        cnt = btn.evaluate(LIKE_COUNT_JS)
         return int(cnt or 0)
     except Exception:
         return 0
 
+def fresh_count(card):
+    # the card's scanned like count, None when it is too old (the click path reads it again)
+    scanned = card.get("scanned")
+    if scanned is None or time.monotonic() - scanned > COUNT_MAX_AGE:
+        return None
+    return card.get("count")
+
+# -------- feed scan (one round trip per cycle) --------
+SCAN_CARDS_JS = r"""
+selector => {
+  const parseId = link => {
+    const href = link && link.getAttribute('href');
+    if (!href) return null;
+    const parts = href.split('/').filter(Boolean);
+    return parts.length ? parts[parts.length - 1] : null;
+  };
+  const findId = node => {
+    let el = node;
+    for (let i = 0; i < 6 && el; i++) {
+      if (el.querySelector) {
+        const link = el.querySelector('a[href^="/images/"]');
+        if (link) return parseId(link);
+      }
+      el = el.parentElement;
+    }
+    return parseId(document.querySelector('a[href^="/images/"]'));
+  };
+  const isVisible = node => {
+    const r = node.getBoundingClientRect();
+    if (!r.width || !r.height) return false;
+    return getComputedStyle(node).visibility !== 'hidden';
+  };
+  document.querySelectorAll('[data-cal-idx]').forEach(el => el.removeAttribute('data-cal-idx'));
+  let buttons = Array.from(document.querySelectorAll(selector));
+  if (!buttons.length) {
+    buttons = Array.from(document.querySelectorAll('button'))
+      .filter(b => (b.innerText || '').includes('\u{1F44D}'));
+  }
+  const cards = [];
+  buttons.forEach((btn, index) => {
+    try {
+      const text = btn.innerText || '';
+      if (!text.includes('\u{1F44D}')) return;
+      const m = text.match(/(\d+)/);
+      const dl = (btn.getAttribute('data-liked') || '').toLowerCase();
+      const ap = (btn.getAttribute('aria-pressed') || '').toLowerCase();
+      const imageId = findId(btn);
+      if (!btn.hasAttribute('data-cal-key')) {
+        window.__calKeySeq = (window.__calKeySeq || 0) + 1;
+        btn.setAttribute('data-cal-key', String(window.__calKeySeq));
+      }
+      btn.setAttribute('data-cal-idx', String(index));
+      if (imageId) btn.setAttribute('data-cal-id', imageId);
+      cards.push({
+        key: btn.getAttribute('data-cal-key'),
+        image_id: imageId,
+        count: m ? parseInt(m[1], 10) : 0,
+        liked: dl === 'true' || ap === 'true' || ap === '1',
+        visible: isVisible(btn),
+        index: index,
+      });
+    } catch (e) {}
+  });
+  return cards;
+}
+"""
+
+def scan_feed_cards(page):
+    # single evaluate -> [{image_id, count, liked, visible, index}] for every candidate card
+    try:
+        cards = page.evaluate(SCAN_CARDS_JS, BUTTON_SELECTOR_PRIMARY) or []
+    except Exception as e:
+        log("warning", "feed scan failed:", str(e)[:200])
+        return []
+    now = time.monotonic()
+    for card in cards:
+        card["scanned"] = now
+        if card.get("image_id") is not None:
+            card["image_id"] = str(card["image_id"])
+    return cards
+
+def scan_feed_cards_per_button(page):
+    # old per-button path (several round trips per card); cards carry their own handle
+    buttons = []
+    try:
+        buttons = page.query_selector_all(BUTTON_SELECTOR_PRIMARY)
+    except Exception:
+        buttons = []
+    if not buttons:
+        try:
+            buttons = page.query_selector_all(BUTTON_SELECTOR_FALLBACK)
+        except Exception:
+            buttons = []
+
+    cards = []
+    for index, btn in enumerate(buttons):
+        try:
+            inner = btn.inner_text().strip()
+        except Exception:
+            inner = ""
+        if "👍" not in inner:
+            continue
+        with span("visibility"):
+            try:
+                visible = btn.is_visible()
+            except Exception:
+                visible = True
+        with span("id"):
+            img_id = extract_image_id_from_button(btn)
+        cards.append({
+            "image_id": img_id,
+            "count": get_like_count_from_button(btn),
+            "scanned": time.monotonic(),
+            "liked": False,
+            "visible": visible,
+            "index": index,
+            "handle": btn,
+        })
+    if buttons:
+        # mark them like the batched scan does, so the scroll scheduler and DOM pruning know they were looked at
+        try:
+            page.evaluate("els => els.forEach(b => b.setAttribute('data-cal-seen', '1'))", buttons)
+        except Exception:
+            pass
+    return cards
+
+def get_card_button(page, card):
+    # resolve a DOM handle only for the card we are about to click
+    if card.get("handle") is not None:
+        return card["handle"]
+    id_attr = f'[data-cal-id="{card["image_id"]}"]'
+    try:
+        if card.get("index") is not None:
+            # index + id: a rescan renumbers data-cal-idx, so the index alone can point at another card
+            btn = page.query_selector(f'button[data-cal-idx="{card["index"]}"]{id_attr}')
+            if btn is not None:
+                return btn
+        return page.query_selector(f"button{id_attr}")
+    except Exception:
+        return None
+
+# -------- incremental discovery (DISCOVERY_MODE = "observer") --------
+# init script: a MutationObserver reports only newly inserted reaction buttons to python
+# through an exposed binding, so per-cycle cost follows new content, not total DOM size
+OBSERVER_BINDING = "__calReportCards"
+OBSERVER_JS = r"""
+(() => {
+  if (window.__calObserver) return;
+  const SELECTOR = __SELECTOR__;
+  const LIKE = '\u{1F44D}';
+  const parseId = link => {
+    const href = link && link.getAttribute('href');
+    if (!href) return null;
+    const parts = href.split('/').filter(Boolean);
+    return parts.length ? parts[parts.length - 1] : null;
+  };
+  const findId = node => {
+    let el = node;
+    for (let i = 0; i < 6 && el; i++) {
+      if (el.querySelector) {
+        const link = el.querySelector('a[href^="/images/"]');
+        if (link) return parseId(link);
+      }
+      el = el.parentElement;
+    }
+    return null;
+  };
+  let queue = [];
+  let timer = null;
+  const collect = root => {
+    if (!root.querySelectorAll) return;
+    const found = root.matches && root.matches('button') ? [root] : [];
+    root.querySelectorAll('button').forEach(b => found.push(b));
+    for (const btn of found) {
+      if (btn.hasAttribute('data-cal-seen')) continue;
+      if (!btn.matches(SELECTOR) && !(btn.innerText || '').includes(LIKE)) continue;
+      queue.push(btn);
+    }
+    if (queue.length && !timer) timer = setTimeout(flush, 100);
+  };
+  const flush = () => {
+    timer = null;
+    const batch = [];
+    for (const btn of queue) {
+      if (!btn.isConnected || btn.hasAttribute('data-cal-seen')) continue;
+      // every looked-at button is marked, also the skipped ones: the scroll scheduler counts
+      // unmarked buttons as new cards
+      btn.setAttribute('data-cal-seen', '1');
+      const text = btn.innerText || '';
+      if (!text.includes(LIKE)) continue;
+      const imageId = findId(btn);
+      if (!imageId) continue;
+      btn.setAttribute('data-cal-id', imageId);
+      const m = text.match(/(\d+)/);
+      const dl = (btn.getAttribute('data-liked') || '').toLowerCase();
+      const ap = (btn.getAttribute('aria-pressed') || '').toLowerCase();
+      const r = btn.getBoundingClientRect();
+      batch.push({
+        image_id: imageId,
+        count: m ? parseInt(m[1], 10) : 0,
+        liked: dl === 'true' || ap === 'true' || ap === '1',
+        visible: !!(r.width && r.height) && getComputedStyle(btn).visibility !== 'hidden',
+      });
+    }
+    queue = [];
+    if (batch.length) window[__BINDING__](batch);
+  };
+  const start = () => {
+    window.__calObserver = new MutationObserver(records => {
+      for (const rec of records) rec.addedNodes.forEach(collect);
+    });
+    window.__calObserver.observe(document.body, {childList: true, subtree: true});
+    collect(document.body);
+  };
+  if (document.body) start(); else document.addEventListener('DOMContentLoaded', start);
+})();
+"""
+
+class ObserverFeed:
+    # collects cards pushed by OBSERVER_JS; bindings are delivered while python waits
+    # inside a playwright call, so loops using this feed wait with page.wait_for_timeout
+
+    def __init__(self):
+        self.pending = deque()
+        self.seen = set()
+        self.retries = {}  # image id -> card handed back by retry(), reported again by take()
+
+    def install(self, page):
+        # must run before the feed is (re)loaded
+        page.expose_binding(OBSERVER_BINDING, self._on_cards)
+        js = OBSERVER_JS.replace("__SELECTOR__", json.dumps(BUTTON_SELECTOR_PRIMARY))
+        page.add_init_script(js.replace("__BINDING__", json.dumps(OBSERVER_BINDING)))
+
+    def _on_cards(self, source, cards):
+        for card in cards or []:
+            img_id = str(card.get("image_id") or "")
+            if not img_id or img_id in self.seen:
+                # virtualized lists re-insert nodes when scrolling back
+                continue
+            self.seen.add(img_id)
+            self.retries.pop(img_id, None)  # the fresh report replaces the one waiting to be retried
+            card["image_id"] = img_id
+            card["scanned"] = time.monotonic()
+            self.pending.append(card)
+
+    def forget(self, img_id):
+        # skipped card (hidden / detached): reported again if its node is re-inserted
+        self.seen.discard(img_id)
+
+    def retry(self, card):
+        # the observer reports a button once; a card whose like failed (or is waiting for its retry)
+        # is kept here and comes back with every take() until the card cache lets it through
+        self.forget(card["image_id"])
+        self.retries[card["image_id"]] = card
+
+    def take(self):
+        cards = list(self.pending)
+        fresh = {card["image_id"] for card in cards}
+        cards += [card for img_id, card in self.retries.items() if img_id not in fresh]
+        self.pending.clear()
+        self.retries.clear()
+        return cards
+
+def card_cache_key(card):
+    # image id, or a stable per-element key for cards without one (None = don't cache)
+    if card.get("image_id"):
+        return card["image_id"]
+    return "el:" + card["key"] if card.get("key") else None
+
+def make_scroll_scheduler():
+    return ScrollScheduler(BUTTON_SELECTOR_PRIMARY, FEED_API_PATTERN,
+                           min_timeout=SCROLL_MIN_TIMEOUT, max_timeout=SCROLL_MAX_TIMEOUT)
+
+def make_memory_guard():
+    return MemoryGuard(MEMORY_MODE, MEMORY_CHECK_EVERY, MEMORY_MAX_HEAP_MB, RECYCLE_AFTER_CARDS, PRUNE_KEEP_SCREENS)
+
+def make_pacer():
+    # one pacer per run; budgets and backoff carry over between runs through PACING_STATE_FILE
+    return Pacer(MAX_LIKES_PER_MINUTE, MAX_LIKES_PER_HOUR, MAX_LIKES_PER_DAY,
+                 state_file=PACING_STATE_FILE, max_wait=PACING_MAX_WAIT, min_interval=LIKE_SPACING,
+                 api_host=urlsplit(IMAGES_URL).hostname, api_patterns=(REACTION_API_PATTERN, FEED_API_PATTERN))
+
+def open_journal(liked_ids):
+    # checkpoint journal (checkpoint.py): resume position + in-flight likes; a no-op one when CHECKPOINT is off
+    try:
+        # end entries are synced on the liked store's group commit schedule
+        return open_checkpoint(CHECKPOINT_FILE if CHECKPOINT else None, liked_ids, CHECKPOINT_MAX_AGE * 3600,
+                               sync_every=LIKED_FLUSH_EVERY, sync_interval=LIKED_FLUSH_INTERVAL)
+    except Exception as e:
+        log("warning", "failed to open checkpoint journal:", e)
+        return open_checkpoint(None, liked_ids)
+
+def pace(pacer, page):
+    # wait for the like budget; False = it does not allow another like within PACING_MAX_WAIT
+    delay = pacer.reserve()
+    if delay is None:
+        return False
+    if delay > 0:
+        idle_wait(page, delay)
+    return True
+
+def idle_wait(page, seconds):
+    # like time.sleep, but keeps playwright events (exposed bindings) flowing
+    try:
+        page.wait_for_timeout(seconds * 1000)
+    except Exception:
+        time.sleep(seconds)
+
 # -------- click + confirm --------
-def click_and_confirm_like(btn, timeout=LIKE_CONFIRM_TIMEOUT, retries=CLICK_RETRY):
-    # click reaction button and confirm via attributes or count change
+# resolves in-page as soon as the button flips to liked (MutationObserver), or false on timeout;
+# watches the parent too because React may swap the button node on re-render
+CONFIRM_LIKE_JS = r"""
+(node, [initial, timeoutMs]) => new Promise(resolve => {
+  const root = node.parentElement || node;
+  const current = () => (node.isConnected ? node : root.querySelector('button')) || node;
+  const liked = () => {
+    try {
+      const btn = current();
+      const dl = (btn.getAttribute('data-liked') || '').toLowerCase();
+      if (dl === 'true') return true;
+      const ap = (btn.getAttribute('aria-pressed') || '').toLowerCase();
+      if (ap === 'true' || ap === '1') return true;
+      const al = (btn.getAttribute('aria-label') || '').toLowerCase();
+      if (al.includes('un')) return true;
+      if (initial !== null) {
+        const m = (btn.innerText || '').match(/(\d+)/);
+        if ((m ? parseInt(m[1], 10) : 0) > initial) return true;
+      }
+    } catch (e) {}
+    return false;
+  };
+  if (liked()) return resolve(true);
+  let timer = null;
+  const observer = new MutationObserver(() => { if (liked()) done(true); });
+  const done = value => { observer.disconnect(); clearTimeout(timer); resolve(value); };
+  observer.observe(root, {attributes: true, childList: true, characterData: true, subtree: true});
+  timer = setTimeout(() => done(liked()), timeoutMs);
+})
+"""
+
+def wait_for_like_state(btn, initial_count, timeout):
+    # one round trip: the promise settles on the first matching DOM mutation
     try:
-        initial_count = get_like_count_from_button(btn)
+        return bool(btn.evaluate(CONFIRM_LIKE_JS, [initial_count, int(timeout * 1000)]))
+    except Exception as e:
+        log("warning", "like confirmation error:", str(e)[:200])
+        return False
+
+def is_reaction_response(response, img_id):
+    # reaction toggle request for this image? (trpc body looks like {"json":{"entityId":123,...}})
+    try:
+        if REACTION_API_PATTERN not in response.url:
+            return False
+        if not img_id:
+            return True
+        body = response.request.post_data or ""
+        return re.search(r'"entityId"\s*:\s*"?' + re.escape(str(img_id)) + r'\b', body + response.url) is not None
     except Exception:
-        initial_count = None
+        return False
+
+def click_and_confirm_via_network(btn, img_id, timeout=LIKE_CONFIRM_TIMEOUT, retries=CLICK_RETRY):
+    # click and wait for the reaction api response; a 2xx is the confirmation, no DOM polling
+    # returns (ok, status) - status is None when no matching request was seen
+    try:
+        page = btn.owner_frame().page
+    except Exception as e:
+        log("warning", "cannot resolve page for network confirmation:", e)
+        return False, None
 
     for attempt in range(retries + 1):
         try:
-            btn.scroll_into_view_if_needed()
-            time.sleep(0.12)
-            btn.click()
+            with span("click", attempt=attempt, confirm="network"):
+                btn.scroll_into_view_if_needed()
+                with page.expect_response(lambda r: is_reaction_response(r, img_id), timeout=timeout * 1000) as info:
+                    btn.click()
+                response = info.value
+        except PlaywrightTimeoutError:
+            # no request left the page -> nothing was toggled, safe to click again
+            if attempt < retries:
+                log("warning", f"no reaction request seen for img {img_id}, retrying click...")
+                time.sleep(0.5 + attempt)
+                continue
+            return False, None
         except Exception as e:
-            print("WARNING: btn.click() exception:", e)
+            log("warning", "btn.click() exception:", e)
+            if attempt == retries:
+                return False, None
+            time.sleep(0.5 * (attempt + 1))
+            continue
+
+        if response.ok:
+            return True, response.status
+        # request reached the server and was rejected; clicking again could toggle it back
+        log("warning", f"reaction request for img {img_id} failed with HTTP {response.status}")
+        return False, response.status
+    return False, None
+
+def click_and_confirm_like(btn, timeout=LIKE_CONFIRM_TIMEOUT, retries=CLICK_RETRY, initial_count=None, img_id=None):
+    # click reaction button and confirm via attributes or count change
+    # initial_count can be passed in from the feed scan to skip one evaluate
+    if CONFIRM_MODE == "network":
+        ok, _ = click_and_confirm_via_network(btn, img_id, timeout=timeout, retries=retries)
+        return ok
+
+    if initial_count is None:
+        try:
+            initial_count = get_like_count_from_button(btn)
+        except Exception:
+            initial_count = None
+
+    for attempt in range(retries + 1):
+        try:
+            with span("click", attempt=attempt):
+                btn.scroll_into_view_if_needed()
+                time.sleep(0.12)
+                btn.click()
+        except Exception as e:
+            log("warning", "btn.click() exception:", e)
             if attempt == retries:
                 return False
             time.sleep(0.5 * (attempt + 1))
             continue
 
-        start = time.time()
-        while time.time() - start < timeout:
-            try:
-                dl = btn.get_attribute("data-liked")
-                if dl and str(dl).lower() == "true":
-                    return True
-                ap = btn.get_attribute("aria-pressed")
-                if ap and str(ap).lower() in ("true", "1"):
-                    return True
-                al = btn.get_attribute("aria-label")
-                if al and "un" in al.lower():
-                    return True
-                if initial_count is not None:
-                    new_count = get_like_count_from_button(btn)
-                    if isinstance(new_count, int) and new_count > initial_count:
-                        return True
-            except Exception:
-                pass
-            time.sleep(0.25)
+        with span("confirm", attempt=attempt) as confirm:
+            confirmed = wait_for_like_state(btn, initial_count, timeout)
+            confirm.set(confirmed=confirmed)
+        if confirmed:
+            return True
 
         if attempt < retries:
-            print("WARNING: confirmation failed, retrying click...")
+            log("warning", "confirmation failed, retrying click...")
             time.sleep(0.5 + attempt)
             continue
         return False
     return False
 
+# -------- request filtering --------
+resource_filter = None
+
+def get_resource_filter():
+    # one filter per process so counters cover every context of the run
+    global resource_filter
+    if resource_filter is None:
+        from resource_filter import ResourceFilter, DEFAULT_BLOCK_DOMAINS, DEFAULT_ALLOW_PATTERNS
+        resource_filter = ResourceFilter(
+            block_types=BLOCK_RESOURCE_TYPES,
+            block_domains=tuple(DEFAULT_BLOCK_DOMAINS) + tuple(BLOCK_EXTRA_DOMAINS),
+            allow_patterns=tuple(DEFAULT_ALLOW_PATTERNS) + tuple(ALLOW_URL_PATTERNS),
+        )
+    return resource_filter
+
+def install_resource_filter(context):
+    # RESOURCE_FILTER: block/stub media, fonts and trackers for this context (see resource_filter.py)
+    if not RESOURCE_FILTER or context is None:
+        return None
+    try:
+        return get_resource_filter().install(context)
+    except Exception as e:
+        log("warning", "failed to install resource filter:", e)
+        return None
+
+def print_resource_filter_summary():
+    if resource_filter is not None:
+        log("info", resource_filter.summary())
+
 # -------- session saving helper --------
 def save_session_state(context):
     # save Playwright storage state to file
     try:
         context.storage_state(path=SESSION_FILE)
-        print("INFO: session saved to", SESSION_FILE)
+        log("info", "session saved to", SESSION_FILE)
     except Exception as e:
-        print("WARNING: failed to save session:", e)
+        log("warning", "failed to save session:", e)
 
 # -------- session validation and manual-login flow --------
+def session_precheck():
+    # SESSION_CHECK: True / False from cookies or /api/auth/session without a browser, None = unknown
+    if not SESSION_CHECK or not os.path.exists(SESSION_FILE):
+        return None
+    started = time.monotonic()
+    parts = urlsplit(IMAGES_URL)
+    with timer("session_check"):
+        valid = check_session(SESSION_FILE, f"{parts.scheme}://{parts.netloc}", SESSION_CHECK_TTL)
+    verdict = {True: "valid", False: "expired", None: "unknown"}[valid]
+    log("info", f"session pre-check: {verdict} ({(time.monotonic() - started) * 1000:.0f} ms)",
+        event="session_check", verdict=verdict)
+    return valid
+
 def ensure_valid_session(playwright):
     # Try to restore session. If invalid -> open system browser to login URL and WAIT for user.
+    valid = session_precheck()
+    if valid is False and not INTERACTIVE:
+        log("error", "no valid session and manual login is disabled (non-interactive run).")
+        return None, None, None
     browser = playwright.chromium.launch(headless=HEADLESS_MODE)
     # try to restore saved session
-    if os.path.exists(SESSION_FILE):
+    if valid is False:
+        log("info", "saved session is expired; skipping the feed check.")
+    elif os.path.exists(SESSION_FILE):
         try:
             context = browser.new_context(storage_state=SESSION_FILE,
                                           viewport={"width": 1366, "height": 768})
+            install_resource_filter(context)
             page = context.new_page()
+            if valid:
+                # pre-check already confirmed it; the like loop opens the feed itself
+                log("info", "loaded session from", SESSION_FILE)
+                return browser, context, page
             try:
                 page.goto(IMAGES_URL, wait_until="domcontentloaded", timeout=15000)
             except Exception:
@@ -218,18 +741,38 @@ def ensure_valid_session(playwright):
             except Exception:
                 signin = None
             if signin:
-                print("INFO: saved session appears expired or invalid.")
+                log("info", "saved session appears expired or invalid.")
             else:
-                print("INFO: loaded session from", SESSION_FILE)
+                log("info", "loaded session from", SESSION_FILE)
                 return browser, context, page
         except Exception as e:
-            print("WARNING: failed to load saved session:", e)
+            log("warning", "failed to load saved session:", e)
+
+    if not INTERACTIVE:
+        log("error", "no valid session and manual login is disabled (non-interactive run).")
+        try:
+            browser.close()
+        except Exception:
+            pass
+        return browser, None, None
+
+    import webbrowser
+    from email_processor import get_civitai_login_link
+    from login_watcher import start_watcher
+
+    # watch the inbox while the user is busy in the browser, so the link is there when they are done
+    watcher = None
+    if LOGIN_WATCHER:
+        try:
+            watcher = start_watcher(timeout=LOGIN_EMAIL_TIMEOUT + 600)
+        except Exception as e:
+            log("warning", "could not start the login email watcher:", e)
 
     # no valid session -> open system browser and wait for user to complete login
     try:
-        print("INFO: no valid session found. Opening system browser for manual login:", LOGIN_FIXED_URL)
+        log("info", "no valid session found. Opening system browser for manual login:", LOGIN_FIXED_URL)
         webbrowser.open(LOGIN_FIXED_URL)
-        print("INFO: Please complete login (solve CAPTCHA if present) in your system browser.")
+        log("info", "Please complete login (solve CAPTCHA if present) in your system browser.")
         input("After you finished logging in in your browser press Enter here to continue...")
     except KeyboardInterrupt:
         print("\nINFO: interrupted by user during manual login wait.")
@@ -242,33 +785,44 @@ def ensure_valid_session(playwright):
         except SystemExit:
             os._exit(0)
     except Exception as e:
-        print("WARNING: failed to open system browser:", e)
+        log("warning", "failed to open system browser:", e)
+        if watcher is not None:
+            watcher.stop()
         try:
             browser.close()
         except Exception:
             pass
         return browser, None, None
 
-    # user signaled ready -> attempt to fetch magic link from email and complete login in Playwright
-    # try multiple attempts (small loop) because email delivery may be delayed
-    attempts = 6
-    wait_between_attempts = 5  # seconds
+    # user signaled ready -> take the magic link from the watcher (or fetch it from email) and complete login in Playwright
     login_link = None
+    if watcher is not None:
+        log("info", "waiting for the login email...")
+        with timer("email_fetch"):
+            login_link = watcher.wait(LOGIN_EMAIL_TIMEOUT)
+        watcher.stop()
+        if login_link:
+            log("info", "login link retrieved from email.")
+
+    # fallback: try multiple attempts (small loop) because email delivery may be delayed
+    attempts = 0 if login_link else 6
+    wait_between_attempts = 5  # seconds
     for i in range(attempts):
         try:
-            print(f"INFO: attempting to fetch login email (attempt {i+1}/{attempts})...")
-            login_link = get_civitai_login_link()
+            log("info", f"attempting to fetch login email (attempt {i+1}/{attempts})...")
+            with timer("email_fetch"):
+                login_link = get_civitai_login_link()
             if login_link:
-                print("INFO: login link retrieved from email.")
+                log("info", "login link retrieved from email.")
                 break
         except Exception as e:
-            print("INFO: login link not found yet:", str(e))
+            log("info", "login link not found yet:", str(e))
         if i < attempts - 1:
-            print(f"INFO: waiting {wait_between_attempts} seconds before next email check...")
+            log("info", f"waiting {wait_between_attempts} seconds before next email check...")
             time.sleep(wait_between_attempts)
 
     if not login_link:
-        print("ERROR: could not obtain login link from email after multiple attempts. Aborting manual flow.")
+        log("error", "could not obtain login link from email after multiple attempts. Aborting manual flow.")
         try:
             browser.close()
         except Exception:
@@ -279,15 +833,16 @@ def ensure_valid_session(playwright):
     # open the magic link inside Playwright context to finalize login and save session
     try:
         context = browser.new_context(viewport={"width": 1366, "height": 768})
+        install_resource_filter(context)
         page = context.new_page()
-        print("INFO: opening magic login link inside Playwright to finalize session...")
+        log("info", "opening magic login link inside Playwright to finalize session...")
         try:
             page.goto(login_link, wait_until="domcontentloaded", timeout=20000)
         except Exception:
             try:
                 page.goto(login_link)
             except Exception as e:
-                print("ERROR: failed to open login link inside Playwright:", e)
+                log("error", "failed to open login link inside Playwright:", e)
                 try:
                     browser.close()
                 except Exception:
@@ -305,10 +860,10 @@ def ensure_valid_session(playwright):
             page.goto(IMAGES_URL, wait_until="domcontentloaded", timeout=15000)
         except Exception:
             pass
-        print("INFO: manual login flow complete, session saved.")
+        log("info", "manual login flow complete, session saved.")
         return browser, context, page
     except Exception as e:
-        print("ERROR: completing login in Playwright failed:", e)
+        log("error", "completing login in Playwright failed:", e)
         try:
             browser.close()
         except Exception:
@@ -327,9 +882,53 @@ def get_remote_origin_url():
     except Exception:
         return None
 
+def read_local_commit(branch):
+    # commit of refs/heads/<branch> straight from .git (loose ref or packed-refs), no git process
+    try:
+        with open(os.path.join(".git", "refs", "heads", branch), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        pass
+    try:
+        with open(os.path.join(".git", "packed-refs"), "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2 and parts[1] == f"refs/heads/{branch}":
+                    return parts[0]
+    except OSError:
+        pass
+    return None
+
+def read_update_cache(branch):
+    # -> (local, remote) from the last check, or None when it is too old / for another branch / local moved
+    if UPDATE_CHECK_HOURS <= 0:
+        return None
+    try:
+        with open(UPDATE_CHECK_FILE, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cached, dict) or cached.get("branch") != branch:
+        return None
+    if time.time() - cached.get("checked_at", 0) > UPDATE_CHECK_HOURS * 3600:
+        return None
+    local = read_local_commit(branch)
+    if not local or local != cached.get("local") or not cached.get("remote"):
+        return None
+    return local, cached["remote"]
+
+def write_update_cache(branch, local, remote):
+    try:
+        with open(UPDATE_CHECK_FILE, "w", encoding="utf-8") as f:
+            json.dump({"branch": branch, "local": local, "remote": remote, "checked_at": time.time()}, f)
+    except OSError:
+        pass
+
 def current_and_remote_branch_commits(branch):
     try:
-        subprocess.run(["git", "fetch", "origin"], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        # no credential prompt: the check may run in the background next to the browser
+        subprocess.run(["git", "fetch", "origin"], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                       env=dict(os.environ, GIT_TERMINAL_PROMPT="0"), timeout=120)
         try:
             r1 = subprocess.run(["git", "rev-parse", branch], check=True, capture_output=True, text=True)
             local = r1.stdout.strip()
@@ -345,23 +944,33 @@ def current_and_remote_branch_commits(branch):
     except Exception:
         return None, None
 
-def check_for_updates_branch_based():
+def check_for_updates_branch_based(use_cache=True):
+    # git fetch + compare at most every UPDATE_CHECK_HOURS; in between the cached remote commit is used
     if not is_git_repo():
-        print("INFO: not a git repository; update check skipped")
-        return False
-    local, remote = current_and_remote_branch_commits(UPDATE_BRANCH)
-    if not local or not remote:
-        print("INFO: could not determine branch commits; skipping update check")
+        log("info", "not a git repository; update check skipped")
         return False
+    cached = read_update_cache(UPDATE_BRANCH) if use_cache else None
+    if cached:
+        local, remote = cached
+    else:
+        local, remote = current_and_remote_branch_commits(UPDATE_BRANCH)
+        if not local or not remote:
+            log("info", "could not determine branch commits; skipping update check")
+            return False
+        write_update_cache(UPDATE_BRANCH, local, remote)
     if local != remote:
-        print(f"INFO: update available on branch '{UPDATE_BRANCH}' (local != origin/{UPDATE_BRANCH})")
+        log("info", f"update available on branch '{UPDATE_BRANCH}' (local != origin/{UPDATE_BRANCH})")
         return True
-    print(f"INFO: no updates found on branch '{UPDATE_BRANCH}'")
+    log("info", f"no updates found on branch '{UPDATE_BRANCH}'")
     return False
 
-def perform_branch_update_and_restart():
+def perform_branch_update_and_restart(restart=True):
+    # restart=False: just pull, the new code is used from the next launch on
+    import shutil
+    import tempfile
+    from pathlib import Path
     if not is_git_repo():
-        print("WARNING: not a git repository; cannot perform branch update")
+        log("warning", "not a git repository; cannot perform branch update")
         return False
     cfg_path = Path("config.py")
     backup_path = None
@@ -370,26 +979,29 @@ def perform_branch_update_and_restart():
             backup_dir = Path(tempfile.mkdtemp(prefix="cfg_backup_"))
             backup_path = backup_dir / "config.py"
             shutil.copy2(cfg_path, backup_path)
-            print("INFO: config.py backed up to", str(backup_path))
-        print(f"INFO: fetching origin and switching to branch '{UPDATE_BRANCH}'...")
+            log("info", "config.py backed up to", str(backup_path))
+        log("info", f"fetching origin and switching to branch '{UPDATE_BRANCH}'...")
         subprocess.run(["git", "fetch", "origin"], check=True)
         try:
             subprocess.run(["git", "checkout", UPDATE_BRANCH], check=True)
         except Exception:
             subprocess.run(["git", "checkout", "-b", UPDATE_BRANCH, f"origin/{UPDATE_BRANCH}"], check=True)
         subprocess.run(["git", "pull", "origin", UPDATE_BRANCH], check=True)
-        print("INFO: git pull completed")
+        log("info", "git pull completed")
         if backup_path and backup_path.exists():
             shutil.copy2(backup_path, cfg_path)
-            print("INFO: config.py restored from backup")
-        print("INFO: restarting script with updated code...")
+            log("info", "config.py restored from backup")
+        if not restart:
+            log("info", "update installed; it takes effect on the next run")
+            return True
+        log("info", "restarting script with updated code...")
         os.execv(sys.executable, [sys.executable] + sys.argv)
     except Exception as e:
-        print("ERROR: update failed:", e)
+        log("error", "update failed:", e)
         try:
             if backup_path and backup_path.exists():
                 shutil.copy2(backup_path, cfg_path)
-                print("INFO: config.py restored after failure")
+                log("info", "config.py restored after failure")
         except Exception:
             pass
         return False
@@ -400,21 +1012,57 @@ def perform_branch_update_and_restart():
         except Exception:
             pass
 
+def prompt_and_update(restart=True):
+    if AUTO_UPDATE:
+        log("info", "AUTO_UPDATE enabled; performing update now...")
+        return perform_branch_update_and_restart(restart)
+    if not INTERACTIVE:
+        log("info", f"update available on branch '{UPDATE_BRANCH}'; run interactively or set AUTO_UPDATE to install it")
+        return False
+    ans = input(f"Update available on branch '{UPDATE_BRANCH}'. Update now? [Y/n]: ").strip().lower()
+    if ans in ("", "y", "yes"):
+        return perform_branch_update_and_restart(restart)
+    log("info", "update skipped by user.")
+    return False
+
 def check_and_prompt_update_branch_flow():
     try:
         available = check_for_updates_branch_based()
         if not available:
             return False
-        if AUTO_UPDATE:
-            print("INFO: AUTO_UPDATE enabled; performing update now...")
-            return perform_branch_update_and_restart()
-        ans = input(f"Update available on branch '{UPDATE_BRANCH}'. Update now? [Y/n]: ").strip().lower()
-        if ans in ("", "y", "yes"):
-            return perform_branch_update_and_restart()
-        print("INFO: update skipped by user.")
+        return prompt_and_update()
+    except Exception as e:
+        log("warning", "update check failed:", e)
         return False
+
+# -------- background update check (UPDATE_CHECK_BACKGROUND) --------
+def start_update_check():
+    # git fetch runs next to the browser launch instead of in front of it; see finish_update_check
+    thread = threading.Thread(target=run_update_check, name="update-check", daemon=True)
+    thread.available = None
+    thread.start()
+    return thread
+
+def run_update_check():
+    thread = threading.current_thread()
+    try:
+        thread.available = check_for_updates_branch_based()
     except Exception as e:
-        print("WARNING: update check failed:", e)
+        log("warning", "update check failed:", e)
+        thread.available = False
+
+def finish_update_check(thread, timeout=15.0):
+    # after the run: offer the update found in the background (installed for the next launch)
+    thread.join(timeout)
+    if thread.is_alive():
+        log("info", "update check still running; skipped for this run")
+        return False
+    if not thread.available:
+        return False
+    try:
+        return prompt_and_update(restart=False)
+    except Exception as e:
+        log("warning", "update failed:", e)
         return False
 
 # -------- open reactions panel (keeps previous behavior) --------
@@ -428,7 +1076,7 @@ def WAIT_FOR_USER_RESPONSE():
         except SystemExit:
             os._exit(0)
 
-def open_reactions_panel(page):
+def open_reactions_panel(page, allow_wait=True):
     try:
         btn = None
         try:
@@ -453,15 +1101,15 @@ def open_reactions_panel(page):
                 btn.scroll_into_view_if_needed()
                 time.sleep(0.12)
                 btn.click()
-                print("INFO: reactions panel button clicked")
+                log("info", "reactions panel button clicked")
                 time.sleep(ACTION_DELAY)
                 return True
             except Exception as e:
-                print("WARNING: error clicking reactions panel button:", e)
+                log("warning", "error clicking reactions panel button:", e)
                 return False
 
-        if AUTO_WAIT_FOR_USER:
-            print("INFO: reactions panel button not found automatically; waiting for user action...")
+        if AUTO_WAIT_FOR_USER and allow_wait:
+            log("info", "reactions panel button not found automatically; waiting for user action...")
             WAIT_FOR_USER_RESPONSE()
             try:
                 btn2 = page.query_selector(REACTIONS_PANEL_SVG) or page.query_selector(REACTIONS_PANEL_BUTTON)
@@ -471,7 +1119,7 @@ def open_reactions_panel(page):
                         time.sleep(0.12)
                         try:
                             btn2.click()
-                            print("INFO: reactions panel button clicked after user action")
+                            log("info", "reactions panel button clicked after user action")
                         except Exception:
                             pass
                     except Exception:
@@ -480,133 +1128,330 @@ def open_reactions_panel(page):
                     return True
             except Exception:
                 pass
-            print("INFO: reactions panel still not found after user action; proceeding")
+            log("info", "reactions panel still not found after user action; proceeding")
             return False
         else:
-            print("INFO: reactions panel button not found; proceeding without opening it")
+            log("info", "reactions panel button not found; proceeding without opening it")
             return False
 
     except Exception as e:
-        print("WARNING: open_reactions_panel error:", e)
+        log("warning", "open_reactions_panel error:", e)
         return False
 
+# -------- page recycling (MEMORY_MODE = "recycle") --------
+def recycle_page(context, page, tracker, feed=None, url=None):
+    # fresh page that resumes at the same feed cursor; the old page and its DOM are dropped
+    cursor = tracker.current()
+    try:
+        new_page = context.new_page()
+    except Exception as e:
+        log("warning", "failed to open a new page for recycling:", e)
+        return page
+    tracker.attach(new_page)
+    if feed is not None:
+        try:
+            feed.install(new_page)
+        except Exception as e:
+            log("warning", "failed to install card observer on new page:", e)
+    try:
+        tracker.resume_from(new_page, cursor)
+    except Exception as e:
+        log("warning", "failed to install feed cursor resume:", e)
+    try:
+        new_page.goto(url or IMAGES_URL, wait_until="domcontentloaded")
+    except Exception:
+        pass
+    open_reactions_panel(new_page, allow_wait=False)
+    try:
+        page.close()
+    except Exception:
+        pass
+    log("info", f"page recycled, resuming feed at cursor {cursor}")
+    return new_page
+
 # -------- Main liking routine --------
 def auto_like_images():
-    print("INFO: Starting CivitAI Auto Liker")
-    print(f"INFO: Account: {mask_email(YOUR_EMAIL)}")
+    metrics.setup(METRICS_EXPORTERS, METRICS_FILE, METRICS_PORT)
+    if TRACE:
+        tracing.start(TRACE_FILE, profile=TRACE_PROFILE, playwright=TRACE_PLAYWRIGHT)
+    log("info", "Starting CivitAI Auto Liker")
+    log("info", f"Account: {mask_email(YOUR_EMAIL)}")
 
-    liked_ids = load_liked_ids()
-    print(f"INFO: loaded {len(liked_ids)} previously liked image ids")
+    with timer("load_liked"):
+        liked_ids = load_liked_ids()
+    log("info", f"loaded {len(liked_ids)} previously liked image ids")
 
-    with sync_playwright() as p:
-        # ensure session; if not present this function will open system browser and WAIT for user,
-        # then attempt to fetch magic link and finalize login inside Playwright
-        browser, context, page = ensure_valid_session(p)
+    # returns number of new likes, or None when no session could be established
+    try:
+        if ENGINE == "api":
+            result = run_api_engine(liked_ids)
+            if result is not None:
+                return result
+        elif ENGINE == "async" or PAGE_WORKERS > 1 or len(FEED_SOURCES) > 1:
+            result = run_async_engine(liked_ids)
+            if result is not None:
+                return result
+        return run_liker(liked_ids)
+    finally:
+        liked_ids.close()
+        tracing.stop()
+        metrics.shutdown()
 
-        if context is None or page is None:
-            print("ERROR: no active Playwright context/page after login flow. Exiting.")
-            try:
-                if browser:
-                    browser.close()
-            except Exception:
-                pass
-            return
+def run_async_engine(liked_ids):
+    # asyncio pipeline (async_engine.py); None means no usable saved session -> sync login flow
+    # several FEED_SOURCES get a page each (one page can show one feed)
+    import asyncio
+    from async_engine import run_async_liker
+    workers = PAGE_WORKERS if WORKER_FEED_URLS else max(PAGE_WORKERS, len(FEED_SOURCES))
+    result = asyncio.run(run_async_liker(liked_ids, TARGET_LIKES, ASYNC_QUEUE_SIZE, workers=workers,
+                                         feed_urls=WORKER_FEED_URLS))
+    if result is None:
+        log("info", "async engine could not restore a session; continuing with the sync login flow")
+    return result
+
+def run_api_engine(liked_ids):
+    # browserless liker (api_engine.py); None means no usable saved session -> sync login flow
+    from api_engine import run_api_liker
+    result = run_api_liker(liked_ids, TARGET_LIKES, API_BATCH_SIZE, API_FEED_INPUT)
+    if result is None:
+        log("info", "api engine could not use a saved session; continuing with the sync login flow")
+    return result
+
+def sync_feed_url():
+    # the one page of the sync loop shows the first FEED_SOURCES entry (heaviest first), else IMAGES_URL
+    if not FEED_SOURCES:
+        return IMAGES_URL
+    from feed_sources import load_sources, source_urls
+    return source_urls(load_sources(FEED_SOURCES), IMAGES_URL, 1)[0]
 
+def like_feed(context, page, liked_ids, target=None):
+    # the like loop on an already logged-in page; used by run_liker and the warm daemon (liker_daemon.py)
+    if target is None:
+        target = TARGET_LIKES
+    feed_url = sync_feed_url()
+    feed = None
+    if DISCOVERY_MODE == "observer":
         try:
-            page.goto(IMAGES_URL, wait_until="domcontentloaded")
-        except Exception:
-            pass
+            feed = ObserverFeed()
+            feed.install(page)
+        except Exception as e:
+            log("warning", "failed to install card observer, falling back to scanning:", e)
+            feed = None
 
-        clicked = open_reactions_panel(page)
-        if not clicked and AUTO_WAIT_FOR_USER:
-            pass
+    tracker = FeedCursorTracker(FEED_API_PATTERN, track_batches=CHECKPOINT)
+    tracker.attach(page)
+    journal = open_journal(liked_ids)
+    resume = journal.resume_cursor(feed_url)
+    if resume is not None:
+        try:
+            tracker.resume_from(page, resume)
+            log("info", f"resuming the feed at the checkpoint (cursor {resume})")
+        except Exception as e:
+            log("warning", "failed to install checkpoint resume:", e)
 
-        liked_count = 0
-        attempts_without_progress = 0
-        print(f"INFO: target new likes this run: {TARGET_LIKES}")
+    try:
+        page.goto(feed_url, wait_until="domcontentloaded")
+    except Exception:
+        pass
 
-        while liked_count < TARGET_LIKES:
-            buttons = []
-            try:
-                buttons = page.query_selector_all(BUTTON_SELECTOR_PRIMARY)
-            except Exception:
-                buttons = []
-            if not buttons:
-                try:
-                    buttons = page.query_selector_all(BUTTON_SELECTOR_FALLBACK)
-                except Exception:
-                    buttons = []
-
-            if not buttons:
-                print("INFO: no reaction buttons in view — scrolling to load more")
-                page.evaluate("window.scrollBy(0, window.innerHeight * 1.3)")
-                time.sleep(1.5 + random.random())
-                attempts_without_progress += 1
-                if attempts_without_progress > 20:
-                    print("WARNING: too many empty scrolls — aborting")
-                    break
-                continue
+    clicked = open_reactions_panel(page)
+    if not clicked and AUTO_WAIT_FOR_USER:
+        pass
 
-            progress_this_cycle = False
+    liked_count = 0
+    attempts_without_progress = 0
+    cache = CardCache(CARD_RETRY_BACKOFF, CARD_RETRY_LIMIT)
+    scroller = make_scroll_scheduler()
+    guard = make_memory_guard()
+    pacer = make_pacer()
+    pacer.watch(page)
+    budget_exhausted = False
+    log("info", f"target new likes this run: {target}")
 
-            for btn in buttons:
-                if liked_count >= TARGET_LIKES:
-                    break
+    while liked_count < target:
+        with timer("discover"):
+            if feed is not None:
+                cards = feed.take()
+            elif BATCHED_SCAN:
+                cards = scan_feed_cards(page)
+            else:
+                cards = scan_feed_cards_per_button(page)
 
-                try:
-                    try:
-                        inner = btn.inner_text().strip()
-                    except Exception:
-                        inner = ""
-                    if "👍" not in inner:
-                        continue
+        if not cards:
+            inc("empty_scrolls_total")
+            log("info", "no reaction buttons in view — scrolling to load more")
+            with timer("scroll"):
+                scroller.advance(page)
+            attempts_without_progress += 1
+            if attempts_without_progress > MAX_EMPTY_SCROLLS:
+                log("warning", "too many empty scrolls — aborting")
+                break
+            if scroller.feed_exhausted():
+                log("warning", "reached the end of the feed — stopping")
+                journal.clear(feed_url)
+                break
+            continue
 
-                    img_id = extract_image_id_from_button(btn)
-                    if not img_id:
-                        continue
+        progress_this_cycle = False
+        examined = 0
+        last_id = None
+
+        for card in cards:
+            if liked_count >= target:
+                break
+
+            try:
+                img_id = card.get("image_id")
+                cache_key = card_cache_key(card)
+                if cache_key and cache.should_skip(cache_key):
+                    if feed is not None and cache.waiting(cache_key):
+                        feed.retry(card)
+                    inc("cards_skipped_total", reason="cached")
+                    continue
+                examined += 1
+                inc("cards_seen_total")
+
+                if not img_id:
+                    if cache_key:
+                        cache.mark_no_id(cache_key)
+                    inc("cards_skipped_total", reason="no_id")
+                    continue
+
+                last_id = img_id
+                if img_id in liked_ids:
+                    cache.mark_liked(img_id)
+                    inc("cards_skipped_total", reason="known")
+                    continue
 
-                    if img_id in liked_ids:
+                if card.get("liked"):
+                    # already liked on the site (e.g. from another device, or a click that landed
+                    # right before a crash) -> just remember it
+                    if journal.in_flight(img_id):
+                        journal.end(img_id, True)
+                    with timer("persist"):
+                        liked_ids.add(img_id)
+                    cache.mark_liked(img_id)
+                    inc("cards_skipped_total", reason="liked_on_site")
+                    continue
+
+                # traced from here on: cards that reach the click path, not every cached skip
+                with span("card", image_id=img_id) as card_span:
+                    with span("visibility"):
+                        visible = card.get("visible", True)
+                        btn = get_card_button(page, card) if visible else None
+                    if not visible or btn is None:
+                        outcome = "hidden" if not visible else "detached"
+                        card_span.set(outcome=outcome)
+                        inc("cards_skipped_total", reason=outcome)
+                        if feed is not None:
+                            feed.forget(img_id)
                         continue
 
-                    try:
-                        if not btn.is_visible():
-                            continue
-                    except Exception:
-                        pass
+                    with timer("rate_limit_wait"):
+                        if not pace(pacer, page):
+                            budget_exhausted = True
+                            break
 
-                    ok = click_and_confirm_like(btn, timeout=LIKE_CONFIRM_TIMEOUT, retries=CLICK_RETRY)
+                    journal.begin(img_id)
+                    with timer("click_confirm"):
+                        ok = click_and_confirm_like(btn, timeout=LIKE_CONFIRM_TIMEOUT, retries=CLICK_RETRY,
+                                                    initial_count=fresh_count(card), img_id=img_id)
+                    journal.end(img_id, ok)
                     if not ok:
-                        print(f"INFO: click confirmation failed for img {img_id}; skipping")
+                        # no backoff here: a card that did not confirm (stale node, slow re-render) is retried
+                        # through the card cache; server errors pause the likes via pacer.watch
+                        card_span.set(outcome="failed")
+                        failures = cache.mark_failed(img_id)
+                        inc("like_failures_total")
+                        if failures >= CARD_RETRY_LIMIT:
+                            log("info", f"click confirmation failed for img {img_id}; giving up on it for this run",
+                                event="like_failed", image_id=img_id, failures=failures, retry=False)
+                        else:
+                            inc("like_retries_total")
+                            log("info", f"click confirmation failed for img {img_id}; will retry later",
+                                event="like_failed", image_id=img_id, failures=failures, retry=True)
+                            if feed is not None:
+                                feed.retry(card)
                         continue
 
                     liked_count += 1
-                    liked_ids.add(img_id)
-                    save_liked_ids_atomic(liked_ids)
-                    print(f"INFO: [{liked_count}/{TARGET_LIKES}] liked image id={img_id}")
+                    inc("likes_total")
+                    pacer.success()
+                    with timer("persist"):
+                        liked_ids.add(img_id)
+                    cache.mark_liked(img_id)
+                    card_span.set(outcome="liked")
+                    log("info", f"[{liked_count}/{target}] liked image id={img_id}",
+                        event="liked", image_id=img_id, count=liked_count)
+                    notify_like(img_id, liked_count)
                     progress_this_cycle = True
 
-                    time.sleep(ACTION_DELAY)
+            except Exception as e:
+                log("warning", "error processing button:", str(e)[:200])
+                continue
 
-                except Exception as e:
-                    print("WARNING: error processing button:", str(e)[:200])
-                    continue
+        if not progress_this_cycle:
+            attempts_without_progress += 1
+        else:
+            attempts_without_progress = 0
 
-            if not progress_this_cycle:
-                attempts_without_progress += 1
-            else:
-                attempts_without_progress = 0
+        if last_id is not None:
+            # checkpoint = the feed batch holding the last card looked at, a restart reloads that batch
+            known, cursor = tracker.batch_cursor(last_id)
+            if known:
+                journal.position(feed_url, cursor, last_id)
 
-            if liked_count >= TARGET_LIKES:
-                break
+        if liked_count >= target or budget_exhausted:
+            break
 
-            page.evaluate("window.scrollBy(0, window.innerHeight * 1.3)")
-            time.sleep(1.0 + random.random() * 1.5)
+        if guard.after_cycle(page, examined):
+            with timer("recycle"):
+                page = recycle_page(context, page, tracker, feed, feed_url)
+            pacer.watch(page)
+            guard.recycled()
 
-            if attempts_without_progress > 25:
-                print("WARNING: no progress for many iterations — exiting")
-                break
+        with timer("scroll"):
+            scroller.advance(page)
+
+        if attempts_without_progress > MAX_IDLE_CYCLES:
+            log("warning", "no progress for many iterations — exiting")
+            break
+        if scroller.feed_exhausted():
+            log("warning", "reached the end of the feed — stopping")
+            journal.clear(feed_url)
+            break
 
-        print(f"INFO: done — new likes this run: {liked_count}")
+    log("info", f"done — new likes this run: {liked_count}", event="run_done", likes=liked_count)
+    log("info", cache.summary())
+    log("info", scroller.summary())
+    log("info", pacer.summary())
+    if guard.mode != "off":
+        log("info", guard.summary())
+    print_resource_filter_summary()
+    journal.close()
+    return liked_count
+
+def run_liker(liked_ids):
+    with sync_playwright() as p:
+        # ensure session; if not present this function will open system browser and WAIT for user,
+        # then attempt to fetch magic link and finalize login inside Playwright
+        with timer("session_setup"):
+            browser, context, page = ensure_valid_session(p)
+
+        if context is None or page is None:
+            log("error", "no active Playwright context/page after login flow. Exiting.")
+            try:
+                if browser:
+                    browser.close()
+            except Exception:
+                pass
+            return None
+
+        pw_trace = tracing.start_playwright_trace(context)
+        try:
+            liked_count = like_feed(context, page, liked_ids)
+        finally:
+            tracing.stop_playwright_trace(context, pw_trace)
 
         try:
             context.close()
@@ -616,15 +1461,23 @@ def auto_like_images():
             browser.close()
         except Exception:
             pass
+        return liked_count
 
 # -------- Entrypoint --------
 if __name__ == "__main__":
-    # pre-update check (branch-based)
+    # update check (branch-based): in the background by default, in front of the run otherwise
+    update_check = None
     try:
-        check_and_prompt_update_branch_flow()
+        if UPDATE_CHECK_BACKGROUND:
+            update_check = start_update_check()
+        else:
+            check_and_prompt_update_branch_flow()
     except Exception as e:
-        print("WARNING: update flow failed:", e)
+        log("warning", "update flow failed:", e)
 
     # run main logic
     auto_like_images()
 
+    if update_check is not None:
+        finish_update_check(update_check)
+
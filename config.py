@@ -4,18 +4,75 @@ YOUR_EMAIL = "your_email@example.com"  # email adress
 EMAIL_PASSWORD = "your_email_pass"  # password. read README.md
 IMAP_SERVER = "imap.gmail.com"         # IMAP... funny word lol...
 IMAP_PORT = 993                         # port IMAP (by default 993 for SSL)
+LOGIN_WATCHER = True  # keep one IMAP connection open during login and grab the link the moment the email arrives
+LOGIN_EMAIL_TIMEOUT = 120  # seconds to wait for the login email after you press Enter
+EMAIL_DEBUG_DUMP = False  # True = save the login email to civitai_email.html (for when the link is not found)
 
 
 # browser settings
 
 HEADLESS_MODE = False  # True - stealth mode, False - idk... mb normal mode
 SESSION_SAVE_DELAY = 5  # maybe session settings
-ACTION_DELAY = 1  # delay
+ACTION_DELAY = 1  # pause after opening the reactions panel (likes themselves are paced by MAX_LIKES_PER_*)
 AUTO_WAIT_FOR_USER = True  # wait for user response (recommended = True)
+SESSION_CHECK = True  # check the saved login from its cookies / one tiny request instead of loading the whole feed
+SESSION_CHECK_TTL = 300  # seconds the result of that check is reused
+RESOURCE_FILTER = False  # True = don't download images/videos/fonts/trackers (less traffic and memory, likes still work)
+BLOCK_RESOURCE_TYPES = ["image", "media", "font"]  # what RESOURCE_FILTER blocks (images are replaced by a 1px stub)
+BLOCK_EXTRA_DOMAINS = []  # more domains to block, e.g. ["ads.example.com"]
+ALLOW_URL_PATTERNS = []  # regexes that are never blocked (api, login and cloudflare are always allowed)
+BATCHED_SCAN = True  # scan all cards in one browser call per cycle (False = old per-button scan)
+DISCOVERY_MODE = "scan"  # "scan" - rescan the feed every cycle, "observer" - the page reports only newly loaded cards (faster on long runs)
+ENGINE = "sync"  # "sync" - one step at a time, "async" - scrolling and clicking overlap, "api" - no browser pages, talks to the site api directly (fastest); async/api need a saved session, first login runs sync
+ASYNC_QUEUE_SIZE = 50  # "async" engine: max cards waiting to be clicked
+PAGE_WORKERS = 1  # pages liking in parallel (same login); > 1 uses the "async" engine
+WORKER_FEED_URLS = []  # feed url per page, e.g. ["https://civitai.com/images?sort=Newest", "https://civitai.com/images?sort=Most+Reactions&period=Day"]; empty = different sorts automatically
+MAX_LIKES_PER_MINUTE = 30  # like budgets for all pages and engines together (0 = no limit); likes go out as fast as
+MAX_LIKES_PER_HOUR = 0  # the tightest budget allows, 429s / errors pause them automatically,
+MAX_LIKES_PER_DAY = 0  # and what was used is remembered across runs in pacing_state.json
+PACING_MAX_WAIT = 900  # seconds; when the budget needs a longer pause than this the run stops instead of waiting
+CHECKPOINT = True  # remember the feed batch a run stopped in (checkpoint.jsonl) and continue there after a crash or restart
+CHECKPOINT_MAX_AGE = 12  # hours; an older checkpoint is ignored and the feed starts at the top
+API_BATCH_SIZE = 100  # "api" engine: images per feed request
+API_FEED_INPUT = {"sort": "Newest", "period": "AllTime"}  # "api" engine: feed filters (same as on the images page)
+FEED_SOURCES = []  # several feeds in one run, e.g. [{"type": "feed", "sort": "Newest", "weight": 3}, {"type": "tag", "id": 5133, "sort": "Most Reactions", "period": "Week"}, {"type": "model", "id": 4201}, {"type": "user", "username": "someone"}]; "api" engine mixes them by weight, browser engines open a page per source; an image is only looked at once; empty = API_FEED_INPUT / IMAGES_URL
+DAEMON_IDLE_MINUTES = 60  # liker_daemon.py: keep the browser warm this long after the last job (0 = until stopped)
+DAEMON_PORT = 0  # liker_daemon.py: local port (0 = any free port, clients find it in liker_daemon.json)
+SCROLL_MIN_TIMEOUT = 1.0  # after a scroll, wait at least this long for new cards before scrolling again...
+SCROLL_MAX_TIMEOUT = 10.0  # ...and at most this long (adapts to how fast the feed loads)
+MAX_EMPTY_SCROLLS = 20  # stop after this many scrolls in a row that show no reaction buttons
+MAX_IDLE_CYCLES = 25  # stop after this many scroll cycles in a row without a new like
+MEMORY_MODE = "off"  # long runs: "prune" - clear already processed cards from the page, "recycle" - reopen the page at the same feed position, "off"
+MEMORY_CHECK_EVERY = 10  # measure page memory every N scroll cycles
+MEMORY_MAX_HEAP_MB = 512  # "recycle": reopen the page when its JS heap grows past this
+RECYCLE_AFTER_CARDS = 2000  # "recycle": ...or after this many cards were looked at on one page
+PRUNE_KEEP_SCREENS = 3  # "prune": keep cards within this many screens above the current position
+CARD_RETRY_BACKOFF = 30  # seconds before a card whose like failed is tried again (doubles every failure)
+CARD_RETRY_LIMIT = 3  # give up on a card for the rest of the run after this many failed attempts
+CONFIRM_MODE = "dom"  # "dom" - wait for the button to flip to liked, "network" - wait for the reaction api response (2xx = liked)
+
+
+# liked history settings
+LIKED_STORE = "log"  # "log" - append-only liked_images.log, "sqlite" - liked_images.db, "index" - mmap'd liked_images.idx (millions of ids), "json" - old liked_images.json (slow on big histories)
+LIKED_FLUSH_EVERY = 20  # fsync liked ids after this many new likes...
+LIKED_FLUSH_INTERVAL = 5.0  # ...or after this many seconds, whichever comes first
+LIKED_INDEX_MERGE_EVERY = 50000  # "index" store: fold new likes into the index after this many
+
+
+# metrics
+METRICS_EXPORTERS = []  # ["jsonl"] - events + timings to METRICS_FILE, ["prometheus"] - http://127.0.0.1:METRICS_PORT/metrics, or both
+METRICS_FILE = "metrics.jsonl"
+METRICS_PORT = 9464
+TRACE = False  # True = write nested per-card spans (plus every playwright call) to TRACE_FILE, open it in https://ui.perfetto.dev
+TRACE_FILE = "liker_trace.json"
+TRACE_PROFILE = False  # with TRACE: also dump cProfile stats to liker_trace.prof
+TRACE_PLAYWRIGHT = False  # with TRACE: also save a playwright trace (screenshots + DOM snapshots) to liker_trace.zip, big files
 
 
 # script settings
 AUTO_UPDATE = False  # default; True = update automatically without confirmation
+UPDATE_CHECK_HOURS = 12  # git fetch for updates at most this often (0 = every launch), the answer is cached in update_check.json
+UPDATE_CHECK_BACKGROUND = True  # check while the browser starts and offer the update after the run; False = check (and update) before the run
 UPDATE_BRANCH = "main"  # higly NOT recommended to change this option; 2 available branch: main and indev (I will not be responsible for anything breaking for you if you change the value of this option)
 
 
@@ -2,18 +2,74 @@
 import imaplib
 import email
 import re
-from bs4 import BeautifulSoup
+from html.parser import HTMLParser
+import config
 from config import YOUR_EMAIL, EMAIL_PASSWORD, IMAP_SERVER, IMAP_PORT
+from metrics import log
+
+EMAIL_DEBUG_DUMP = getattr(config, "EMAIL_DEBUG_DUMP", False)  # save the login email to civitai_email.html
+
+# anchor texts of the login button, best first
+LINK_TEXTS = ("log in", "sign in", "access your account", "click here")
+CALLBACK_URL = "civitai.com/api/auth/callback/email"
+
+
+class _FoundLink(Exception):
+    pass
+
+
+class LoginLinkParser(HTMLParser):
+    """Single pass over the email html; stops at the first callback link"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.href = None  # href of the <a> we are inside of
+        self.text = []
+        self.best = None  # (rank, href) of the best anchor text match so far
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "a":
+            return
+        href = dict(attrs).get("href")
+        if href and CALLBACK_URL in href:
+            raise _FoundLink(href)
+        self.href = href
+        self.text = []
+
+    def handle_data(self, data):
+        if self.href is not None:
+            self.text.append(data)
+
+    def handle_endtag(self, tag):
+        if tag != "a" or self.href is None:
+            return
+        text = "".join(self.text).lower()
+        for rank, pattern in enumerate(LINK_TEXTS):
+            if pattern in text and (self.best is None or rank < self.best[0]):
+                self.best = (rank, self.href)
+                break
+        self.href = None
+
+
+def extract_login_link(html_content):
+    """Find the magic login link in the html of a CivitAI email"""
+    parser = LoginLinkParser()
+    try:
+        parser.feed(html_content)
+        parser.close()
+    except _FoundLink as found:
+        return found.args[0]
+    return parser.best[1] if parser.best else None
 
 def get_civitai_login_link():
     """Extract login link from CivitAI email"""
-    print(f"Checking email: {YOUR_EMAIL}")
+    log("info", f"checking email: {YOUR_EMAIL}", event="login_email_check")
     
     try:
         # connect to fucking servers
         mail = imaplib.IMAP4_SSL(IMAP_SERVER, IMAP_PORT)
         mail.login(YOUR_EMAIL, EMAIL_PASSWORD)
-        print("Connected to mail server")
+        log("info", "connected to mail server")
         
         # check your mothe...
         mail.select("inbox")
@@ -25,13 +81,13 @@ def get_civitai_login_link():
             status, all_messages = mail.search(None, "ALL")
             if status == "OK" and all_messages[0]:
                 email_count = len(all_messages[0].split())
-                print(f"Found {email_count} emails, but none from CivitAI")
+                log("warning", f"found {email_count} emails, but none from CivitAI", event="login_email_missing")
             raise Exception("No emails found from CivitAI")
         
         # email id
         email_ids = messages[0].split()
         latest_email_id = email_ids[-1]
-        print(f"Found CivitAI email (ID: {latest_email_id.decode()})")
+        log("info", f"found CivitAI email (ID: {latest_email_id.decode()})", event="login_email_found")
         
         # fetch
         status, msg_data = mail.fetch(latest_email_id, "(RFC822)")
@@ -47,50 +103,32 @@ def get_civitai_login_link():
             if part.get_content_type() == "text/html":
                 html_content = part.get_payload(decode=True).decode()
                 
-                # save
-                with open("civitai_email.html", "w", encoding="utf-8") as f:
-                    f.write(html_content)
-                
-                # parse 2
-                soup = BeautifulSoup(html_content, 'html.parser')
-                
-                # search 2
-                patterns = [
-                    lambda t: t and "log in" in t.lower(),
-                    lambda t: t and "sign in" in t.lower(),
-                    lambda t: t and "access your account" in t.lower(),
-                    lambda t: t and "click here" in t.lower(),
-                ]
-                
-                # txt patterns
-                for pattern in patterns:
-                    link = soup.find('a', string=pattern)
-                    if link and link.get('href'):
-                        login_link = link['href']
-                        break
+                # save (debug only)
+                if EMAIL_DEBUG_DUMP:
+                    with open("civitai_email.html", "w", encoding="utf-8") as f:
+                        f.write(html_content)
                 
-                # search url
-                if not login_link:
-                    all_links = soup.find_all('a', href=True)
-                    for link in all_links:
-                        if 'civitai.com/api/auth/callback/email' in link['href']:
-                            login_link = link['href']
-                            break
+                login_link = extract_login_link(html_content)
+                if login_link:
+                    break
         
         # cleanup
         mail.close()
         mail.logout()
         
         if not login_link:
-            print("Saved email content to civitai_email.html for inspection")
+            if EMAIL_DEBUG_DUMP:
+                log("info", "saved email content to civitai_email.html for inspection")
+            else:
+                log("info", "set EMAIL_DEBUG_DUMP = True in config.py to save the email to civitai_email.html")
             raise Exception("Login link not found in email")
         
-        print(f"Found login link: {login_link[:70]}...")
+        log("info", f"found login link: {login_link[:70]}...", event="login_link_found")
         return login_link
     
     except Exception as e:
-        print(f"Email processing error: {str(e)}")
+        log("error", f"email processing error: {str(e)}", event="login_email_error")
         # AAAAAAA ERRORS AAAAAA BHASBHJSAHBJSAJHB
-        print(f"IMAP Server: {IMAP_SERVER}:{IMAP_PORT}")
-        print(f"Email: {YOUR_EMAIL}")
+        log("error", f"IMAP server: {IMAP_SERVER}:{IMAP_PORT}")
+        log("error", f"email: {YOUR_EMAIL}")
         raise
@@ -0,0 +1,182 @@
+# feed cursor tracking: remember the feed api's nextCursor and start a fresh page from it
+# (trpc GET .../api/trpc/image.getInfinite?input={"json":{...,"cursor":...}}, batched calls use
+#  ?batch=1&input={"0":{"json":{...}},...})
+import json
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+
+def find_next_cursor(payload):
+    # first "nextCursor" anywhere in a trpc response (single or batched)
+    stack = [payload]
+    while stack:
+        item = stack.pop(0)
+        if isinstance(item, dict):
+            if item.get("nextCursor") is not None:
+                return item["nextCursor"]
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+    return None
+
+
+def find_items(payload):
+    # item dicts of a feed response page, in feed order
+    found = []
+    stack = [payload]
+    while stack:
+        item = stack.pop(0)
+        if isinstance(item, dict):
+            items = item.get("items")
+            if isinstance(items, list) and items and isinstance(items[0], dict) and "id" in items[0]:
+                found.extend(i for i in items if isinstance(i, dict) and "id" in i)
+                continue
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+    return found
+
+
+def find_image_ids(payload):
+    return [str(i["id"]) for i in find_items(payload)]
+
+
+def feed_inputs(data, procedures, pattern):
+    # the {"json": {...}} inputs of the feed procedure in a single or batched trpc input
+    if isinstance(data, dict) and "json" in data:
+        targets = [data]
+    elif isinstance(data, dict):
+        targets = [data.get(str(i)) for i, name in enumerate(procedures) if pattern in name]
+    else:
+        targets = []
+    return [t for t in targets if isinstance(t, dict) and isinstance(t.get("json"), dict)]
+
+
+def url_cursor(url, pattern):
+    # cursor a feed request url asks for (None = first page)
+    parts = urlsplit(url)
+    procedures = parts.path.rsplit("/", 1)[-1].split(",")
+    for key, value in parse_qsl(parts.query, keep_blank_values=True):
+        if key != "input":
+            continue
+        try:
+            data = json.loads(value)
+        except ValueError:
+            return None
+        for target in feed_inputs(data, procedures, pattern):
+            return target["json"].get("cursor")
+    return None
+
+
+def with_cursor(url, cursor, pattern):
+    # rewrite the feed request url so it starts at cursor
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    procedures = parts.path.rsplit("/", 1)[-1].split(",")
+    changed = False
+    for n, (key, value) in enumerate(query):
+        if key != "input":
+            continue
+        try:
+            data = json.loads(value)
+        except ValueError:
+            return url
+        for target in feed_inputs(data, procedures, pattern):
+            target["json"]["cursor"] = cursor
+            changed = True
+        query[n] = (key, json.dumps(data, separators=(",", ":")))
+    if not changed:
+        return url
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+class FeedCursorTracker:
+    # keeps the last feed response of a page; the body is parsed only when someone asks
+    # track_batches: also remember which request cursor every image came from (checkpoint.py)
+
+    MAX_BATCH_IDS = 5000
+
+    def __init__(self, pattern, track_batches=False):
+        self.pattern = pattern
+        self.last_response = None
+        self.cursor = None
+        self.last_ids = []
+        self.track_batches = track_batches
+        self.unparsed = []
+        self.batch_of = {}  # image id -> cursor of the feed request that returned it
+
+    def on_response(self, response):
+        try:
+            if self.pattern in response.url and response.ok:
+                self.last_response = response
+                if self.track_batches:
+                    self.unparsed.append(response)
+        except Exception:
+            pass
+
+    def remember_batch(self, url, payload):
+        cursor = url_cursor(url, self.pattern)
+        for img_id in find_image_ids(payload):
+            self.batch_of[img_id] = cursor
+        while len(self.batch_of) > self.MAX_BATCH_IDS:
+            del self.batch_of[next(iter(self.batch_of))]
+
+    def batch_cursor(self, img_id):
+        # -> (known, cursor): cursor to reload the feed batch that holds img_id (None = top of the feed)
+        responses, self.unparsed = self.unparsed, []
+        for response in responses:
+            try:
+                self.remember_batch(response.url, response.json())
+            except Exception:
+                pass
+        return img_id in self.batch_of, self.batch_of.get(img_id)
+
+    async def batch_cursor_async(self, img_id):
+        responses, self.unparsed = self.unparsed, []
+        for response in responses:
+            try:
+                self.remember_batch(response.url, await response.json())
+            except Exception:
+                pass
+        return img_id in self.batch_of, self.batch_of.get(img_id)
+
+    def attach(self, page):
+        page.on("response", self.on_response)
+
+    def current(self):
+        # sync playwright: cursor of the newest feed page seen so far
+        if self.last_response is not None:
+            try:
+                payload = self.last_response.json()
+                self.cursor = find_next_cursor(payload) or self.cursor
+                self.last_ids = find_image_ids(payload) or self.last_ids
+            except Exception:
+                pass
+            self.last_response = None
+        return self.cursor
+
+    def resume_from(self, page, cursor):
+        # first feed request of the page starts at cursor, later ones are left alone
+        if cursor is None:
+            return
+        state = {"done": False}
+
+        def handler(route):
+            if state["done"]:
+                return route.continue_()
+            state["done"] = True
+            return route.continue_(url=with_cursor(route.request.url, cursor, self.pattern))
+
+        page.route(f"**/*{self.pattern}*", handler)
+
+    async def resume_from_async(self, page, cursor):
+        if cursor is None:
+            return
+        state = {"done": False}
+
+        async def handler(route):
+            if state["done"]:
+                return await route.continue_()
+            state["done"] = True
+            return await route.continue_(url=with_cursor(route.request.url, cursor, self.pattern))
+
+        await page.route(f"**/*{self.pattern}*", handler)
@@ -0,0 +1,243 @@
+# feed sources (FEED_SOURCES): several feeds worked in one run - sorts / periods, tags, model or user galleries
+#   FEED_SOURCES = [{"type": "feed", "sort": "Newest", "weight": 3},
+#                   {"type": "tag", "id": 5133, "sort": "Most Reactions", "period": "Week"},
+#                   {"type": "model", "id": 4201}, {"type": "user", "username": "someone", "weight": 0.5}]
+# every source is a generator of candidate feed items with its own api input, images page url and cursor.
+# MultiSourceFeed interleaves them by weight (smooth weighted round robin, a source that dried up just
+# drops out) and hands on every image id once per run: ids already liked or already seen in another
+# source are skipped in the same check. new source types: subclass FeedSource and @register_source
+import json
+from urllib.parse import urlencode
+
+from metrics import log, inc
+
+SOURCE_TYPES = {}
+
+
+def register_source(cls):
+    SOURCE_TYPES[cls.kind] = cls
+    return cls
+
+
+@register_source
+class FeedSource:
+    # the plain images feed; any extra key is passed to the feed api and the page url as is
+    kind = "feed"
+
+    def __init__(self, sort="Newest", period="AllTime", weight=1, name=None, **extra):
+        self.sort = sort
+        self.period = period
+        self.weight = float(weight)
+        self.extra = extra
+        self.name = name or self.default_name()
+        self.cursor = None  # cursor of the batch being handed out (None = first page)
+        self.exhausted = False
+
+    def default_name(self):
+        return f"{self.kind}:{self.sort}/{self.period}"
+
+    def filters(self):
+        # what narrows the feed down, shared by the api input and the page url
+        return {}
+
+    def api_input(self):
+        return dict({"sort": self.sort, "period": self.period}, **self.filters(), **self.extra)
+
+    def url(self, images_url):
+        params = dict({"sort": self.sort, "period": self.period}, **self.filters(), **self.extra)
+        query = {k: (",".join(str(i) for i in v) if isinstance(v, (list, tuple)) else v) for k, v in params.items()}
+        return images_url.split("?", 1)[0] + "?" + urlencode(query)
+
+    @property
+    def key(self):
+        # checkpoint key (same format the api engine used for its single feed)
+        return "api:" + json.dumps(self.api_input(), sort_keys=True)
+
+    def candidates(self, fetch, cursor=None):
+        # fetch(source, cursor) -> (items, next_cursor), or None when the run has to stop
+        while True:
+            page = fetch(self, cursor)
+            if page is None:
+                return
+            items, next_cursor = page
+            self.cursor = cursor
+            yield from items
+            if next_cursor is None:
+                self.exhausted = True
+                return
+            cursor = next_cursor
+
+
+@register_source
+class TagSource(FeedSource):
+    kind = "tag"
+
+    def __init__(self, id, **kw):
+        self.tag_id = int(id)
+        super().__init__(**kw)
+
+    def default_name(self):
+        return f"tag:{self.tag_id}"
+
+    def filters(self):
+        return {"tags": [self.tag_id]}
+
+
+@register_source
+class ModelSource(FeedSource):
+    kind = "model"
+
+    def __init__(self, id, version=None, **kw):
+        self.model_id = int(id)
+        self.version_id = int(version) if version is not None else None
+        super().__init__(**kw)
+
+    def default_name(self):
+        return f"model:{self.model_id}"
+
+    def filters(self):
+        if self.version_id is not None:
+            return {"modelId": self.model_id, "modelVersionId": self.version_id}
+        return {"modelId": self.model_id}
+
+
+@register_source
+class UserSource(FeedSource):
+    kind = "user"
+
+    def __init__(self, username, **kw):
+        self.username = username
+        super().__init__(**kw)
+
+    def default_name(self):
+        return f"user:{self.username}"
+
+    def filters(self):
+        return {"username": self.username}
+
+
+def make_source(spec):
+    spec = dict(spec)
+    kind = spec.pop("type", "feed")
+    cls = SOURCE_TYPES.get(kind)
+    if cls is None:
+        raise ValueError(f"unknown feed source type {kind!r} (known: {', '.join(sorted(SOURCE_TYPES))})")
+    return cls(**spec)
+
+def load_sources(specs, default_input=None):
+    # FEED_SOURCES entries -> sources; broken entries are logged and left out.
+    # no entries = the single feed given by default_input (API_FEED_INPUT)
+    sources = []
+    for spec in specs or []:
+        try:
+            source = make_source(spec)
+        except (TypeError, ValueError) as e:
+            log("warning", f"feed source {spec!r} ignored:", e)
+            continue
+        if source.weight <= 0:
+            continue
+        names = {s.name for s in sources}
+        if source.name in names:
+            source.name = next(f"{source.name}#{n}" for n in range(2, len(names) + 2) if f"{source.name}#{n}" not in names)
+        sources.append(source)
+    if not sources:
+        sources.append(FeedSource(**dict(default_input or {})))
+    return sources
+
+def source_urls(sources, images_url, count):
+    # one images page url per browser page, heaviest sources first
+    ordered = sorted(sources, key=lambda s: -s.weight)
+    return [ordered[i % len(ordered)].url(images_url) for i in range(count)]
+
+
+class WeightedScheduler:
+    # smooth weighted round robin: weights 3:1 -> a a b a a a b a ..., never long runs of one source
+
+    def __init__(self):
+        self.credit = {}
+
+    def pick(self, sources):
+        total = sum(s.weight for s in sources)
+        best = None
+        for source in sources:
+            self.credit[source.name] = self.credit.get(source.name, 0.0) + source.weight
+            if best is None or self.credit[source.name] > self.credit[best.name]:
+                best = source
+        self.credit[best.name] -= total
+        return best
+
+
+class MultiSourceFeed:
+    # iterate -> (source, item) for image ids that are neither liked nor handed out before in this run
+    # journal (checkpoint.py): each source resumes at its own batch and records it when it moves on
+
+    def __init__(self, sources, liked_ids, fetch, journal=None):
+        self.sources = list(sources)
+        self.liked_ids = liked_ids
+        self.fetch = fetch
+        self.journal = journal
+        self.scheduler = WeightedScheduler()
+        self.seen = set()
+        self.stats = {s.name: {"items": 0, "new": 0, "liked": 0, "dupes": 0} for s in self.sources}
+        self.last_ids = {}  # source name -> last id handed out
+        self.batches = {}  # source name -> cursor of the batch that id came from
+        self.stopped = False
+
+    def __iter__(self):
+        generators = {}
+        for source in self.sources:
+            cursor = self.journal.resume_cursor(source.key) if self.journal is not None else None
+            if cursor is not None:
+                log("info", f"{source.name}: resuming at the checkpoint (cursor {cursor})")
+            generators[source.name] = source.candidates(self.fetch, cursor)
+        active = list(self.sources)
+        while active:
+            source = self.scheduler.pick(active)
+            try:
+                item = next(generators[source.name])
+            except StopIteration:
+                active.remove(source)
+                if not source.exhausted:
+                    # fetch gave up (session rejected / api keeps failing): the whole run stops
+                    self.stopped = True
+                    return
+                log("info", f"{source.name}: end of feed reached", event="source_exhausted", source=source.name)
+                if self.journal is not None:
+                    self.journal.clear(source.key)
+                continue
+            img_id = str(item["id"])
+            self.move_on(source, img_id)
+            stats = self.stats[source.name]
+            stats["items"] += 1
+            if img_id in self.seen:
+                stats["dupes"] += 1
+                inc("cards_skipped_total", reason="duplicate")
+                continue
+            self.seen.add(img_id)
+            if img_id in self.liked_ids:
+                stats["liked"] += 1
+                inc("cards_skipped_total", reason="known")
+                continue
+            stats["new"] += 1
+            yield source, item
+
+    def move_on(self, source, img_id):
+        # record the previous batch once a source starts handing out the next one
+        if source.name in self.last_ids and self.batches.get(source.name) != source.cursor:
+            self.record(source)
+        self.last_ids[source.name] = img_id
+        self.batches[source.name] = source.cursor
+
+    def record(self, source):
+        if self.journal is not None and source.name in self.last_ids:
+            self.journal.position(source.key, self.batches[source.name], self.last_ids[source.name])
+
+    def checkpoint(self):
+        for source in self.sources:
+            if not source.exhausted:
+                self.record(source)
+
+    def summary(self):
+        parts = [f"{name} {s['new']} new / {s['liked']} liked before / {s['dupes']} dupes"
+                 for name, s in self.stats.items()]
+        return "feed sources: " + "; ".join(parts)
@@ -0,0 +1,449 @@
+# liked ids storage backends (json / append-only log / sqlite / mmap index)
+import os
+import sys
+import json
+import mmap
+import time
+import bisect
+import tempfile
+from array import array
+
+from metrics import log
+
+
+def read_json_ids(path):
+    # old liked_images.json format: one big json list
+    with open(path, "r", encoding="utf-8") as f:
+        return set(map(str, json.load(f)))
+
+
+class LikedStore:
+    # base store: in-memory set + pending batch flushed by group commit
+    # (flush when flush_every ids are pending or flush_interval seconds passed)
+
+    def __init__(self, path, flush_every=20, flush_interval=5.0):
+        self.path = path
+        self.flush_every = max(1, int(flush_every))
+        self.flush_interval = float(flush_interval)
+        self.pending = []
+        self.last_flush = time.monotonic()
+        self.ids = set()
+
+    def __contains__(self, img_id):
+        return str(img_id) in self.ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, img_id):
+        img_id = str(img_id)
+        if img_id in self.ids:
+            return False
+        self.ids.add(img_id)
+        self.pending.append(img_id)
+        self._stage(img_id)
+        self.maybe_flush()
+        return True
+
+    def maybe_flush(self):
+        if not self.pending:
+            return
+        if len(self.pending) >= self.flush_every or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        try:
+            self._commit(self.pending)
+            self.pending = []
+        except Exception as e:
+            log("warning", "failed to save liked ids:", e, event="store_error")
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+
+    # backend hooks
+    def _stage(self, img_id):
+        # called for every new id before group commit (cheap, no fsync)
+        pass
+
+    def _commit(self, batch):
+        raise NotImplementedError
+
+    def _migrate(self, ids):
+        raise NotImplementedError
+
+
+class JsonLikedStore(LikedStore):
+    # old format: whole set rewritten (temp file + os.replace) on every commit
+
+    def __init__(self, path, **kw):
+        super().__init__(path, **kw)
+        if os.path.exists(path):
+            try:
+                self.ids = read_json_ids(path)
+            except Exception as e:
+                log("warning", "failed to read liked file:", e, event="store_error")
+
+    def _commit(self, batch):
+        self._write_all(self.ids)
+
+    def _write_all(self, ids):
+        folder = os.path.dirname(os.path.abspath(self.path))
+        tmp_fd, tmp_path = tempfile.mkstemp(prefix="liked_", suffix=".json", dir=folder)
+        try:
+            with os.fdopen(tmp_fd, "w", encoding="utf-8") as f:
+                json.dump(list(ids), f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except Exception:
+                pass
+            raise
+
+
+class LogLikedStore(LikedStore):
+    # append-only log, one id per line
+    # every id is written to the OS right away (survives a process crash),
+    # fsync happens once per group commit (survives power loss up to last commit)
+
+    def __init__(self, path, **kw):
+        super().__init__(path, **kw)
+        if os.path.exists(path):
+            self.ids = self._replay()
+        self.fh = None
+
+    def _replay(self):
+        ids = set()
+        with open(self.path, "rb") as f:
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end != len(data):
+            # torn last line from a crash mid-write -> drop it so next append starts clean
+            with open(self.path, "r+b") as f:
+                f.truncate(end)
+            data = data[:end]
+        for line in data.split(b"\n"):
+            line = line.strip()
+            if line:
+                ids.add(line.decode("utf-8", "replace"))
+        return ids
+
+    def _open(self):
+        if self.fh is None:
+            self.fh = open(self.path, "a", encoding="utf-8")
+        return self.fh
+
+    def _stage(self, img_id):
+        try:
+            fh = self._open()
+            fh.write(img_id + "\n")
+            fh.flush()
+        except Exception as e:
+            log("warning", "failed to append liked id:", e, event="store_error")
+
+    def _commit(self, batch):
+        fh = self._open()
+        fh.flush()
+        os.fsync(fh.fileno())
+
+    def _migrate(self, ids):
+        folder = os.path.dirname(os.path.abspath(self.path))
+        tmp_fd, tmp_path = tempfile.mkstemp(prefix="liked_", suffix=".log", dir=folder)
+        try:
+            with os.fdopen(tmp_fd, "w", encoding="utf-8") as f:
+                for img_id in ids:
+                    f.write(img_id + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except Exception:
+                pass
+            raise
+        self.ids = set(ids)
+
+    def close(self):
+        super().close()
+        if self.fh is not None:
+            try:
+                self.fh.close()
+            except Exception:
+                pass
+            self.fh = None
+
+
+class SqliteLikedStore(LikedStore):
+    # sqlite table in WAL mode; membership checks go to the db, nothing is preloaded
+    # one transaction per group commit
+
+    def __init__(self, path, **kw):
+        super().__init__(path, **kw)
+        import sqlite3  # only this backend needs it
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS liked (id TEXT PRIMARY KEY)")
+        self.db.commit()
+
+    def __contains__(self, img_id):
+        row = self.db.execute("SELECT 1 FROM liked WHERE id = ?", (str(img_id),)).fetchone()
+        return row is not None
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM liked").fetchone()[0]
+
+    def add(self, img_id):
+        img_id = str(img_id)
+        cur = self.db.execute("INSERT OR IGNORE INTO liked (id) VALUES (?)", (img_id,))
+        if cur.rowcount == 0:
+            return False
+        self.pending.append(img_id)
+        self.maybe_flush()
+        return True
+
+    def _commit(self, batch):
+        self.db.commit()
+
+    def _migrate(self, ids):
+        self.db.executemany("INSERT OR IGNORE INTO liked (id) VALUES (?)", ((i,) for i in ids))
+        self.db.commit()
+
+    def close(self):
+        super().close()
+        try:
+            self.db.close()
+        except Exception:
+            pass
+
+
+# -------- compact mmap index --------
+# file layout: 8-byte magic, uint64 count, then count sorted uint64 ids (little-endian)
+INDEX_MAGIC = b"CALIDX1\0"
+INDEX_HEADER = 16
+
+
+def build_index(ids, path):
+    # write sorted integer ids to an index file (atomic); non-integer ids are skipped
+    arr = array("Q", sorted({int(i) for i in ids if str(i).isdigit()}))
+    tmp_path, count = write_index_tmp([arr], path)
+    replace_index(tmp_path, path)
+    return count
+
+
+def write_index_tmp(runs, path):
+    # write runs of sorted native uint64 ids (arrays / memoryviews, already in order and
+    # without duplicates) to a temp file next to path -> (tmp_path, count)
+    folder = os.path.dirname(os.path.abspath(path))
+    tmp_fd, tmp_path = tempfile.mkstemp(prefix="liked_", suffix=".idx", dir=folder)
+    try:
+        count = 0
+        with os.fdopen(tmp_fd, "wb") as f:
+            f.write(INDEX_MAGIC)
+            f.write(bytes(8))  # count, filled in below
+            for run in runs:
+                if not len(run):
+                    continue
+                if sys.byteorder == "little":
+                    f.write(run)
+                else:
+                    arr = array("Q", run)
+                    arr.byteswap()
+                    arr.tofile(f)
+                count += len(run)
+            f.seek(8)
+            f.write(count.to_bytes(8, "little"))
+            f.flush()
+            os.fsync(f.fileno())
+    except Exception:
+        remove_quietly(tmp_path)
+        raise
+    return tmp_path, count
+
+
+def replace_index(tmp_path, path):
+    try:
+        os.replace(tmp_path, path)
+    except Exception:
+        remove_quietly(tmp_path)
+        raise
+
+
+def remove_quietly(path):
+    try:
+        os.remove(path)
+    except Exception:
+        pass
+
+
+def merge_runs(view, ids):
+    # sorted index view + sorted new ids -> runs for write_index_tmp; the view is copied in
+    # slices between the new ids (bisect), ids already in the view are dropped
+    lo = 0
+    for num in ids:
+        pos = bisect.bisect_left(view, num, lo)
+        if pos > lo:
+            yield view[lo:pos]
+        lo = pos
+        if pos < len(view) and view[pos] == num:
+            continue
+        yield array("Q", (num,))
+    if lo < len(view):
+        yield view[lo:]
+
+
+class SortedIdIndex:
+    # read-only mmap over an index file, O(log n) membership via bisect
+
+    def __init__(self, path):
+        self.path = path
+        self.fh = None
+        self.mm = None
+        self.view = memoryview(b"").cast("Q")
+        if os.path.exists(path) and os.path.getsize(path) > INDEX_HEADER:
+            self.fh = open(path, "rb")
+            self.mm = mmap.mmap(self.fh.fileno(), 0, access=mmap.ACCESS_READ)
+            if self.mm[:8] != INDEX_MAGIC:
+                self.close()
+                raise ValueError(f"{path} is not a liked ids index")
+            count = int.from_bytes(self.mm[8:INDEX_HEADER], "little")
+            self.view = memoryview(self.mm)[INDEX_HEADER:INDEX_HEADER + count * 8].cast("Q")
+            if sys.byteorder != "little":
+                # big-endian hosts: fall back to a swapped in-memory copy
+                arr = array("Q", self.view)
+                arr.byteswap()
+                self.view = memoryview(arr)
+
+    def __len__(self):
+        return len(self.view)
+
+    def __contains__(self, num):
+        i = bisect.bisect_left(self.view, num)
+        return i < len(self.view) and self.view[i] == num
+
+    def values(self):
+        return self.view
+
+    def close(self):
+        try:
+            self.view.release()
+        except Exception:
+            pass
+        self.view = memoryview(b"").cast("Q")
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+        if self.fh is not None:
+            self.fh.close()
+            self.fh = None
+
+
+class IndexLikedStore(LikedStore):
+    # mmap'd sorted id index + small append-only delta log for new likes;
+    # delta is merged into the index once it reaches merge_every ids
+
+    def __init__(self, path, merge_every=50000, **kw):
+        super().__init__(path, **kw)
+        self.merge_every = max(1, int(merge_every))
+        self.index = SortedIdIndex(path)
+        self.delta = LogLikedStore(path + ".delta", **kw)
+        # ids already merged (crash between merge and delta truncate) are dropped here
+        self.delta.ids = {i for i in self.delta.ids if not self._in_index(i)}
+
+    def _in_index(self, img_id):
+        return img_id.isdigit() and int(img_id) in self.index
+
+    def __contains__(self, img_id):
+        img_id = str(img_id)
+        return img_id in self.delta.ids or self._in_index(img_id)
+
+    def __len__(self):
+        return len(self.index) + len(self.delta.ids)
+
+    def add(self, img_id):
+        img_id = str(img_id)
+        if img_id in self:
+            return False
+        self.delta.add(img_id)
+        if len(self.delta.ids) >= self.merge_every:
+            self.merge()
+        return True
+
+    def maybe_flush(self):
+        self.delta.maybe_flush()
+
+    def flush(self):
+        self.delta.flush()
+
+    def merge(self):
+        # rewrite index with delta folded in, then start a fresh delta log
+        try:
+            self.delta.flush()
+            # only the delta is sorted; the index is streamed from the mmap into the new file
+            new_ids = sorted(int(i) for i in self.delta.ids if i.isdigit())
+            leftovers = {i for i in self.delta.ids if not i.isdigit()}
+            tmp_path, count = write_index_tmp(merge_runs(self.index.values(), new_ids), self.path)
+            self.index.close()  # the old file can't be replaced while mapped on windows
+            replace_index(tmp_path, self.path)
+            self.index = SortedIdIndex(self.path)
+            self.delta.close()
+            self.delta._migrate(leftovers)
+            log("info", f"liked index merged ({len(self.index)} ids)", event="index_merged", ids=len(self.index))
+        except Exception as e:
+            log("warning", "liked index merge failed:", e, event="store_error")
+            if self.index.mm is None:
+                self.index = SortedIdIndex(self.path)
+
+    def _migrate(self, ids):
+        self.index.close()
+        build_index(ids, self.path)
+        self.index = SortedIdIndex(self.path)
+        self.delta.close()
+        self.delta._migrate({i for i in ids if not str(i).isdigit()})
+
+    def close(self):
+        self.delta.close()
+        self.index.close()
+
+
+BACKENDS = {
+    "json": JsonLikedStore,
+    "log": LogLikedStore,
+    "sqlite": SqliteLikedStore,
+    "index": IndexLikedStore,
+}
+
+
+def open_liked_store(backend, path, legacy_json=None, flush_every=20, flush_interval=5.0, **options):
+    # open store; on first start of a new backend import ids from the old json file
+    cls = BACKENDS.get(backend)
+    if cls is None:
+        raise ValueError(f"unknown liked store backend: {backend!r} (use one of {', '.join(BACKENDS)})")
+    first_start = not os.path.exists(path)
+    store = cls(path, flush_every=flush_every, flush_interval=flush_interval, **options)
+    if first_start and cls is not JsonLikedStore and legacy_json and os.path.exists(legacy_json):
+        try:
+            ids = read_json_ids(legacy_json)
+            store._migrate(ids)
+            log("info", f"migrated {len(ids)} liked ids from {legacy_json} to {path}", event="store_migrated", ids=len(ids))
+        except Exception as e:
+            log("warning", "failed to migrate liked file:", e, event="store_error")
+    return store
+
+
+# -------- converter --------
+# python liked_store.py convert liked_images.json liked_images.idx
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "convert":
+        print("usage: python liked_store.py convert <liked_images.json> <output.idx>")
+        sys.exit(2)
+    started = time.perf_counter()
+    count = build_index(read_json_ids(sys.argv[2]), sys.argv[3])
+    log("info", f"wrote {count} ids to {sys.argv[3]} in {time.perf_counter() - started:.2f}s")
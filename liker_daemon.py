@@ -0,0 +1,339 @@
+# warm daemon: one browser + logged-in context that stays up between runs, so cron ticks don't
+# pay for chromium launch, session restore and the feed check every time
+#   python liker_daemon.py serve            run the daemon in this console (first login works here)
+#   python liker_daemon.py like [N]         hand a like job to the daemon (--start: launch it if needed)
+#   python liker_daemon.py status | stop
+# jobs run one after another on the warm context (the main thread, playwright's sync api is bound to
+# it); a listener thread answers status / stop meanwhile and queues like jobs. the daemon exits on
+# "stop" or after DAEMON_IDLE_MINUTES without jobs. it only listens on 127.0.0.1 and every request
+# needs the token from liker_daemon.json, which only the local user can read. a running daemon holds
+# an exclusive lock on liker_daemon.lock, so a busy daemon is never mistaken for a dead one.
+import os
+import sys
+import json
+import time
+import queue
+import socket
+import secrets
+import threading
+import subprocess
+
+from metrics import log
+
+STATE_FILE = "liker_daemon.json"
+LOCK_FILE = "liker_daemon.lock"
+LOG_FILE = "liker_daemon.log"
+START_TIMEOUT = 120  # seconds --start waits for a fresh daemon to come up
+
+EXIT_OK = 0
+EXIT_NO_SESSION = 3
+EXIT_NOT_RUNNING = 4
+
+
+# -------- liveness --------
+def try_lock(path=LOCK_FILE):
+    # -> open file holding the daemon lock, or None when another process holds it
+    f = open(path, "a+")
+    try:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+def release_lock(f):
+    try:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        f.close()
+    except OSError:
+        pass
+
+def daemon_running():
+    # the lock says whether a daemon process is alive, busy or not
+    lock = try_lock()
+    if lock is None:
+        return True
+    release_lock(lock)
+    return False
+
+def wait_for_state(pid=None, timeout=START_TIMEOUT):
+    # a daemon that is still starting (login, feed check) writes its state file once it listens
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        state = read_state()
+        if state and (pid is None or state.get("pid") == pid):
+            return state
+        if pid is None and not daemon_running():
+            return None
+        time.sleep(0.5)
+    return None
+
+
+# -------- client side --------
+def read_state():
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def send_request(cmd, timeout=None, **fields):
+    # -> reply dict, or None when no daemon is listening
+    state = read_state()
+    if not state:
+        return None
+    request = dict(fields, cmd=cmd, token=state.get("token"))
+    try:
+        with socket.create_connection(("127.0.0.1", state["port"]), timeout=5) as conn:
+            conn.settimeout(timeout)
+            conn.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            reply = conn.makefile("rb").readline()
+    except (OSError, KeyError):
+        return None
+    try:
+        return json.loads(reply)
+    except ValueError:
+        return None
+
+def start_daemon():
+    # launch "serve" detached from this console and wait until it answers
+    with open(LOG_FILE, "a", encoding="utf-8") as log_file:
+        kw = {"stdout": log_file, "stderr": subprocess.STDOUT, "stdin": subprocess.DEVNULL}
+        if os.name == "nt":
+            kw["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kw["start_new_session"] = True
+        proc = subprocess.Popen([sys.executable, "-u", os.path.abspath(__file__), "serve", "--background"], **kw)
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            log("error", f"daemon exited during startup (code {proc.returncode}), see {LOG_FILE}")
+            return False
+        state = read_state()
+        if state and state.get("pid") == proc.pid:
+            return True
+        time.sleep(0.5)
+    log("error", f"daemon did not come up within {START_TIMEOUT}s, see {LOG_FILE}")
+    return False
+
+
+# -------- daemon side --------
+def write_state(port, token):
+    tmp = STATE_FILE + ".tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"pid": os.getpid(), "port": port, "token": token, "started": time.time()}, f)
+    os.replace(tmp, STATE_FILE)
+
+def read_request(conn):
+    conn.settimeout(10)
+    line = conn.makefile("rb").readline(65536)
+    try:
+        return json.loads(line)
+    except ValueError:
+        return {}
+
+def reply(conn, payload):
+    try:
+        conn.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+    except OSError:
+        pass
+
+def listen(server, token, jobs, status, stop):
+    # listener thread: status / stop are answered at once, also while a job runs;
+    # like requests are queued with their connection, the main thread replies when the job is done
+    while not stop.is_set():
+        try:
+            conn, _ = server.accept()
+        except socket.timeout:
+            continue
+        except OSError:
+            break
+        request = read_request(conn)
+        cmd = request.get("cmd")
+        if request.get("token") != token:
+            reply(conn, {"ok": False, "error": "bad token"})
+        elif cmd == "like":
+            jobs.put((conn, request))
+            continue
+        elif cmd == "status":
+            reply(conn, {"ok": True, "pid": os.getpid(), "jobs": status["jobs"], "busy": status["busy"],
+                         "queued": jobs.qsize(), "idle_seconds": round(time.monotonic() - status["last_job"])})
+        elif cmd == "stop":
+            reply(conn, {"ok": True})
+            log("info", "stop requested; daemon exiting", event="daemon_exit")
+            stop.set()
+        else:
+            reply(conn, {"ok": False, "error": f"unknown command {cmd!r}"})
+        conn.close()
+
+def run_job(cal, context, liked_ids, target):
+    # one like run on a fresh page of the warm context
+    import tracing
+    started = time.monotonic()
+    page = context.new_page()
+    pw_trace = tracing.start_playwright_trace(context)
+    try:
+        liked = cal.like_feed(context, page, liked_ids, target)
+    finally:
+        tracing.stop_playwright_trace(context, pw_trace)
+        expired = any("/login" in (pg.url or "") for pg in context.pages)
+        for pg in list(context.pages):
+            try:
+                pg.close()
+            except Exception:
+                pass
+        liked_ids.flush()
+    if not expired:
+        cal.save_session_state(context)
+    return {"ok": not expired, "liked": liked, "seconds": round(time.monotonic() - started, 1),
+            "error": "session expired" if expired else None}
+
+def serve(background=False):
+    import civitai_auto_like as cal
+    import metrics
+    import tracing
+    from playwright.sync_api import sync_playwright
+
+    if background:
+        # nobody is watching a detached daemon: never wait for input
+        cal.INTERACTIVE = False
+        cal.AUTO_WAIT_FOR_USER = False
+    lock = try_lock()
+    if lock is None:
+        log("error", "a daemon is already running")
+        return EXIT_OK
+
+    metrics.setup(cal.METRICS_EXPORTERS, cal.METRICS_FILE, cal.METRICS_PORT)
+    if cal.TRACE:
+        tracing.start(cal.TRACE_FILE, profile=cal.TRACE_PROFILE, playwright=cal.TRACE_PLAYWRIGHT)
+    liked_ids = cal.load_liked_ids()
+    log("info", f"loaded {len(liked_ids)} previously liked image ids")
+    idle_timeout = float(cal.DAEMON_IDLE_MINUTES or 0) * 60
+    server = socket.create_server(("127.0.0.1", int(cal.DAEMON_PORT or 0)))
+    server.settimeout(1.0)
+    token = secrets.token_hex(16)
+    jobs = queue.Queue()
+    stop = threading.Event()
+    status = {"jobs": 0, "busy": False, "last_job": time.monotonic()}
+    listener = None
+    try:
+        with sync_playwright() as p:
+            browser, context, page = cal.ensure_valid_session(p)
+            if context is None:
+                log("error", "no usable session; daemon not started")
+                return EXIT_NO_SESSION
+            try:
+                page.close()
+            except Exception:
+                pass
+            status["last_job"] = time.monotonic()
+            listener = threading.Thread(target=listen, args=(server, token, jobs, status, stop),
+                                        name="daemon-listener", daemon=True)
+            listener.start()
+            write_state(server.getsockname()[1], token)
+            log("info", f"daemon ready on 127.0.0.1:{server.getsockname()[1]} (pid {os.getpid()})", event="daemon_ready")
+            try:
+                while not stop.is_set():
+                    if idle_timeout and jobs.empty() and time.monotonic() - status["last_job"] > idle_timeout:
+                        log("info", f"idle for {cal.DAEMON_IDLE_MINUTES} minutes; daemon exiting", event="daemon_exit")
+                        break
+                    try:
+                        conn, request = jobs.get(timeout=1.0)
+                    except queue.Empty:
+                        continue
+                    with conn:
+                        target = int(request.get("target") or cal.TARGET_LIKES)
+                        log("info", f"job {status['jobs'] + 1}: {target} likes", event="daemon_job")
+                        status["busy"] = True
+                        try:
+                            result = run_job(cal, context, liked_ids, target)
+                        except Exception as e:
+                            result = {"ok": False, "error": str(e)[:200]}
+                        status["busy"] = False
+                        status["jobs"] += 1
+                        status["last_job"] = time.monotonic()
+                        reply(conn, result)
+                    if result.get("error") == "session expired":
+                        # a fresh start logs in again; a warm but logged-out context is useless
+                        log("warning", "session expired; daemon exiting", event="daemon_exit")
+                        break
+            finally:
+                stop.set()
+                while not jobs.empty():
+                    conn, _ = jobs.get_nowait()
+                    with conn:
+                        reply(conn, {"ok": False, "error": "daemon stopping"})
+                try:
+                    context.close()
+                except Exception:
+                    pass
+                try:
+                    browser.close()
+                except Exception:
+                    pass
+    finally:
+        stop.set()
+        if listener is not None:
+            listener.join(timeout=5)
+        server.close()
+        liked_ids.close()
+        tracing.stop()
+        metrics.shutdown()
+        state = read_state()
+        if state and state.get("pid") == os.getpid():
+            try:
+                os.remove(STATE_FILE)
+            except OSError:
+                pass
+        release_lock(lock)
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    cmd = args[0] if args else "status"
+    if cmd == "serve":
+        try:
+            sys.exit(serve(background="--background" in args))
+        except KeyboardInterrupt:
+            print("\nINFO: interrupted by user.")
+            sys.exit(0)
+    elif cmd == "like":
+        numbers = [a for a in args[1:] if a.isdigit()]
+        if not daemon_running():
+            if "--start" not in args or not start_daemon():
+                log("error", "no daemon running (start one with: python liker_daemon.py serve, or use --start)")
+                sys.exit(EXIT_NOT_RUNNING)
+        elif not wait_for_state():
+            log("error", "the running daemon did not come up, see " + LOG_FILE)
+            sys.exit(1)
+        result = send_request("like", target=int(numbers[0]) if numbers else None)
+        if not result:
+            log("error", "daemon did not answer")
+            sys.exit(1)
+        if not result.get("ok"):
+            log("error", "job failed:", result.get("error"))
+            sys.exit(1)
+        log("info", f"liked {result['liked']} images in {result['seconds']}s")
+    elif cmd in ("status", "stop"):
+        result = send_request(cmd, timeout=10)
+        if not result:
+            log("info", "no daemon running")
+            sys.exit(EXIT_NOT_RUNNING)
+        if cmd == "status":
+            print(json.dumps(result))
+        else:
+            log("info", "daemon stopping")
+    else:
+        print("usage: python liker_daemon.py serve | like [N] [--start] | status | stop")
+        sys.exit(2)
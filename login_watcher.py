@@ -0,0 +1,264 @@
+# login email watcher: one IMAP connection that stays logged in while the user requests the
+# magic link, wakes up through IDLE when mail arrives and downloads only the text/html part
+# of new CivitAI messages (UID above what was in the inbox when the watcher started)
+import re
+import ssl
+import time
+import quopri
+import base64
+import select
+import imaplib
+import threading
+
+import email_processor
+from metrics import log
+
+CIVITAI_SENDER = "noreply@civitai.com"
+IDLE_RENEW = 25 * 60  # servers drop IDLE after ~30 minutes
+POLL_INTERVAL = 5.0  # servers without IDLE are polled with NOOP
+RECONNECT_DELAY = 5.0
+
+SEXP_TOKENS = re.compile(rb'\(|\)|"(?:[^"\\]|\\.)*"|[^\s()"]+')
+
+
+# -------- BODYSTRUCTURE --------
+def join_literals(data):
+    # imaplib hands literals back as (prefix, literal) tuples; inline them as quoted strings
+    out = b""
+    for item in data:
+        if isinstance(item, tuple):
+            head, literal = item
+            head = re.sub(rb"\{\d+\}$", b"", head)
+            out += head + b'"' + literal.replace(b"\\", b"\\\\").replace(b'"', b'\\"') + b'"'
+        elif item:
+            out += item
+    return out
+
+def parse_sexp(data):
+    # imap parenthesized list -> nested python lists of str / None
+    stack = [[]]
+    for token in SEXP_TOKENS.findall(data):
+        if token == b"(":
+            stack.append([])
+        elif token == b")":
+            if len(stack) > 1:
+                done = stack.pop()
+                stack[-1].append(done)
+        elif token.startswith(b'"'):
+            stack[-1].append(re.sub(rb'\\(.)', rb'\1', token[1:-1]).decode("utf-8", "replace"))
+        elif token.upper() == b"NIL":
+            stack[-1].append(None)
+        else:
+            stack[-1].append(token.decode("utf-8", "replace"))
+    return stack[0]
+
+def find_bodystructure(tree):
+    # the list that follows the BODYSTRUCTURE keyword
+    for node in tree:
+        if isinstance(node, list):
+            for n, item in enumerate(node[:-1]):
+                if isinstance(item, str) and item.upper() == "BODYSTRUCTURE":
+                    return node[n + 1]
+            found = find_bodystructure(node)
+            if found is not None:
+                return found
+    return None
+
+def find_html_part(structure, path=""):
+    # -> (part number, transfer encoding, charset) of the first text/html part, or None
+    if not isinstance(structure, list) or not structure:
+        return None
+    if isinstance(structure[0], list):
+        n = 0
+        for child in structure:
+            if not isinstance(child, list):
+                break
+            n += 1
+            found = find_html_part(child, f"{path}.{n}" if path else str(n))
+            if found:
+                return found
+        return None
+    if len(structure) < 6 or not isinstance(structure[0], str) or not isinstance(structure[1], str):
+        return None
+    if (structure[0].lower(), structure[1].lower()) != ("text", "html"):
+        return None
+    params = structure[2] if isinstance(structure[2], list) else []
+    charset = "utf-8"
+    for key, value in zip(params[::2], params[1::2]):
+        if isinstance(key, str) and key.lower() == "charset" and value:
+            charset = value
+    return path or "1", (structure[5] or "7bit").lower(), charset
+
+def decode_part(raw, encoding, charset):
+    if encoding == "quoted-printable":
+        raw = quopri.decodestring(raw)
+    elif encoding == "base64":
+        raw = base64.b64decode(raw)
+    try:
+        return raw.decode(charset, "replace")
+    except LookupError:
+        return raw.decode("utf-8", "replace")
+
+
+# -------- watcher --------
+class LoginLinkWatcher(threading.Thread):
+
+    def __init__(self, user, password, server, port=993, use_ssl=True, sender=CIVITAI_SENDER,
+                 timeout=600.0, poll_interval=POLL_INTERVAL):
+        super().__init__(daemon=True)
+        self.user = user
+        self.password = password
+        self.server = server
+        self.port = port
+        self.use_ssl = use_ssl
+        self.sender = sender
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.mail = None
+        self.last_uid = None  # highest uid already looked at
+        self.link = None
+        self.found = threading.Event()
+        self.stopped = threading.Event()
+        self.started_at = time.time()
+        self.wakeups = 0
+
+    # connection
+    def connect(self):
+        if self.use_ssl:
+            mail = imaplib.IMAP4_SSL(self.server, self.port, ssl_context=ssl.create_default_context())
+        else:
+            mail = imaplib.IMAP4(self.server, self.port)
+        mail.login(self.user, self.password)
+        mail.select("inbox")
+        if self.last_uid is None:
+            # everything already in the inbox is older than the link we are waiting for
+            typ, data = mail.response("UIDNEXT")
+            if data and data[0]:
+                self.last_uid = int(data[0]) - 1
+            else:
+                typ, data = mail.uid("SEARCH", None, "ALL")
+                uids = data[0].split() if typ == "OK" and data and data[0] else []
+                self.last_uid = max((int(u) for u in uids), default=0)
+        self.mail = mail
+        self.can_idle = b"IDLE" in b" ".join(c.encode() if isinstance(c, str) else c for c in mail.capabilities)
+
+    def disconnect(self):
+        if self.mail is None:
+            return
+        try:
+            self.mail.logout()
+        except Exception:
+            pass
+        self.mail = None
+
+    # one look at the inbox
+    def new_uids(self):
+        since = time.strftime("%d-%b-%Y", time.gmtime(self.started_at - 86400))
+        typ, data = self.mail.uid("SEARCH", None, f"UID {self.last_uid + 1}:*", f'FROM "{self.sender}"', f"SINCE {since}")
+        if typ != "OK" or not data or not data[0]:
+            return []
+        # "n:*" always matches the newest message, even when it is below n
+        return sorted(u for u in (int(x) for x in data[0].split()) if u > self.last_uid)
+
+    def fetch_html(self, uid):
+        typ, data = self.mail.uid("FETCH", str(uid), "(BODYSTRUCTURE)")
+        if typ != "OK" or not data or data[0] is None:
+            return None
+        part = find_html_part(find_bodystructure(parse_sexp(join_literals(data))))
+        if not part:
+            return None
+        section, encoding, charset = part
+        typ, data = self.mail.uid("FETCH", str(uid), f"(BODY.PEEK[{section}])")
+        if typ != "OK":
+            return None
+        raw = b"".join(item[1] for item in data if isinstance(item, tuple))
+        return decode_part(raw, encoding, charset)
+
+    def check(self):
+        for uid in self.new_uids():
+            html = self.fetch_html(uid)
+            self.last_uid = max(self.last_uid, uid)
+            link = email_processor.extract_login_link(html) if html else None
+            if link:
+                return link
+        return None
+
+    # waiting
+    def idle(self, seconds):
+        # IMAP IDLE (RFC 2177) by hand, imaplib has no idle(); True when the server announced new mail
+        mail = self.mail
+        tag = mail._new_tag()
+        mail.send(tag + b" IDLE\r\n")
+        if not mail.readline().startswith(b"+"):
+            raise imaplib.IMAP4.error("IDLE rejected")
+        woke = False
+        deadline = time.monotonic() + seconds
+        try:
+            while not self.stopped.is_set() and time.monotonic() < deadline:
+                pending = getattr(mail.sock, "pending", lambda: 0)()
+                if not pending:
+                    ready, _, _ = select.select([mail.sock], [], [], min(1.0, max(0.0, deadline - time.monotonic())))
+                    if not ready:
+                        continue
+                line = mail.readline()
+                if not line:
+                    raise OSError("connection closed during IDLE")
+                if b"EXISTS" in line or b"RECENT" in line:
+                    woke = True
+                    break
+        finally:
+            mail.send(b"DONE\r\n")
+            while True:
+                line = mail.readline()
+                if not line or line.startswith(tag):
+                    break
+        if woke:
+            self.wakeups += 1
+        return woke
+
+    def run(self):
+        # found is always set on exit, so wait() never hangs on a watcher that died
+        try:
+            self.watch()
+        finally:
+            self.disconnect()
+            self.found.set()
+
+    def watch(self):
+        deadline = time.monotonic() + self.timeout
+        while not self.stopped.is_set() and time.monotonic() < deadline:
+            try:
+                if self.mail is None:
+                    self.connect()
+                link = self.check()
+                if link:
+                    self.link = link
+                    self.found.set()
+                    break
+                remaining = deadline - time.monotonic()
+                if self.can_idle:
+                    self.idle(min(IDLE_RENEW, remaining))
+                else:
+                    self.stopped.wait(min(self.poll_interval, max(0.0, remaining)))
+                    self.mail.noop()
+            except Exception as e:
+                # imap/socket errors, but also parse errors on an odd message: reconnect and keep polling
+                log("warning", "login email watcher:", f"{type(e).__name__}: {str(e)[:200]}", event="watcher_error")
+                self.disconnect()
+                self.stopped.wait(RECONNECT_DELAY)
+
+    def wait(self, timeout=None):
+        # -> login link, or None when it did not arrive in time
+        self.found.wait(timeout)
+        return self.link
+
+    def stop(self):
+        self.stopped.set()
+
+
+def start_watcher(timeout=600.0):
+    # watcher for the configured mailbox (settings are read from email_processor at call time)
+    watcher = LoginLinkWatcher(email_processor.YOUR_EMAIL, email_processor.EMAIL_PASSWORD,
+                               email_processor.IMAP_SERVER, email_processor.IMAP_PORT, timeout=timeout)
+    watcher.start()
+    return watcher
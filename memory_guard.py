@@ -0,0 +1,167 @@
+# bounded memory for long runs: sample js heap / dom size / renderer rss and either prune
+# already-processed cards from the DOM or tell the caller to recycle the page
+import os
+import time
+
+from metrics import log
+
+# clears cards that are far above the viewport and were already looked at by the liker
+# (scan tags them data-cal-key, the observer data-cal-seen); the card box keeps its height
+# so scroll position and the infinite loader are not disturbed
+PRUNE_JS = r"""
+keepScreens => {
+  const limit = window.scrollY - window.innerHeight * keepScreens;
+  if (limit <= 0) return 0;
+  let pruned = 0;
+  document.querySelectorAll('button[data-cal-key], button[data-cal-seen]').forEach(btn => {
+    let card = btn;
+    for (let i = 0; i < 6 && card.parentElement; i++) {
+      if (card.querySelector('a[href^="/images/"]')) break;
+      card = card.parentElement;
+    }
+    if (card.hasAttribute('data-cal-pruned')) return;
+    const r = card.getBoundingClientRect();
+    if (r.bottom + window.scrollY > limit) return;
+    card.style.height = r.height + 'px';
+    card.style.minHeight = r.height + 'px';
+    card.replaceChildren();
+    card.setAttribute('data-cal-pruned', '1');
+    pruned++;
+  });
+  return pruned;
+}
+"""
+
+SAMPLE_JS = r"""
+() => ({
+  heap: (performance.memory && performance.memory.usedJSHeapSize) || null,
+  nodes: document.getElementsByTagName('*').length,
+})
+"""
+
+
+def renderer_rss_bytes():
+    # linux only: summed rss of chromium renderer processes started below this python process
+    if not os.path.isdir("/proc"):
+        return None
+    me = os.getpid()
+    parents = {}
+    renderers = []
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/stat", "rb") as f:
+                stat = f.read().decode("utf-8", "replace")
+            parents[int(pid)] = int(stat.rsplit(")", 1)[1].split()[1])
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                if b"--type=renderer" in f.read():
+                    renderers.append(int(pid))
+        except (OSError, ValueError, IndexError):
+            continue
+    total = 0
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    for pid in renderers:
+        cur, hops = pid, 0
+        while cur not in (0, 1, me) and hops < 16:
+            cur, hops = parents.get(cur, 0), hops + 1
+        if cur != me:
+            continue
+        try:
+            with open(f"/proc/{pid}/statm") as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, ValueError, IndexError):
+            pass
+    return total
+
+
+class MemoryGuard:
+    # mode: "off" | "prune" | "recycle"; checked every check_every scroll cycles
+
+    def __init__(self, mode="off", check_every=10, max_heap_mb=512, recycle_after_cards=2000, keep_screens=3):
+        self.mode = mode
+        self.check_every = max(1, int(check_every))
+        self.max_heap = max_heap_mb * 2**20 if max_heap_mb else 0
+        self.recycle_after_cards = int(recycle_after_cards or 0)
+        self.keep_screens = keep_screens
+        self.cycles = 0
+        self.cards_on_page = 0
+        self.samples = []
+        self.pruned = 0
+        self.recycles = 0
+        self.peak = {"heap": 0, "nodes": 0, "renderer_rss": 0}
+
+    def record(self, sample):
+        sample["t"] = time.time()
+        self.samples.append(sample)
+        del self.samples[:-200]
+        for key in self.peak:
+            if sample.get(key):
+                self.peak[key] = max(self.peak[key], sample[key])
+        return sample
+
+    def sample(self, page):
+        try:
+            sample = page.evaluate(SAMPLE_JS)
+        except Exception:
+            sample = {"heap": None, "nodes": None}
+        sample["renderer_rss"] = renderer_rss_bytes()
+        return self.record(sample)
+
+    async def sample_async(self, page):
+        try:
+            sample = await page.evaluate(SAMPLE_JS)
+        except Exception:
+            sample = {"heap": None, "nodes": None}
+        sample["renderer_rss"] = renderer_rss_bytes()
+        return self.record(sample)
+
+    def over_limit(self, sample):
+        heap = sample.get("heap") or 0
+        return bool(self.max_heap and heap > self.max_heap)
+
+    def after_cycle(self, page, cards_seen):
+        # sync loop hook; returns True when the caller should recycle the page
+        if self.mode == "off":
+            return False
+        self.cycles += 1
+        self.cards_on_page += cards_seen
+        if self.mode == "recycle" and self.recycle_after_cards and self.cards_on_page >= self.recycle_after_cards:
+            return True
+        if self.cycles % self.check_every:
+            return False
+        sample = self.sample(page)
+        if self.mode == "prune":
+            self.prune(page)
+            return False
+        return self.over_limit(sample)
+
+    async def after_cycle_async(self, page, cards_seen):
+        # async engine: sampling + pruning (recycling is done by the sync loop only)
+        if self.mode == "off":
+            return False
+        self.cycles += 1
+        if self.cycles % self.check_every:
+            return False
+        await self.sample_async(page)
+        if self.mode in ("prune", "recycle"):
+            try:
+                self.pruned += await page.evaluate(PRUNE_JS, self.keep_screens) or 0
+            except Exception as e:
+                log("warning", "DOM prune failed:", str(e)[:200], event="prune_failed")
+        return False
+
+    def prune(self, page):
+        try:
+            self.pruned += page.evaluate(PRUNE_JS, self.keep_screens) or 0
+        except Exception as e:
+            log("warning", "DOM prune failed:", str(e)[:200], event="prune_failed")
+
+    def recycled(self):
+        self.recycles += 1
+        self.cards_on_page = 0
+
+    def summary(self):
+        mb = lambda v: f"{v / 2**20:.0f} MiB" if v else "n/a"
+        return (f"memory: mode {self.mode}, peak js heap {mb(self.peak['heap'])}, peak dom nodes {self.peak['nodes'] or 'n/a'}, "
+                f"peak renderer rss {mb(self.peak['renderer_rss'])}, {self.pruned} cards pruned, {self.recycles} page recycles")
@@ -0,0 +1,243 @@
+# metrics + structured log events
+#   inc("likes_total"), observe("phase_seconds", dt, phase="scroll"), with timer("click_confirm"): ...
+#   log("info", "liked image", event="liked", image_id=...) prints "INFO: liked image" as before and hands
+#   the event to the exporters
+# exporters (METRICS_EXPORTERS): "jsonl" - events + periodic metric snapshots appended to METRICS_FILE,
+# "prometheus" - text exposition on http://127.0.0.1:METRICS_PORT/metrics
+# counting is a dict update under a lock, cheap enough to stay on all the time
+import json
+import time
+import bisect
+import threading
+
+PREFIX = "civitai_liker_"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+HELP = {
+    "likes_total": "images liked",
+    "like_failures_total": "likes that were not confirmed",
+    "like_retries_total": "failed likes queued for another attempt",
+    "empty_scrolls_total": "scroll cycles without any reaction button",
+    "cards_seen_total": "cards looked at by the like loop",
+    "cards_skipped_total": "cards skipped, by reason",
+    "phase_seconds": "time spent per phase",
+    "log_events_total": "log events, by level",
+    "rate_limited_total": "429 responses that paused the likes",
+}
+
+
+class Histogram:
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last one = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        # upper bound of the bucket holding the q-th observation
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Registry:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}  # (name, labels) -> number
+        self.histograms = {}  # (name, labels) -> Histogram
+        self.started = time.time()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram()
+            hist.observe(value)
+
+    def snapshot(self):
+        with self.lock:
+            counters = [{"name": n, "labels": dict(l), "value": v} for (n, l), v in sorted(self.counters.items())]
+            histograms = [{"name": n, "labels": dict(l), "count": h.count, "sum": round(h.sum, 6),
+                           "p50": h.quantile(0.5), "p95": h.quantile(0.95)}
+                          for (n, l), h in sorted(self.histograms.items())]
+        return {"uptime": round(time.time() - self.started, 3), "counters": counters, "histograms": histograms}
+
+    def prometheus(self):
+        def fmt(labels, extra=()):
+            items = list(labels) + list(extra)
+            if not items:
+                return ""
+            return "{" + ",".join(f'{k}="{str(v)}"' for k, v in items) + "}"
+
+        lines = []
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((k, (h.buckets, list(h.counts), h.sum, h.count)) for k, h in self.histograms.items())
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# HELP {PREFIX}{name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {PREFIX}{name} counter")
+            lines.append(f"{PREFIX}{name}{fmt(labels)} {value}")
+        for (name, labels), (buckets, counts, total, count) in histograms:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# HELP {PREFIX}{name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {PREFIX}{name} histogram")
+            cumulative = 0
+            for bound, n in zip(buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{PREFIX}{name}_bucket{fmt(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{PREFIX}{name}_sum{fmt(labels)} {total}")
+            lines.append(f"{PREFIX}{name}_count{fmt(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+EXPORTERS = []
+TIMER_HOOKS = []  # fn(phase, started, ended) with perf_counter times; tracing.py turns timers into spans
+
+
+# -------- exporters --------
+class JsonlExporter:
+    # one json object per line: {"type": "event", ...} for log events, {"type": "metrics", ...} snapshots
+
+    def __init__(self, path, snapshot_interval=60.0):
+        self.path = path
+        self.file = open(path, "a", encoding="utf-8", buffering=1)
+        self.lock = threading.Lock()
+        self.snapshot_interval = snapshot_interval
+        self.next_snapshot = time.monotonic() + snapshot_interval
+
+    def write(self, record):
+        line = json.dumps(record, default=str)
+        with self.lock:
+            self.file.write(line + "\n")
+
+    def event(self, record):
+        self.write(dict(record, type="event"))
+        if self.snapshot_interval and time.monotonic() >= self.next_snapshot:
+            self.next_snapshot = time.monotonic() + self.snapshot_interval
+            self.write_snapshot()
+
+    def write_snapshot(self):
+        self.write(dict(REGISTRY.snapshot(), type="metrics", ts=round(time.time(), 3)))
+
+    def close(self):
+        self.write_snapshot()
+        with self.lock:
+            self.file.close()
+
+
+class PrometheusExporter:
+    # scrape endpoint in a daemon thread; lives until the process exits
+
+    def __init__(self, port=9464, host="127.0.0.1"):
+        from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = REGISTRY.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def event(self, record):
+        pass
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# -------- api --------
+def inc(name, value=1, **labels):
+    REGISTRY.inc(name, value, **labels)
+
+def observe(name, value, **labels):
+    REGISTRY.observe(name, value, **labels)
+
+
+class timer:
+    # with timer("scroll"): ...  -> phase_seconds{phase="scroll"}
+
+    __slots__ = ("phase", "started")
+
+    def __init__(self, phase):
+        self.phase = phase
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        ended = time.perf_counter()
+        REGISTRY.observe("phase_seconds", ended - self.started, phase=self.phase)
+        for hook in TIMER_HOOKS:
+            hook(self.phase, self.started, ended)
+        return False
+
+
+def log(level, *parts, event=None, **fields):
+    # console line stays "LEVEL: message" (parts joined like print does)
+    message = " ".join(str(p) for p in parts)
+    print(f"{level.upper()}: {message}")
+    REGISTRY.inc("log_events_total", level=level)
+    if EXPORTERS:
+        record = {"ts": round(time.time(), 3), "level": level, "event": event or "log", "msg": message}
+        record.update(fields)
+        for exporter in EXPORTERS:
+            try:
+                exporter.event(record)
+            except Exception:
+                pass
+
+def setup(exporters=(), path="metrics.jsonl", port=9464, snapshot_interval=60.0):
+    for name in exporters:
+        try:
+            if name == "jsonl":
+                EXPORTERS.append(JsonlExporter(path, snapshot_interval))
+            elif name == "prometheus":
+                EXPORTERS.append(PrometheusExporter(port))
+            else:
+                print(f"WARNING: unknown metrics exporter {name!r}")
+        except Exception as e:
+            print(f"WARNING: metrics exporter {name!r} not started:", e)
+
+def shutdown():
+    while EXPORTERS:
+        try:
+            EXPORTERS.pop().close()
+        except Exception:
+            pass
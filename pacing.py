@@ -0,0 +1,211 @@
+# like pacing shared by every engine: per-minute / per-hour / per-day budgets
+# (MAX_LIKES_PER_MINUTE / _HOUR / _DAY, 0 = no limit) plus an automatic backoff after 429s and errors.
+# the times of recent likes are kept, and a like only goes out when no window of a minute / hour / day
+# would hold more than its budget - a hard cap, a fresh run can't burst past it. like times and backoff
+# live in PACING_STATE_FILE, a cron run started five minutes after the last one still sees what that one used.
+# min_interval spaces every like out as well (the old fixed delay between likes), so not even
+# the first likes of a run go out back to back.
+#   delay = pacer.reserve()   -> seconds to wait before the next like (its slot already taken),
+#                                None when that would be longer than max_wait (budget used up)
+import os
+import json
+import time
+import tempfile
+from urllib.parse import urlsplit
+
+from metrics import log, inc
+
+WINDOWS = (("minute", 60.0), ("hour", 3600.0), ("day", 86400.0))
+RETRY_AFTER_DEFAULT = 30.0  # 429 without a usable Retry-After header
+ERROR_BACKOFF_BASE = 2.0  # first pause after a failed like, doubles per failure in a row
+MAX_BACKOFF = 900.0
+
+
+def format_wait(seconds):
+    if seconds >= 3600:
+        return f"{int(seconds // 3600)}h{int(seconds % 3600 // 60):02d}m"
+    if seconds >= 60:
+        return f"{int(seconds // 60)}m{int(seconds % 60):02d}s"
+    return f"{seconds:.1f}s"
+
+
+class Window:
+    # at most budget likes in any stretch of seconds
+
+    def __init__(self, name, budget, seconds):
+        self.name = name
+        self.budget = int(budget)
+        self.seconds = seconds
+
+    def wait_time(self, likes, now):
+        # likes: sorted like times (reserved ones can lie ahead of now)
+        if len(likes) < self.budget:
+            return 0.0
+        return max(0.0, likes[-self.budget] + self.seconds - now)
+
+
+class Pacer:
+
+    def __init__(self, per_minute=0, per_hour=0, per_day=0, state_file=None, max_wait=900.0, clock=time.time,
+                 min_interval=0.0, api_host=None, api_patterns=()):
+        budgets = {"minute": per_minute, "hour": per_hour, "day": per_day}
+        self.windows = [Window(name, budgets[name], seconds) for name, seconds in WINDOWS if budgets[name] >= 1]
+        self.likes = []  # times of the latest likes, as many as the biggest budget needs
+        self.min_interval = float(min_interval or 0)
+        self.api_host = api_host  # watch(): only responses from this host...
+        self.api_patterns = tuple(p for p in api_patterns if p)  # ...and these endpoints count
+        self.state_file = state_file
+        self.max_wait = max_wait
+        self.clock = clock
+        self.backoff_until = 0.0
+        self.backoff_level = 0  # failures / 429s in a row
+        self.reserved = 0
+        self.waited = 0.0
+        self.limited_by = {}  # window name -> times it was the one we waited for
+        self.backoffs = 0
+        self.load()
+
+    # persistence
+    def load(self):
+        if not self.state_file:
+            return
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        try:
+            self.likes = sorted(float(t) for t in state.get("likes") or [])
+        except (TypeError, ValueError):
+            self.likes = []
+        self.backoff_until = float(state.get("backoff_until", 0))
+        self.backoff_level = int(state.get("backoff_level", 0))
+
+    def save(self):
+        if not self.state_file:
+            return
+        state = {
+            "likes": [round(t, 3) for t in self.likes],
+            "backoff_until": self.backoff_until,
+            "backoff_level": self.backoff_level,
+        }
+        folder = os.path.dirname(os.path.abspath(self.state_file))
+        try:
+            fd, tmp_path = tempfile.mkstemp(prefix="pacing_", suffix=".json", dir=folder)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_file)
+        except OSError as e:
+            log("warning", "failed to save pacing state:", e)
+
+    # budget
+    def forget(self, now):
+        # drop like times no window looks at any more
+        if not self.windows:
+            self.likes = [t for t in self.likes[-1:] if t > now - self.min_interval]
+            return
+        longest = max(max(w.seconds for w in self.windows), self.min_interval)
+        keep = max(max(w.budget for w in self.windows), 1)
+        self.likes = [t for t in self.likes if t > now - longest][-keep:]
+
+    def reserve(self):
+        now = self.clock()
+        self.forget(now)
+        delay, reason = max(0.0, self.backoff_until - now), "backoff"
+        if self.min_interval and self.likes:
+            wait = self.likes[-1] + self.min_interval - now
+            if wait > delay:
+                delay, reason = wait, "spacing"
+        for window in self.windows:
+            wait = window.wait_time(self.likes, now)
+            if wait > delay:
+                delay, reason = wait, f"per {window.name}"
+        if self.max_wait and delay > self.max_wait:
+            log("warning", f"like budget used up ({reason}); next like possible in {format_wait(delay)} — stopping",
+                event="budget_exhausted", limit=reason, wait=round(delay, 1))
+            return None
+        if self.windows or self.min_interval:
+            # never before a like reserved earlier, so the times stay sorted
+            self.likes.append(max(now + delay, self.likes[-1] if self.likes else 0.0))
+        self.reserved += 1
+        if delay > 0:
+            self.waited += delay
+            self.limited_by[reason] = self.limited_by.get(reason, 0) + 1
+        if self.windows or self.min_interval:
+            self.save()
+        return delay
+
+    def backoff_remaining(self):
+        return max(0.0, self.backoff_until - self.clock())
+
+    # server feedback
+    def success(self):
+        if self.backoff_level:
+            self.backoff_level = 0
+            self.save()
+
+    def failure(self):
+        # server error: exponential pause, reset by the next confirmed like.
+        # errors while already pausing belong to the same pause and don't deepen it
+        if self.backoff_remaining() > 0:
+            return
+        self.backoff_level += 1
+        self.pause(ERROR_BACKOFF_BASE * 2 ** (self.backoff_level - 1))
+
+    def rate_limited(self, retry_after=None):
+        # 429: wait what the server asked for (or an exponential guess); during a pause a
+        # Retry-After can only make it longer, the backoff level goes up once per pause
+        inc("rate_limited_total")
+        paused = self.backoff_remaining() > 0
+        if not paused:
+            self.backoff_level += 1
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = RETRY_AFTER_DEFAULT * 2 ** (max(1, self.backoff_level) - 1)
+        if paused and self.clock() + min(MAX_BACKOFF, delay) <= self.backoff_until:
+            return
+        self.pause(delay)
+        log("warning", f"rate limited by the server, pausing likes for {format_wait(self.backoff_remaining())}",
+            event="rate_limited", wait=round(self.backoff_remaining(), 1))
+
+    def pause(self, seconds):
+        seconds = min(MAX_BACKOFF, max(1.0, seconds))
+        if self.backoff_remaining() <= 0:
+            self.backoffs += 1
+        self.backoff_until = max(self.backoff_until, self.clock() + seconds)
+        self.save()
+
+    def counts(self, url):
+        # response of the site's own feed / reaction api? (not beacons, analytics or other trpc calls)
+        parts = urlsplit(url)
+        if "/api/" not in parts.path:
+            return False
+        if self.api_host and parts.hostname != self.api_host:
+            return False
+        return not self.api_patterns or any(p in url for p in self.api_patterns)
+
+    def watch(self, target):
+        # page or context: a 429 / 5xx from the feed or reaction api pauses the likes
+        def on_response(response):
+            try:
+                if not self.counts(response.url):
+                    return
+                if response.status == 429:
+                    self.rate_limited(response.headers.get("retry-after"))
+                elif response.status >= 500:
+                    self.failure()
+            except Exception:
+                pass
+        try:
+            target.on("response", on_response)
+        except Exception as e:
+            log("warning", "failed to watch responses for rate limiting:", e)
+
+    def summary(self):
+        if not self.windows and not self.backoffs:
+            return "pacing: no like budget set"
+        budgets = ", ".join(f"{w.budget}/{w.name}" for w in self.windows) or "none"
+        limited = ", ".join(f"{k} {v}x" for k, v in sorted(self.limited_by.items())) or "never"
+        return (f"pacing: budgets {budgets}; {self.reserved} likes paced, waited {format_wait(self.waited)} "
+                f"(limited by: {limited}), {self.backoffs} backoffs")
@@ -0,0 +1,122 @@
+# request filtering for the browser context (context.route): the liker only needs the page
+# markup, scripts and api calls - full-size images, videos, fonts and trackers are blocked or stubbed
+import re
+import threading
+
+# 1x1 transparent gif, served instead of blocked images so layouts keep their boxes
+STUB_GIF = (b"GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00"
+            b",\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;")
+
+DEFAULT_BLOCK_TYPES = ("image", "media", "font")
+# rough per-request sizes, only used for the "saved" estimate until real responses of that type were seen
+SIZE_GUESS = {"image": 150_000, "media": 2_000_000, "font": 40_000, "script": 60_000, "xhr": 2_000, "fetch": 2_000}
+DEFAULT_BLOCK_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "adservice.google.com",
+    "facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+    "cloudflareinsights.com",
+    "plausible.io",
+    "sentry.io",
+    "adsymptotic.com",
+    "snigelweb.com",
+)
+# never blocked unless on a blocked domain: reaction ui + api, auth and the challenge pages
+DEFAULT_ALLOW_PATTERNS = (
+    r"/api/",
+    r"challenges\.cloudflare\.com",
+    r"/login",
+)
+
+
+class ResourceFilter:
+    # counts what it blocks and what it lets through; bytes of blocked requests are unknown
+    # up front, so "saved" is estimated from the average size of allowed responses of the same type
+
+    def __init__(self, block_types=DEFAULT_BLOCK_TYPES, block_domains=DEFAULT_BLOCK_DOMAINS,
+                 allow_patterns=DEFAULT_ALLOW_PATTERNS, stub_images=True):
+        self.block_types = set(block_types)
+        self.block_domains = tuple(d.lower() for d in block_domains)
+        self.allow = [re.compile(p) for p in allow_patterns]
+        self.stub_images = stub_images
+        self.lock = threading.Lock()
+        self.blocked = {}  # resource type -> count
+        self.allowed = {}  # resource type -> [count, bytes]
+        self.stubbed = 0
+        self.stub_requests = set()  # fulfilled by us: their responses are not real traffic
+
+    def decide(self, url, resource_type):
+        # -> "allow" | "block" | "stub"
+        # blocked domains go first: tracker beacons (sentry.io/api/<n>/envelope/, plausible.io/api/event)
+        # would match the "/api/" allow pattern otherwise
+        host = url.split("://", 1)[-1].split("/", 1)[0].split(":", 1)[0].lower()
+        if any(host == d or host.endswith("." + d) for d in self.block_domains):
+            return "block"
+        if any(p.search(url) for p in self.allow):
+            return "allow"
+        if resource_type in self.block_types:
+            return "stub" if resource_type == "image" and self.stub_images else "block"
+        return "allow"
+
+    def handle(self, route):
+        request = route.request
+        action = self.decide(request.url, request.resource_type)
+        if action == "allow":
+            return route.continue_()
+        with self.lock:
+            self.blocked[request.resource_type] = self.blocked.get(request.resource_type, 0) + 1
+            if action == "stub":
+                self.stubbed += 1
+                self.stub_requests.add(request)
+        if action == "stub":
+            return route.fulfill(status=200, content_type="image/gif", body=STUB_GIF)
+        return route.abort("blockedbyclient")
+
+    def on_response(self, response):
+        # content-length is enough here; no need to download bodies just to count them
+        try:
+            request = response.request
+            size = int(response.headers.get("content-length") or 0)
+            rtype = request.resource_type
+        except Exception:
+            return
+        with self.lock:
+            if request in self.stub_requests:
+                self.stub_requests.discard(request)
+                return
+            entry = self.allowed.setdefault(rtype, [0, 0])
+            entry[0] += 1
+            entry[1] += size
+
+    def install(self, context):
+        context.route("**/*", self.handle)
+        context.on("response", self.on_response)
+        return self
+
+    def stats(self):
+        with self.lock:
+            blocked = dict(self.blocked)
+            allowed = {k: list(v) for k, v in self.allowed.items()}
+        saved_bytes = 0
+        for rtype, count in blocked.items():
+            seen, size = allowed.get(rtype, (0, 0))
+            saved_bytes += count * (size // seen if seen and size else SIZE_GUESS.get(rtype, 0))
+        return {
+            "blocked_requests": sum(blocked.values()),
+            "blocked_by_type": blocked,
+            "stubbed_images": self.stubbed,
+            "allowed_requests": sum(v[0] for v in allowed.values()),
+            "allowed_bytes": sum(v[1] for v in allowed.values()),
+            "estimated_saved_bytes": saved_bytes,
+        }
+
+    def summary(self):
+        st = self.stats()
+        by_type = ", ".join(f"{k} {v}" for k, v in sorted(st["blocked_by_type"].items())) or "nothing"
+        saved = f"~{st['estimated_saved_bytes'] / 2**20:.1f} MiB saved (estimate)"
+        return (f"resource filter: blocked {st['blocked_requests']} requests ({by_type}), {saved}; "
+                f"allowed {st['allowed_requests']} requests / {st['allowed_bytes'] / 2**20:.1f} MiB")
@@ -0,0 +1,135 @@
+# adaptive scrolling: scroll, then wait in-page for a real signal instead of a random sleep
+#   cards   - reaction buttons the liker has not looked at yet are in the DOM
+#   settled - a feed request finished but brought nothing new
+#   end     - bottom of the feed reached and nothing is loading
+#   timeout - none of the above within the current timeout
+# step size and timeout follow the observed load latency
+import time
+
+from metrics import log
+
+# args: [selector, step (viewport heights), timeoutMs, feedPattern]
+ADVANCE_JS = r"""
+([selector, step, timeoutMs, feedPattern]) => new Promise(resolve => {
+  const LIKE = '\u{1F44D}';
+  const fresh = () => {
+    let buttons = Array.from(document.querySelectorAll(selector));
+    if (!buttons.length) buttons = Array.from(document.querySelectorAll('button'))
+      .filter(b => (b.innerText || '').includes(LIKE));
+    return buttons.filter(b => !b.hasAttribute('data-cal-key') && !b.hasAttribute('data-cal-seen')).length;
+  };
+  const atBottom = () => window.scrollY + window.innerHeight >= document.documentElement.scrollHeight - 2;
+  const started = performance.now();
+  let settled = false;
+  let timer = null;
+  let poll = null;
+  let perf = null;
+  const observer = new MutationObserver(() => { if (fresh()) done('cards'); });
+  const done = signal => {
+    if (settled) return;
+    settled = true;
+    observer.disconnect();
+    if (perf) perf.disconnect();
+    clearTimeout(timer);
+    clearInterval(poll);
+    resolve({signal: signal, fresh: fresh(), waited_ms: performance.now() - started, bottom: atBottom()});
+  };
+  window.scrollBy(0, window.innerHeight * step);
+  if (fresh()) return done('cards');
+  observer.observe(document.body, {childList: true, subtree: true});
+  if (feedPattern && window.PerformanceObserver) {
+    perf = new PerformanceObserver(list => {
+      if (list.getEntries().some(e => e.name.includes(feedPattern))) {
+        // response is in; give the app a moment to render it
+        setTimeout(() => done(fresh() ? 'cards' : 'settled'), 300);
+      }
+    });
+    try { perf.observe({type: 'resource', buffered: false}); } catch (e) {}
+  }
+  let lastHeight = document.documentElement.scrollHeight;
+  let quiet = 0;
+  poll = setInterval(() => {
+    const height = document.documentElement.scrollHeight;
+    quiet = height === lastHeight ? quiet + 1 : 0;
+    lastHeight = height;
+    if (atBottom() && quiet >= 6) done('end');
+  }, 250);
+  timer = setTimeout(() => done('timeout'), timeoutMs);
+})
+"""
+
+
+class ScrollScheduler:
+
+    def __init__(self, selector, feed_pattern="", min_timeout=1.0, max_timeout=10.0,
+                 base_step=1.3, max_step=4.0, clock=time.monotonic):
+        self.selector = selector
+        self.feed_pattern = feed_pattern
+        self.min_timeout = float(min_timeout)
+        self.max_timeout = float(max_timeout)
+        self.base_step = float(base_step)
+        self.max_step = float(max_step)
+        self.step = self.base_step
+        self.timeout = min(self.max_timeout, max(self.min_timeout, 3.0))
+        self.latency = None  # EWMA of seconds until new cards showed up
+        self.clock = clock
+        self.started = clock()
+        self.waiting = 0.0
+        self.scrolls = 0
+        self.signals = {}
+        self.end_streak = 0
+
+    def args(self):
+        return [self.selector, self.step, int(self.timeout * 1000), self.feed_pattern]
+
+    def record(self, result, elapsed):
+        # adapt to what the last scroll showed
+        signal = (result or {}).get("signal", "timeout")
+        self.scrolls += 1
+        self.waiting += elapsed
+        self.signals[signal] = self.signals.get(signal, 0) + 1
+        self.end_streak = self.end_streak + 1 if signal == "end" else 0
+        if signal == "cards":
+            waited = (result.get("waited_ms") or 0) / 1000.0
+            if waited < 0.05:
+                # content was already there: bigger steps until the feed has to load again
+                self.step = min(self.max_step, self.step * 1.5)
+            else:
+                self.latency = waited if self.latency is None else 0.7 * self.latency + 0.3 * waited
+                self.step = max(self.base_step, self.step * 0.75)
+            if self.latency is not None:
+                self.timeout = min(self.max_timeout, max(self.min_timeout, self.latency * 3))
+        elif signal == "timeout":
+            # slow network: be more patient next time, don't run ahead
+            self.timeout = min(self.max_timeout, self.timeout * 1.5)
+            self.step = self.base_step
+        return signal
+
+    def advance(self, page):
+        # sync playwright: scroll + wait is a single round trip
+        started = self.clock()
+        try:
+            result = page.evaluate(ADVANCE_JS, self.args())
+        except Exception as e:
+            log("warning", "scroll failed:", str(e)[:200], event="scroll_failed")
+            result = None
+        return self.record(result, self.clock() - started)
+
+    async def advance_async(self, page):
+        started = self.clock()
+        try:
+            result = await page.evaluate(ADVANCE_JS, self.args())
+        except Exception as e:
+            log("warning", "scroll failed:", str(e)[:200], event="scroll_failed")
+            result = None
+        return self.record(result, self.clock() - started)
+
+    def feed_exhausted(self, streak=3):
+        return self.end_streak >= streak
+
+    def summary(self):
+        total = max(1e-9, self.clock() - self.started)
+        signals = ", ".join(f"{k} {v}" for k, v in sorted(self.signals.items())) or "none"
+        latency = f"{self.latency:.2f}s" if self.latency is not None else "n/a"
+        return (f"scrolling: {self.scrolls} scrolls, waiting {self.waiting:.1f}s / working {total - self.waiting:.1f}s "
+                f"({self.waiting / total:.0%} waiting), load latency {latency}, signals: {signals}")
@@ -0,0 +1,114 @@
+# cheap session check before any browser is launched:
+#   1. cookie expiries in the saved storage state (no network, instant)
+#   2. if the cookies still look fine: one GET /api/auth/session with those cookies
+#   3. the answer is cached for a few minutes next to the session file
+# check_session() -> True (valid), False (expired / logged out), None (could not tell - do the page check)
+# only a 200 from the session endpoint can say False; blocked / failed requests are None
+import os
+import json
+import time
+from urllib.parse import urlsplit
+
+SESSION_ENDPOINT = "/api/auth/session"
+# next-auth session cookie names (civitai renames the default one)
+SESSION_COOKIE_MARKERS = ("civitai-token", "session-token")
+EXPIRY_MARGIN = 60  # seconds; a cookie about to expire counts as expired
+
+
+def load_state(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def cookies_for(state, url, now=None):
+    # cookies of the storage state that a browser would send to url
+    now = time.time() if now is None else now
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    cookies = []
+    for c in (state or {}).get("cookies", []):
+        domain = (c.get("domain") or "").lstrip(".").lower()
+        if not domain or not (host == domain or host.endswith("." + domain)):
+            continue
+        if not (parts.path or "/").startswith(c.get("path") or "/"):
+            continue
+        if c.get("secure") and parts.scheme != "https" and host not in ("localhost", "127.0.0.1"):
+            continue
+        expires = c.get("expires", -1)
+        if expires is not None and 0 < expires < now:
+            continue
+        cookies.append(c)
+    return cookies
+
+def cookie_verdict(state, url, now=None):
+    # False = no session cookie left (or all of them expire now), None = looks alive, ask the server
+    now = time.time() if now is None else now
+    session = [c for c in (state or {}).get("cookies", [])
+               if any(m in (c.get("name") or "") for m in SESSION_COOKIE_MARKERS)]
+    if not session:
+        return False
+    alive = [c for c in cookies_for({"cookies": session}, url, now)
+             if not (0 < c.get("expires", -1) < now + EXPIRY_MARGIN)]
+    return None if alive else False
+
+def probe_session(state, base_url, timeout=5.0):
+    # one authenticated request; next-auth answers {} for a logged-out session
+    import urllib.request  # only needed on a cache miss, keeps startup light
+    url = base_url.rstrip("/") + SESSION_ENDPOINT
+    header = "; ".join(f"{c['name']}={c['value']}" for c in cookies_for(state, url))
+    request = urllib.request.Request(url, headers={"Cookie": header, "Accept": "application/json",
+                                                   "User-Agent": "Mozilla/5.0"})
+    # only a 200 json answer decides: cloudflare greets plain clients with 403 challenges, and a
+    # logged-out session is a 200 {} - any other status or body says nothing about the cookies
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            if response.status != 200:
+                return None
+            payload = json.loads(response.read() or b"{}")
+    except (OSError, ValueError):
+        return None  # HTTPError (403 challenge, 5xx, ...) is an OSError too
+    if not isinstance(payload, dict):
+        return None
+    return bool(payload.get("user"))
+
+def cache_path(session_file):
+    return session_file + ".check"
+
+def read_cache(session_file, ttl):
+    # cached answer, as long as it is fresh and the session file was not replaced since
+    if not ttl:
+        return None
+    cached = load_state(cache_path(session_file))
+    try:
+        mtime = os.path.getmtime(session_file)
+    except OSError:
+        return None
+    if not cached or cached.get("session_mtime") != mtime or time.time() - cached.get("checked_at", 0) > ttl:
+        return None
+    return cached.get("valid")
+
+def write_cache(session_file, valid):
+    try:
+        with open(cache_path(session_file), "w", encoding="utf-8") as f:
+            json.dump({"valid": valid, "checked_at": time.time(),
+                       "session_mtime": os.path.getmtime(session_file)}, f)
+    except OSError:
+        pass
+
+def check_session(session_file, base_url, ttl=300, timeout=5.0):
+    if not os.path.exists(session_file):
+        return False
+    cached = read_cache(session_file, ttl)
+    if cached is not None:
+        return cached
+    state = load_state(session_file)
+    if state is None:
+        return False
+    valid = cookie_verdict(state, base_url)
+    if valid is None:
+        valid = probe_session(state, base_url, timeout)
+    if valid is not None:
+        write_cache(session_file, valid)
+    return valid
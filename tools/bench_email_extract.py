@@ -0,0 +1,131 @@
+# benchmark: login link extraction from CivitAI emails, streaming HTMLParser vs the old
+# BeautifulSoup passes (the bs4 column is skipped when bs4 is not installed)
+#   python tools/bench_email_extract.py [--emails 50] [--repeat 20] [--json out.json]
+# the corpus mimics the real login email: inline-styled table layout, mso conditionals,
+# preheader, the sign-in button and a footer full of links, 20-120 KB per message
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from email_processor import extract_login_link
+
+HEAD = """<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">
+<html xmlns="http://www.w3.org/1999/xhtml"><head><meta http-equiv="Content-Type" content="text/html; charset=UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0"><title>Sign in to Civitai</title>
+<style type="text/css">__CSS__</style>
+<!--[if mso]><xml><o:OfficeDocumentSettings><o:PixelsPerInch>96</o:PixelsPerInch></o:OfficeDocumentSettings></xml><![endif]-->
+</head><body style="margin:0;padding:0;background-color:#1a1b1e">
+<div style="display:none;max-height:0;overflow:hidden">Your sign in link for Civitai &#847;&zwnj;&nbsp;</div>
+<table role="presentation" width="100%" cellpadding="0" cellspacing="0" border="0"><tr><td align="center">
+<table role="presentation" width="600" cellpadding="0" cellspacing="0" border="0" style="max-width:600px">
+<tr><td style="padding:32px 0"><a href="https://civitai.com"><img src="https://civitai.com/images/logo_light_mode.png" width="140" alt="Civitai"></a></td></tr>
+"""
+ROW = ('<tr><td class="c{n}" style="padding:8px 24px;font-family:Inter,Helvetica,Arial,sans-serif;font-size:14px;'
+       'line-height:22px;color:#c1c2c5">{text} <a href="https://civitai.com/{path}" style="color:#228be6">{link}</a></td></tr>\n')
+BUTTON = ('<tr><td align="center" style="padding:24px"><table role="presentation" cellpadding="0" cellspacing="0"><tr>'
+          '<td style="border-radius:6px;background:#228be6"><a href="{href}" target="_blank" '
+          'style="display:inline-block;padding:12px 28px;font-weight:700;color:#ffffff;text-decoration:none">Sign in</a>'
+          '</td></tr></table></td></tr>\n')
+FOOTER = ('<tr><td style="padding:24px;font-size:12px;color:#868e96">If you did not request this email you can safely ignore it. '
+          '<a href="https://civitai.com/user/account">Manage notifications</a> | '
+          '<a href="https://civitai.com/content/tos">Terms</a> | <a href="https://civitai.com/content/privacy">Privacy</a> | '
+          '<a href="https://civitai.com/unsubscribe?u={n}">Click here to unsubscribe</a></td></tr>\n')
+TAIL = "</table></td></tr></table></body></html>"
+WORDS = ("model", "image", "creator", "bounty", "article", "collection", "resource", "generation", "buzz", "review")
+
+
+def make_email(rnd, size):
+    # one email of roughly size bytes; the button sits a random way down the layout
+    href = f"https://civitai.com/api/auth/callback/email?callbackUrl=https%3A%2F%2Fcivitai.com%2Fimages&token={rnd.getrandbits(128):032x}&email=you%40example.com"
+    css = " ".join(f".c{n}{{padding:{n % 9}px;color:#{rnd.getrandbits(24):06x}}}" for n in range(200))
+    rows = []
+    while sum(len(r) for r in rows) + len(css) + 3000 < size:
+        n = len(rows)
+        text = " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(8, 30)))
+        rows.append(ROW.format(n=n % 200, text=text, path=f"{rnd.choice(WORDS)}s/{rnd.randint(1, 10**6)}",
+                               link=rnd.choice(WORDS).title()))
+    rows.insert(rnd.randint(0, len(rows)), BUTTON.format(href=href.replace("&", "&amp;")))
+    return HEAD.replace("__CSS__", css) + "".join(rows) + FOOTER.format(n=rnd.randint(1, 10**6)) + TAIL, href
+
+
+def extract_bs4(html_content):
+    # the pre-streaming implementation, kept here for comparison
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html_content, "html.parser")
+    patterns = [
+        lambda t: t and "log in" in t.lower(),
+        lambda t: t and "sign in" in t.lower(),
+        lambda t: t and "access your account" in t.lower(),
+        lambda t: t and "click here" in t.lower(),
+    ]
+    for pattern in patterns:
+        link = soup.find("a", string=pattern)
+        if link and link.get("href"):
+            return link["href"]
+    for link in soup.find_all("a", href=True):
+        if "civitai.com/api/auth/callback/email" in link["href"]:
+            return link["href"]
+    return None
+
+
+def measure(func, corpus, repeat):
+    # -> median ms per email, peak python heap in KiB over one email, correct answers
+    times, peaks, correct = [], [], 0
+    for html, href in corpus:
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func(html)
+            best = min(best, time.perf_counter() - started)
+        times.append(best * 1000)
+        correct += result == href
+        tracemalloc.start()
+        func(html)
+        peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+        tracemalloc.stop()
+    return {"median_ms": round(statistics.median(times), 3), "p95_ms": round(sorted(times)[int(len(times) * 0.95) - 1], 3),
+            "peak_kib": round(statistics.median(peaks), 1), "correct": f"{correct}/{len(corpus)}"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="login link extraction benchmark")
+    parser.add_argument("--emails", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", default=None, help="also write the results to this file")
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    corpus = [make_email(rnd, rnd.randint(20_000, 120_000)) for _ in range(args.emails)]
+    sizes = sorted(len(h) for h, _ in corpus)
+    results = {"emails": len(corpus), "median_size_kib": round(sizes[len(sizes) // 2] / 1024, 1),
+               "streaming": measure(extract_login_link, corpus, args.repeat)}
+    try:
+        import bs4  # noqa: F401
+        results["bs4"] = measure(extract_bs4, corpus, args.repeat)
+    except ImportError:
+        results["bs4"] = None
+
+    print(f"{len(corpus)} emails, median {results['median_size_kib']} KiB")
+    for name in ("streaming", "bs4"):
+        r = results[name]
+        if r is None:
+            print(f"  {name:10s} skipped (bs4 not installed)")
+            continue
+        print(f"  {name:10s} median {r['median_ms']:8.3f} ms  p95 {r['p95_ms']:8.3f} ms  "
+              f"peak {r['peak_kib']:8.1f} KiB  correct {r['correct']}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
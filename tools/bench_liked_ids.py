@@ -0,0 +1,87 @@
+# benchmark: liked ids startup cost, old json -> set[str] vs mmap index
+#   python tools/bench_liked_ids.py [count] [--json out.json]
+# every variant runs in a fresh subprocess so load time and peak RSS are not mixed up
+import os
+import sys
+import json
+import random
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from liked_store import build_index
+
+CHILD = r"""
+import os, sys, time, resource
+sys.path.insert(0, sys.argv[1])
+kind, path, probe = sys.argv[2], sys.argv[3], sys.argv[4]
+
+def rss():
+    # current resident set in bytes (ru_maxrss is inherited across fork, so not usable here)
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+import liked_store
+base = rss()
+started = time.perf_counter()
+if kind == "json":
+    ids = liked_store.read_json_ids(path)
+    check = lambda i: i in ids
+else:
+    ids = liked_store.SortedIdIndex(path)
+    check = lambda i: int(i) in ids
+loaded = time.perf_counter()
+hits = sum(1 for _ in range(100000) if check(probe))
+lookups = time.perf_counter()
+print(f"{loaded - started:.6f} {(lookups - loaded) / 100000 * 1e9:.1f} {rss() - base} {len(ids)}")
+"""
+
+
+def run_child(kind, path, probe):
+    out = subprocess.run([sys.executable, "-c", CHILD, ROOT, kind, path, probe],
+                         check=True, capture_output=True, text=True).stdout.split()
+    return {
+        "variant": kind,
+        "load_s": float(out[0]),
+        "lookup_ns": float(out[1]),
+        "rss_delta_bytes": int(out[2]),
+        "ids": int(out[3]),
+    }
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    out_path = None
+    if "--json" in sys.argv:
+        out_path = sys.argv[sys.argv.index("--json") + 1]
+        args.remove(out_path)
+    count = int(args[0]) if args else 2_000_000
+
+    rnd = random.Random(1)
+    ids = rnd.sample(range(1, count * 40), count)
+    probe = str(ids[count // 2])
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "liked_images.json")
+        idx_path = os.path.join(tmp, "liked_images.idx")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump([str(i) for i in ids], f)
+        build_index(ids, idx_path)
+        results = [run_child("json", json_path, probe), run_child("index", idx_path, probe)]
+        for r in results:
+            r["file_bytes"] = os.path.getsize(json_path if r["variant"] == "json" else idx_path)
+
+    for r in results:
+        print(f"{r['variant']:>6}: load {r['load_s'] * 1000:9.1f} ms | lookup {r['lookup_ns']:7.1f} ns"
+              f" | rss +{r['rss_delta_bytes'] / 2**20:8.1f} MiB | file {r['file_bytes'] / 2**20:7.1f} MiB")
+    if out_path:
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": "liked_ids", "count": count, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+# end-to-end benchmark: the real liker (auto_like_images) against the local stand-in feed
+#   python tools/bench_liker.py [--likes 100] [--cards 2000] [--reaction-latency 0.05] [--out results.json]
+#   python tools/bench_liker.py --compare before.json        (same run, then print the differences)
+#   python tools/bench_liker.py --set ENGINE=async --set PAGE_WORKERS=2   (values are JSON, plain words are strings)
+# the liker runs in a child process (fresh interpreter, own working dir with a pre-made session),
+# the stand-in runs here; results are JSON so runs from different commits can be compared
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from standin_server import start_standin
+
+SESSION_COOKIE = "__Secure-civitai-token"
+# lower is better for everything except likes_per_min
+METRICS = ("likes_per_min", "like_p50_ms", "like_p95_ms", "ipc_calls_per_like", "startup_s", "peak_rss_mib")
+
+
+# -------- child: runs the liker --------
+def install_ipc_counter():
+    # counts messages sent to the playwright driver (every page/element call is one round trip)
+    counter = {"calls": 0}
+    try:
+        from playwright._impl._connection import Connection
+    except ImportError:
+        return None
+    name = next((n for n in ("_send_message_to_server", "send_message_to_server") if hasattr(Connection, n)), None)
+    if name is None:
+        return None
+    original = getattr(Connection, name)
+
+    def counted(self, *args, **kwargs):
+        counter["calls"] += 1
+        return original(self, *args, **kwargs)
+
+    setattr(Connection, name, counted)
+    return counter
+
+def child(params_path):
+    started = time.time()
+    with open(params_path, "r", encoding="utf-8") as f:
+        params = json.load(f)
+    sys.path.insert(0, ROOT)
+    os.chdir(params["workdir"])
+    import config
+    for key, value in params["config"].items():
+        setattr(config, key, value)
+    ipc = install_ipc_counter()
+    import civitai_auto_like as cal
+    cal.INTERACTIVE = False
+
+    marks = {"likes": [], "loop_start": None, "ipc_at_loop_start": None}
+    cal.LIKE_HOOKS.append(lambda img_id, count: marks["likes"].append(time.time()))
+    original_like_feed = cal.like_feed
+
+    def like_feed(*args, **kwargs):
+        marks["loop_start"] = time.time()
+        marks["ipc_at_loop_start"] = ipc["calls"] if ipc else None
+        return original_like_feed(*args, **kwargs)
+
+    cal.like_feed = like_feed
+    liked = cal.auto_like_images()
+    marks.update(started=started, finished=time.time(), liked=liked,
+                 ipc_total=ipc["calls"] if ipc else None)
+    with open(params["out"], "w", encoding="utf-8") as f:
+        json.dump(marks, f)
+
+
+# -------- parent: stand-in, child process, measurements --------
+def process_tree_rss(root_pid):
+    # summed rss of root_pid and everything below it (linux /proc; shared pages count per process)
+    if not os.path.isdir("/proc"):
+        return None
+    parents, rss = {}, {}
+    page = os.sysconf("SC_PAGE_SIZE")
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/stat", "rb") as f:
+                parents[int(pid)] = int(f.read().rsplit(b")", 1)[1].split()[1])
+            with open(f"/proc/{pid}/statm") as f:
+                rss[int(pid)] = int(f.read().split()[1]) * page
+        except (OSError, ValueError, IndexError):
+            continue
+    tree, frontier = {root_pid}, [root_pid]
+    while frontier:
+        current = frontier.pop()
+        for pid, ppid in parents.items():
+            if ppid == current and pid not in tree:
+                tree.add(pid)
+                frontier.append(pid)
+    return sum(rss.get(pid, 0) for pid in tree)
+
+def write_session(workdir):
+    state = {"cookies": [{"name": SESSION_COOKIE, "value": "bench", "domain": "127.0.0.1", "path": "/",
+                          "expires": -1, "httpOnly": True, "secure": False, "sameSite": "Lax"}],
+             "origins": []}
+    with open(os.path.join(workdir, "civitai_session.json"), "w", encoding="utf-8") as f:
+        json.dump(state, f)
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+def run_once(args, overrides):
+    server, base = start_standin(cards=args.cards, page_size=args.page_size, reaction_latency=args.reaction_latency,
+                                 feed_latency=args.feed_latency, session_cookie=SESSION_COOKIE, seed=args.seed)
+    workdir = tempfile.mkdtemp(prefix="cal_bench_")
+    write_session(workdir)
+    settings = {"IMAGES_URL": f"{base}/images?sort=Newest", "TARGET_LIKES": args.likes, "HEADLESS_MODE": True,
+                "ACTION_DELAY": args.action_delay, "AUTO_WAIT_FOR_USER": False, "AUTO_UPDATE": False,
+                "LIKED_STORE": "log", "LOGIN_WATCHER": False,
+                "MAX_LIKES_PER_MINUTE": 0, "MAX_LIKES_PER_HOUR": 0, "MAX_LIKES_PER_DAY": 0}
+    settings.update(overrides)
+    params = {"workdir": workdir, "config": settings, "out": os.path.join(workdir, "bench_result.json")}
+    params_path = os.path.join(workdir, "bench_params.json")
+    with open(params_path, "w", encoding="utf-8") as f:
+        json.dump(params, f)
+
+    log_path = os.path.join(workdir, "liker.log")
+    spawned = time.time()
+    with open(log_path, "w", encoding="utf-8") as log:
+        proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--child", params_path],
+                                stdout=log, stderr=subprocess.STDOUT, cwd=workdir)
+        peak = 0
+        deadline = time.monotonic() + args.timeout
+        while proc.poll() is None:
+            if time.monotonic() > deadline:
+                proc.kill()
+                break
+            peak = max(peak, process_tree_rss(proc.pid) or 0)
+            time.sleep(0.1)
+    server.shutdown()
+    try:
+        with open(params["out"], "r", encoding="utf-8") as f:
+            marks = json.load(f)
+    except (OSError, ValueError):
+        print(f"ERROR: liker run failed (exit {proc.returncode}), log: {log_path}")
+        return None
+
+    likes = marks["likes"]
+    loop_start = marks["loop_start"] or marks["started"]
+    gaps = [(b - a) * 1000 for a, b in zip([loop_start] + likes, likes)]
+    loop_seconds = max(1e-9, (likes[-1] if likes else marks["finished"]) - loop_start)
+    ipc_loop = None
+    if marks.get("ipc_total") is not None and marks.get("ipc_at_loop_start") is not None and likes:
+        ipc_loop = (marks["ipc_total"] - marks["ipc_at_loop_start"]) / len(likes)
+    return {
+        "likes": len(likes),
+        "likes_per_min": round(len(likes) / loop_seconds * 60, 1),
+        "like_p50_ms": round(percentile(gaps, 0.5), 1) if gaps else None,
+        "like_p95_ms": round(percentile(gaps, 0.95), 1) if gaps else None,
+        "ipc_calls_per_like": round(ipc_loop, 1) if ipc_loop is not None else None,
+        "startup_s": round(loop_start - spawned, 2),
+        "total_s": round(marks["finished"] - spawned, 2),
+        "peak_rss_mib": round(peak / 2**20, 1) if peak else None,
+        "reaction_requests": server.state.reaction_calls,
+        "feed_requests": server.state.feed_calls,
+        "exit_code": proc.returncode,
+    }
+
+def git_revision():
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return rev + ("-dirty" if dirty else "")
+    except OSError:
+        return None
+
+def summarize(runs):
+    # median over runs for every numeric metric
+    ok = [r for r in runs if r]
+    if not ok:
+        return None
+    return {key: (statistics.median([r[key] for r in ok if r[key] is not None])
+                  if any(r[key] is not None for r in ok) else None) for key in ok[0]}
+
+def compare(base, current):
+    print(f"{'metric':20s} {'before':>12s} {'after':>12s} {'change':>9s}")
+    for key in METRICS:
+        old, new = (base or {}).get(key), (current or {}).get(key)
+        if old is None or new is None:
+            print(f"{key:20s} {str(old):>12s} {str(new):>12s}")
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        print(f"{key:20s} {old:12.2f} {new:12.2f} {change:+8.1f}%")
+
+def parse_overrides(items):
+    overrides = {}
+    for item in items:
+        key, _, value = item.partition("=")
+        try:
+            overrides[key] = json.loads(value)
+        except ValueError:
+            overrides[key] = value
+    return overrides
+
+
+def main():
+    parser = argparse.ArgumentParser(description="liker benchmark against the local stand-in feed")
+    parser.add_argument("--likes", type=int, default=100, help="TARGET_LIKES for the run")
+    parser.add_argument("--cards", type=int, default=2000, help="images in the stand-in feed")
+    parser.add_argument("--page-size", type=int, default=40, help="cards per feed page")
+    parser.add_argument("--reaction-latency", type=float, default=0.05)
+    parser.add_argument("--feed-latency", type=float, default=0.1)
+    parser.add_argument("--action-delay", type=float, default=0.0, help="ACTION_DELAY for the run")
+    parser.add_argument("--runs", type=int, default=1, help="repeat and report medians")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=JSON", help="extra config override")
+    parser.add_argument("--out", default=None, help="write results JSON here")
+    parser.add_argument("--compare", default=None, help="results JSON of an earlier run to compare against")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    overrides = parse_overrides(args.set)
+    runs = [run_once(args, overrides) for _ in range(args.runs)]
+    result = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "params": {k: v for k, v in vars(args).items() if k not in ("out", "compare", "child", "set")},
+        "overrides": overrides,
+        "summary": summarize(runs),
+        "runs": runs,
+    }
+    print(json.dumps(result["summary"], indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f).get("summary"), result["summary"])
+    sys.exit(0 if result["summary"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# benchmark: startup cost before the liker does any work
+#   python tools/bench_startup.py [--runs 10] [--update-check] [--json out.json]
+# imports civitai_auto_like in fresh interpreters with -X importtime and reports the median
+# import time, the heaviest direct imports and any module of the login stack that got loaded
+# although no login is needed. --update-check also times check_for_updates_branch_based()
+# without the cache (git fetch) and with it.
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULE = "civitai_auto_like"
+# only the manual login / optional exporters need these
+LAZY_MODULES = ("email_processor", "login_watcher", "imaplib", "html.parser", "webbrowser",
+                "urllib.request", "http.server", "cProfile")
+
+
+def importtime(module, env):
+    # -> [(name, self_us, cumulative_us, depth)] of one fresh interpreter, in importtime order
+    # (children are listed before the module that imported them)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT, env=env,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            own, cumulative, name = line[len("import time:"):].split("|")
+            own, cumulative = int(own), int(cumulative)
+        except ValueError:
+            continue  # header line
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), own, cumulative, depth))
+    return modules
+
+def direct_imports(modules, module):
+    # depth-1 entries right before the module's own line
+    index = max(n for n, entry in enumerate(modules) if entry[0] == module)
+    children = []
+    for name, own, cumulative, depth in reversed(modules[:index]):
+        if depth == 0:
+            break
+        if depth == 1:
+            children.append((name, cumulative))
+    return children
+
+def wall_time(module, env):
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], cwd=ROOT, env=env, check=True)
+    return time.perf_counter() - started
+
+def time_update_check(env):
+    code = ("import time, civitai_auto_like as c\n"
+            "for use_cache in (False, True):\n"
+            "    t = time.perf_counter(); c.check_for_updates_branch_based(use_cache=use_cache)\n"
+            "    print(round((time.perf_counter() - t) * 1000, 1))\n")
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+    numbers = [line for line in proc.stdout.splitlines() if line.replace(".", "", 1).isdigit()]
+    if len(numbers) != 2:
+        return None
+    return {"uncached_ms": float(numbers[0]), "cached_ms": float(numbers[1])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="startup / import time benchmark")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=12, help="direct imports to list")
+    parser.add_argument("--update-check", action="store_true", help="also time the update check (runs git fetch)")
+    parser.add_argument("--json", default=None, help="also write the results to this file")
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    runs = [importtime(MODULE, env) for _ in range(args.runs)]
+    totals = [next(e[2] for e in r if e[0] == MODULE) / 1000 for r in runs]
+    walls = [wall_time(MODULE, env) * 1000 for _ in range(args.runs)]
+
+    # direct imports of the module, median cumulative time over the runs
+    direct = {}
+    for r in runs:
+        for name, cumulative in direct_imports(r, MODULE):
+            direct.setdefault(name, []).append(cumulative / 1000)
+    heaviest = sorted(((statistics.median(v), k) for k, v in direct.items()), reverse=True)[:args.top]
+    loaded = {e[0] for e in runs[-1]}
+    loaded_lazy = [m for m in LAZY_MODULES if m in loaded]
+
+    results = {
+        "import_ms": round(statistics.median(totals), 1),
+        "interpreter_wall_ms": round(statistics.median(walls), 1),
+        "heaviest_imports": [{"module": k, "ms": round(v, 1)} for v, k in heaviest],
+        "lazy_modules_loaded": loaded_lazy,
+    }
+    if args.update_check:
+        results["update_check"] = time_update_check(env)
+
+    print(f"import {MODULE}: median {results['import_ms']} ms "
+          f"(interpreter start + import {results['interpreter_wall_ms']} ms, {args.runs} runs)")
+    for item in results["heaviest_imports"]:
+        print(f"  {item['module']:28s} {item['ms']:8.1f} ms")
+    print("login-only modules loaded at startup:", ", ".join(loaded_lazy) if loaded_lazy else "none")
+    if args.update_check:
+        check = results["update_check"]
+        if check:
+            print(f"update check: {check['uncached_ms']} ms with git fetch, {check['cached_ms']} ms cached")
+        else:
+            print("update check: could not be timed (not a git checkout?)")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
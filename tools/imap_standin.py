@@ -0,0 +1,249 @@
+# tiny local IMAP server for testing the login email watcher offline (plain IMAP, no TLS)
+#   python tools/imap_standin.py --port 1143 --deliver-after 3
+# supports what the liker uses: LOGIN, SELECT, (UID) SEARCH, (UID) FETCH with RFC822 /
+# BODYSTRUCTURE / BODY.PEEK[part], IDLE, NOOP, CLOSE, LOGOUT.
+# --selftest runs login_watcher.LoginLinkWatcher against it and reports how fast the link was found.
+import os
+import re
+import sys
+import time
+import email
+import select
+import argparse
+import threading
+import socketserver
+import email.utils
+from email.message import EmailMessage
+
+LOGIN_HTML = """<!doctype html><html><body>
+<table><tr><td><img src="https://civitai.com/images/logo.png" alt="Civitai"></td></tr>
+__FILLER__
+<tr><td><a href="__LINK__" style="background:#228be6;color:#fff">Sign in</a></td></tr>
+<tr><td>If you did not request this email you can safely ignore it.</td></tr></table>
+</body></html>"""
+
+
+def login_email(link, sender="noreply@civitai.com", filler_rows=40):
+    # multipart/alternative like the real one: text part first, quoted-printable html second
+    msg = EmailMessage()
+    msg["From"] = f"Civitai <{sender}>"
+    msg["To"] = "you@example.com"
+    msg["Subject"] = "Sign in to Civitai"
+    msg["Date"] = email.utils.formatdate()
+    msg.set_content(f"Sign in to Civitai\n{link}\n")
+    filler = "\n".join(f'<tr><td style="padding:4px">row {n} of the email layout</td></tr>' for n in range(filler_rows))
+    msg.add_alternative(LOGIN_HTML.replace("__FILLER__", filler).replace("__LINK__", link), subtype="html",
+                        cte="quoted-printable")
+    return msg.as_bytes()
+
+
+def quote(value):
+    if value is None:
+        return "NIL"
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+def bodystructure(msg):
+    if msg.is_multipart():
+        children = "".join(bodystructure(p) for p in msg.get_payload())
+        return f"({children} {quote(msg.get_content_subtype().upper())})"
+    maintype, subtype = msg.get_content_maintype(), msg.get_content_subtype()
+    params = " ".join(f"{quote(k.upper())} {quote(v)}" for k, v in msg.get_params()[1:]) or ""
+    payload = msg.get_payload()
+    encoding = msg.get("Content-Transfer-Encoding", "7bit")
+    fields = (f"{quote(maintype.upper())} {quote(subtype.upper())} ({params}) NIL NIL "
+              f"{quote(encoding.upper())} {len(payload.encode())}")
+    if maintype == "text":
+        fields += f" {payload.count(chr(10))}"
+    return f"({fields})"
+
+def message_part(msg, section):
+    for n in section.split("."):
+        msg = msg.get_payload()[int(n) - 1]
+    return msg.get_payload().encode()
+
+
+class Mailbox:
+
+    def __init__(self, user="you@example.com", password="secret", idle=True):
+        self.user = user
+        self.password = password
+        self.idle = idle
+        self.messages = []  # [(uid, raw bytes)]
+        self.next_uid = 1
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.fetched_bytes = 0
+
+    def deliver(self, raw):
+        with self.changed:
+            self.messages.append((self.next_uid, raw))
+            self.next_uid += 1
+            self.changed.notify_all()
+
+
+class ImapHandler(socketserver.StreamRequestHandler):
+    mailbox = None
+
+    def out(self, line):
+        self.wfile.write(line.encode("utf-8") + b"\r\n")
+
+    def out_literal(self, prefix, data, suffix=")"):
+        self.wfile.write(f"{prefix} {{{len(data)}}}\r\n".encode() + data + suffix.encode() + b"\r\n")
+        self.mailbox.fetched_bytes += len(data)
+
+    def handle(self):
+        box = self.mailbox
+        self.out("* OK [CAPABILITY IMAP4rev1" + (" IDLE" if box.idle else "") + "] stand-in ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            parts = line.decode("utf-8", "replace").strip().split(" ", 2)
+            if len(parts) < 2:
+                continue
+            tag, cmd, rest = parts[0], parts[1].upper(), parts[2] if len(parts) > 2 else ""
+            use_uid = cmd == "UID"
+            if use_uid:
+                cmd, _, rest = rest.partition(" ")
+                cmd = cmd.upper()
+            if cmd == "CAPABILITY":
+                self.out("* CAPABILITY IMAP4rev1" + (" IDLE" if box.idle else ""))
+            elif cmd == "LOGIN":
+                user, _, password = rest.partition(" ")
+                if user.strip('"') != box.user or password.strip('"') != box.password:
+                    self.out(f"{tag} NO [AUTHENTICATIONFAILED] invalid credentials")
+                    continue
+            elif cmd in ("SELECT", "EXAMINE"):
+                with box.lock:
+                    self.out(f"* {len(box.messages)} EXISTS")
+                    self.out("* OK [UIDVALIDITY 1] ok")
+                    self.out(f"* OK [UIDNEXT {box.next_uid}] ok")
+            elif cmd == "SEARCH":
+                self.out("* SEARCH " + " ".join(self.search(rest, use_uid)))
+            elif cmd == "FETCH":
+                self.fetch(rest, use_uid)
+            elif cmd == "IDLE" and box.idle:
+                self.idle()
+            elif cmd == "LOGOUT":
+                self.out("* BYE logging out")
+                self.out(f"{tag} OK LOGOUT completed")
+                return
+            elif cmd not in ("NOOP", "CLOSE", "CHECK"):
+                self.out(f"{tag} BAD unknown command")
+                continue
+            self.out(f"{tag} OK {cmd} completed")
+
+    def search(self, criteria, use_uid):
+        with self.mailbox.lock:
+            messages = list(enumerate(self.mailbox.messages, 1))
+        uid_range = re.search(r"UID (\d+):(\*|\d+)", criteria, re.I)
+        sender = re.search(r'FROM "([^"]+)"', criteria, re.I)
+        hits = []
+        for seq, (uid, raw) in messages:
+            if uid_range:
+                low = int(uid_range.group(1))
+                high = messages[-1][1][0] if uid_range.group(2) == "*" else int(uid_range.group(2))
+                if not (min(low, high) <= uid <= max(low, high)):
+                    continue
+            if sender and sender.group(1).lower() not in str(email.message_from_bytes(raw).get("From", "")).lower():
+                continue
+            hits.append(str(uid if use_uid else seq))
+        return hits
+
+    def fetch(self, rest, use_uid):
+        ident, _, items = rest.partition(" ")
+        with self.mailbox.lock:
+            messages = list(enumerate(self.mailbox.messages, 1))
+        for seq, (uid, raw) in messages:
+            if str(uid if use_uid else seq) != ident:
+                continue
+            msg = email.message_from_bytes(raw)
+            head = f"* {seq} FETCH (UID {uid}"
+            items = items.upper()
+            if "BODYSTRUCTURE" in items:
+                self.out(f"{head} BODYSTRUCTURE {bodystructure(msg)})")
+            elif "RFC822" in items:
+                self.out_literal(f"{head} RFC822", raw)
+            else:
+                section = re.search(r"BODY(?:\.PEEK)?\[([\d.]*)\]", items)
+                if section:
+                    data = message_part(msg, section.group(1)) if section.group(1) else raw
+                    self.out_literal(f"{head} BODY[{section.group(1)}]", data)
+
+    def idle(self):
+        box = self.mailbox
+        with box.lock:
+            seen = len(box.messages)
+        self.out("+ idling")
+        while True:
+            ready, _, _ = select.select([self.connection], [], [], 0.05)
+            if ready:
+                self.rfile.readline()  # DONE
+                return
+            with box.changed:
+                box.changed.wait(0.05)
+                count = len(box.messages)
+            if count != seen:
+                self.out(f"* {count} EXISTS")
+                seen = count
+
+
+def start_imap_standin(host="127.0.0.1", port=0, **mailbox_options):
+    # -> (server, mailbox); server runs in a daemon thread
+    mailbox = Mailbox(**mailbox_options)
+    handler = type("BoundImapHandler", (ImapHandler,), {"mailbox": mailbox})
+    server = socketserver.ThreadingTCPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, mailbox
+
+
+def selftest(deliver_after, idle):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from login_watcher import LoginLinkWatcher
+    server, mailbox = start_imap_standin(idle=idle)
+    port = server.server_address[1]
+    for n in range(30):
+        mailbox.deliver(login_email(f"https://civitai.com/api/auth/callback/email?token=old{n}"))
+    watcher = LoginLinkWatcher(mailbox.user, mailbox.password, "127.0.0.1", port, use_ssl=False, timeout=30,
+                               poll_interval=1.0)
+    watcher.start()
+    time.sleep(deliver_after)
+    link = "https://civitai.com/api/auth/callback/email?token=fresh&email=you%40example.com"
+    delivered = time.monotonic()
+    mailbox.deliver(login_email(link))
+    got = watcher.wait(30)
+    latency = time.monotonic() - delivered
+    watcher.stop()
+    ok = got == link
+    print(f"{'OK' if ok else 'FAIL'}: link {'found' if got else 'not found'} {latency * 1000:.0f} ms after delivery "
+          f"({'IDLE' if idle else 'NOOP polling'}), {mailbox.fetched_bytes} bytes fetched from the server")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="local IMAP stand-in for the login email watcher")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1143)
+    parser.add_argument("--deliver-after", type=float, default=3.0, help="seconds before a login email arrives")
+    parser.add_argument("--no-idle", action="store_true", help="don't advertise IDLE (watcher falls back to polling)")
+    parser.add_argument("--selftest", action="store_true", help="run the watcher against the stand-in and exit")
+    args = parser.parse_args()
+    if args.selftest:
+        sys.exit(0 if selftest(args.deliver_after, not args.no_idle) else 1)
+    server, mailbox = start_imap_standin(args.host, args.port, idle=not args.no_idle)
+    print(f"INFO: IMAP stand-in on {args.host}:{args.port} (user {mailbox.user} / {mailbox.password}), "
+          f"login email in {args.deliver_after}s (Ctrl+C to stop)")
+    try:
+        time.sleep(args.deliver_after)
+        mailbox.deliver(login_email("https://civitai.com/api/auth/callback/email?token=standin"))
+        print("INFO: login email delivered")
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
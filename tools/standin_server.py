@@ -0,0 +1,257 @@
+# local stand-in for the civitai pieces the liker talks to (offline testing / benchmarks)
+#   python tools/standin_server.py --port 8765 --cards 600 --page-size 40 --reaction-latency 0.2
+# then point the liker at it, e.g. in config.py:
+#   IMAGES_URL = "http://127.0.0.1:8765/images?sort=Newest"
+#   REACTION_API_PATTERN = "/api/trpc/reaction.toggle"
+# the feed is also served as GET /api/trpc/image.getInfinite (cursor pagination) for ENGINE = "api"
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+FEED_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>stand-in feed</title>
+<style>
+  body { font-family: sans-serif; margin: 0; }
+  .grid { display: grid; grid-template-columns: repeat(4, 1fr); gap: 12px; padding: 12px; }
+  .card { height: 260px; border: 1px solid #ccc; display: flex; flex-direction: column; justify-content: space-between; }
+  .Reactions_reactionBadge__st { align-self: flex-start; margin: 8px; }
+</style></head>
+<body>
+<header><button class="panel"><svg class="tabler-icon tabler-icon-plus"></svg><svg class="tabler-icon tabler-icon-mood-smile"></svg></button></header>
+<div class="grid" id="feed">__CARDS__</div>
+<script>
+// infinite scroll: next pages come from the feed api, like the real site
+let cursor = __CURSOR__;
+let loading = false;
+const LIKE = '\\u{1F44D}';
+const cardHtml = item => {
+  const liked = (item.reactions || []).some(r => r.reaction === 'Like');
+  return '<div class="card"><a href="/images/' + item.id + '">image ' + item.id + '</a>'
+    + '<button class="Reactions_reactionBadge__st" data-image-id="' + item.id + '" data-liked="' + liked + '">'
+    + '<p>' + LIKE + '</p><p class="count">' + item.stats.likeCountAllTime + '</p></button></div>';
+};
+async function loadMore() {
+  if (loading || cursor === null) return;
+  loading = true;
+  try {
+    const input = encodeURIComponent(JSON.stringify({json: {limit: __PAGE_SIZE__, cursor: cursor}}));
+    const res = await fetch('/api/trpc/image.getInfinite?input=' + input);
+    if (res.ok) {
+      const page = (await res.json()).result.data.json;
+      document.getElementById('feed').insertAdjacentHTML('beforeend', page.items.map(cardHtml).join(''));
+      cursor = page.nextCursor;
+    }
+  } finally {
+    loading = false;
+  }
+}
+window.addEventListener('scroll', () => {
+  if (window.innerHeight + window.scrollY >= document.documentElement.scrollHeight - 1500) loadMore();
+});
+document.addEventListener('click', async ev => {
+  const btn = ev.target.closest('button[class*="Reactions_reactionBadge"]');
+  if (!btn) return;
+  const id = parseInt(btn.dataset.imageId, 10);
+  const res = await fetch('/api/trpc/reaction.toggle', {
+    method: 'POST',
+    headers: {'content-type': 'application/json'},
+    body: JSON.stringify({json: {entityId: id, entityType: 'image', reaction: 'Like'}}),
+  });
+  if (!res.ok) return;
+  const data = await res.json();
+  const liked = data.result.data.json.liked;
+  const count = btn.querySelector('.count');
+  count.textContent = String(parseInt(count.textContent, 10) + (liked ? 1 : -1));
+  btn.setAttribute('data-liked', liked ? 'true' : 'false');
+});
+</script>
+</body></html>
+"""
+
+CARD = ('<div class="card"><a href="/images/{id}">image {id}</a>'
+        '<button class="Reactions_reactionBadge__st" data-image-id="{id}" data-liked="{liked}">'
+        '<p>\U0001F44D</p><p class="count">{count}</p></button></div>')
+
+
+class StandinState:
+    # shared server state: image ids, per-image likes, reaction endpoint behaviour
+
+    def __init__(self, cards=60, first_id=9_000_000, reaction_latency=0.0, reaction_status=200, fail_every=0, seed=1,
+                 session_cookie=None, page_size=40, feed_latency=0.0):
+        rnd = random.Random(seed)
+        self.ids = []
+        current = first_id
+        for _ in range(cards):
+            self.ids.append(current)
+            current -= rnd.randint(1, 5)
+        self.counts = {i: rnd.randint(0, 40) for i in self.ids}
+        self.liked = set()
+        self.reaction_latency = reaction_latency
+        self.reaction_status = reaction_status
+        self.fail_every = fail_every
+        self.reaction_calls = 0
+        self.feed_calls = 0
+        self.session_cookie = session_cookie  # api calls without this cookie get 401
+        self.page_size = page_size  # cards in the html; the rest is loaded while scrolling
+        self.feed_latency = feed_latency
+        self.lock = threading.Lock()
+
+    def feed_page(self, cursor=None, limit=50):
+        # ids are descending; cursor = first id of the page (inclusive), like civitai's id cursors
+        with self.lock:
+            self.feed_calls += 1
+            start = 0
+            if cursor is not None:
+                try:
+                    cursor = int(cursor)
+                except (TypeError, ValueError):
+                    return 400, {"error": {"message": "bad cursor"}}
+                start = next((n for n, i in enumerate(self.ids) if i <= cursor), len(self.ids))
+            chunk = self.ids[start:start + max(1, min(int(limit), 200))]
+            items = [{"id": i, "stats": {"likeCountAllTime": self.counts[i]},
+                      "reactions": [{"reaction": "Like"}] if i in self.liked else []} for i in chunk]
+            rest = start + len(chunk)
+            next_cursor = self.ids[rest] if rest < len(self.ids) else None
+            return 200, {"result": {"data": {"json": {"items": items, "nextCursor": next_cursor}}}}
+
+    def toggle(self, image_id):
+        with self.lock:
+            self.reaction_calls += 1
+            if self.fail_every and self.reaction_calls % self.fail_every == 0:
+                return 500, {"error": {"message": "stand-in failure"}}
+            if self.reaction_status >= 300:
+                return self.reaction_status, {"error": {"message": f"stand-in status {self.reaction_status}"}}
+            if image_id not in self.counts:
+                return 404, {"error": {"message": "image not found"}}
+            if image_id in self.liked:
+                self.liked.discard(image_id)
+                self.counts[image_id] -= 1
+                liked = False
+            else:
+                self.liked.add(image_id)
+                self.counts[image_id] += 1
+                liked = True
+            return 200, {"result": {"data": {"json": {"liked": liked, "count": self.counts[image_id]}}}}
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    state = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def send_body(self, status, body, content_type):
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_json(self, status, payload):
+        self.send_body(status, json.dumps(payload), "application/json")
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            return json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return {}
+
+    def authorized(self):
+        name = self.state.session_cookie
+        return not name or f"{name}=" in (self.headers.get("Cookie") or "")
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        path = url.path
+        if path == "/api/auth/session":
+            # next-auth style: {} when logged out
+            if self.state.session_cookie and self.authorized():
+                return self.send_json(200, {"user": {"id": 1, "username": "standin"}, "expires": "2099-01-01T00:00:00Z"})
+            return self.send_json(200, {})
+        if path == "/api/trpc/image.getInfinite":
+            if not self.authorized():
+                return self.send_json(401, {"error": {"message": "unauthorized"}})
+            try:
+                params = json.loads(parse_qs(url.query).get("input", ["{}"])[0]).get("json") or {}
+            except ValueError:
+                return self.send_json(400, {"error": {"message": "bad input"}})
+            if self.state.feed_latency:
+                time.sleep(self.state.feed_latency)
+            status, payload = self.state.feed_page(params.get("cursor"), params.get("limit") or 50)
+            return self.send_json(status, payload)
+        if path in ("/", "/images"):
+            ids = self.state.ids[:self.state.page_size] if self.state.page_size else self.state.ids
+            cards = "".join(CARD.format(id=i, count=self.state.counts[i],
+                                        liked="true" if i in self.state.liked else "false")
+                            for i in ids)
+            cursor = self.state.ids[len(ids)] if len(ids) < len(self.state.ids) else None
+            page = (FEED_PAGE.replace("__CARDS__", cards).replace("__CURSOR__", json.dumps(cursor))
+                    .replace("__PAGE_SIZE__", str(self.state.page_size or 40)))
+            return self.send_body(200, page, "text/html; charset=utf-8")
+        if path.startswith("/images/"):
+            return self.send_body(200, "<html><body>image page</body></html>", "text/html")
+        self.send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        if path == "/api/trpc/reaction.toggle":
+            if not self.authorized():
+                return self.send_json(401, {"error": {"message": "unauthorized"}})
+            body = self.read_json().get("json") or {}
+            if self.state.reaction_latency:
+                time.sleep(self.state.reaction_latency)
+            try:
+                image_id = int(body.get("entityId"))
+            except (TypeError, ValueError):
+                return self.send_json(400, {"error": {"message": "entityId required"}})
+            status, payload = self.state.toggle(image_id)
+            return self.send_json(status, payload)
+        self.send_json(404, {"error": {"message": "not found"}})
+
+
+def start_standin(host="127.0.0.1", port=0, **state_options):
+    # start server in a daemon thread -> (server, base_url); server.state holds the counters
+    state = StandinState(**state_options)
+    handler = type("BoundStandinHandler", (StandinHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="local civitai stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cards", type=int, default=60)
+    parser.add_argument("--reaction-latency", type=float, default=0.0, help="seconds before reaction responses")
+    parser.add_argument("--reaction-status", type=int, default=200, help="force this HTTP status on reactions")
+    parser.add_argument("--fail-every", type=int, default=0, help="answer every Nth reaction with HTTP 500")
+    parser.add_argument("--session-cookie", default=None, help="require this cookie on api calls (401 otherwise)")
+    parser.add_argument("--page-size", type=int, default=40, help="cards per feed page (0 = everything in the html)")
+    parser.add_argument("--feed-latency", type=float, default=0.0, help="seconds before feed api responses")
+    args = parser.parse_args()
+    server, url = start_standin(args.host, args.port, cards=args.cards, reaction_latency=args.reaction_latency,
+                                reaction_status=args.reaction_status, fail_every=args.fail_every,
+                                session_cookie=args.session_cookie, page_size=args.page_size,
+                                feed_latency=args.feed_latency)
+    print(f"INFO: stand-in serving {url}/images (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
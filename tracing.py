@@ -0,0 +1,221 @@
+# span tracing (TRACE = True): nested spans for every card written as chrome trace events,
+# open TRACE_FILE in https://ui.perfetto.dev or chrome://tracing
+#   with span("card", image_id=img_id) as s: ... s.set(outcome="liked")
+# metrics timers (discover, scroll, click_confirm, persist, ...) and every playwright driver call
+# ("pw:ElementHandle.click") become spans as well, so idle waits show up as gaps between calls.
+# TRACE_PROFILE adds a cProfile dump next to the trace (<name>.prof, open with snakeviz / pstats),
+# TRACE_PLAYWRIGHT a playwright trace zip per run (<name>.zip, `playwright show-trace <name>.zip`)
+# off by default: span() then returns a shared no-op and the timer hook is not installed
+import os
+import json
+import time
+import threading
+import contextvars
+
+import metrics
+from metrics import log
+
+# async workers name their lane so concurrent tasks get their own track instead of one thread
+LANE = contextvars.ContextVar("trace_lane", default=None)
+
+TRACER = None
+PROFILER = None
+
+
+class NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+NO_SPAN = NoSpan()
+
+
+class Span:
+    __slots__ = ("tracer", "name", "args", "started")
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.complete(self.name, self.started, time.perf_counter(), self.args)
+        return False
+
+    def set(self, **args):
+        self.args.update(args)
+
+
+class Tracer:
+    # streams events as a json array (one per line) so a crashed run still leaves a readable trace
+
+    def __init__(self, path, playwright=False):
+        self.path = path
+        self.playwright = playwright
+        self.file = open(path, "w", encoding="utf-8")
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self.tracks = {}  # lane name / thread id -> small track number
+        self.events = 0
+        self.zips = []
+        self.file.write("[")
+        self.write({"name": "process_name", "ph": "M", "pid": self.pid, "tid": 0, "args": {"name": "civitai liker"}})
+
+    def write(self, event):
+        line = json.dumps(event, separators=(",", ":"), default=str)
+        with self.lock:
+            if self.file.closed:
+                return
+            self.file.write(("\n" if not self.events else ",\n") + line)
+            self.events += 1
+
+    def track(self):
+        lane = LANE.get()
+        key = lane if lane is not None else threading.get_ident()
+        tid = self.tracks.get(key)
+        if tid is None:
+            with self.lock:
+                tid = self.tracks.setdefault(key, len(self.tracks) + 1)
+            name = lane if lane is not None else threading.current_thread().name
+            self.write({"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}})
+        return tid
+
+    def complete(self, name, started, ended, args=None, cat="liker"):
+        event = {"name": name, "cat": cat, "ph": "X", "pid": self.pid, "tid": self.track(),
+                 "ts": round((started - self.origin) * 1e6, 1), "dur": round((ended - started) * 1e6, 1)}
+        if args:
+            event["args"] = args
+        self.write(event)
+
+    def side_file(self, suffix):
+        return os.path.splitext(self.path)[0] + suffix
+
+    def close(self):
+        with self.lock:
+            self.file.write("\n]\n")
+            self.file.close()
+
+
+# -------- api --------
+def span(name, **args):
+    tracer = TRACER
+    if tracer is None:
+        return NO_SPAN
+    return Span(tracer, name, args)
+
+def timer_span(phase, started, ended):
+    tracer = TRACER
+    if tracer is not None:
+        tracer.complete(phase, started, ended, cat="phase")
+
+
+def patch_playwright():
+    # wrap the channel round trip (sync and async api both end up here) in a "pw:<Type>.<method>" span
+    try:
+        from playwright._impl._connection import Channel
+    except ImportError:
+        return False
+    for attr in ("send", "send_return_as_dict"):
+        original = getattr(Channel, attr, None)
+        if original is None or getattr(original, "traced", False):
+            continue
+
+        def wrap(original):
+            async def traced(self, method, *args, **kwargs):
+                tracer = TRACER
+                if tracer is None:
+                    return await original(self, method, *args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return await original(self, method, *args, **kwargs)
+                finally:
+                    guid = getattr(self, "_guid", "") or ""
+                    tracer.complete(f"pw:{guid.split('@', 1)[0]}.{method}", started, time.perf_counter(),
+                                    {"guid": guid}, cat="playwright")
+            traced.traced = True
+            return traced
+
+        setattr(Channel, attr, wrap(original))
+    return True
+
+
+def start(path="liker_trace.json", profile=False, playwright=False):
+    global TRACER, PROFILER
+    if TRACER is not None:
+        return TRACER
+    try:
+        TRACER = Tracer(path, playwright)
+    except OSError as e:
+        log("warning", "tracing not started:", e)
+        return None
+    metrics.TIMER_HOOKS.append(timer_span)
+    if not patch_playwright():
+        log("warning", "playwright internals not found; trace has no driver call spans")
+    if profile:
+        import cProfile
+        PROFILER = cProfile.Profile()
+        PROFILER.enable()
+    log("info", f"tracing to {path}" + (" (+ cProfile)" if profile else ""))
+    return TRACER
+
+def stop():
+    global TRACER, PROFILER
+    tracer = TRACER
+    if tracer is None:
+        return
+    if PROFILER is not None:
+        PROFILER.disable()
+        try:
+            PROFILER.dump_stats(tracer.side_file(".prof"))
+            log("info", f"cProfile stats written to {tracer.side_file('.prof')}")
+        except OSError as e:
+            log("warning", "failed to write cProfile stats:", e)
+        PROFILER = None
+    if timer_span in metrics.TIMER_HOOKS:
+        metrics.TIMER_HOOKS.remove(timer_span)
+    TRACER = None
+    tracer.close()
+    log("info", f"trace written to {tracer.path} ({tracer.events} events) - open it in https://ui.perfetto.dev")
+    for path in tracer.zips:
+        log("info", f"playwright trace: playwright show-trace {path}")
+
+
+# -------- playwright trace zip (TRACE_PLAYWRIGHT) --------
+def start_playwright_trace(context):
+    # -> True when context tracing was started; pass the result to stop_playwright_trace
+    if TRACER is None or not TRACER.playwright or context is None:
+        return False
+    try:
+        context.tracing.start(screenshots=True, snapshots=True)
+        return True
+    except Exception as e:
+        log("warning", "failed to start playwright tracing:", e)
+        return False
+
+def stop_playwright_trace(context, started):
+    tracer = TRACER
+    if not started or tracer is None:
+        return
+    # one zip per traced run; the warm daemon traces every job on the same context
+    suffix = f"-{len(tracer.zips) + 1}.zip" if tracer.zips else ".zip"
+    path = tracer.side_file(suffix)
+    try:
+        context.tracing.stop(path=path)
+        tracer.zips.append(path)
+    except Exception as e:
+        log("warning", "failed to save playwright trace:", e)